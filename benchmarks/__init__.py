@@ -0,0 +1,6 @@
+"""
+Performance checks for Ishuri-Connect
+Scripts in this package are run by hand or from CI, e.g.
+
+    python -m benchmarks.startup_budget
+"""
@@ -0,0 +1,224 @@
+"""
+Microbenchmarks for the matching core
+Times calculate_match_score, sort_schools_by_match, Student.matches_location,
+School.accepts_combination / has_program, categorize_schools (the loop behind the
+recommendations screen) and build_recommendations on fixed synthetic catalogs of
+10, 500 and 10,000 schools (with programs).
+
+    python -m benchmarks.bench_matching                  # run and compare with the baseline
+    python -m benchmarks.bench_matching --update         # record a new baseline
+    python -m benchmarks.bench_matching --sizes 500 --threshold 0.3
+
+Per case it reports calls/second and peak bytes allocated per call (tracemalloc).
+Speeds are also divided by a fixed pure-Python calibration loop, so a baseline
+recorded on one machine stays meaningful on another; a case fails when its
+normalized speed drops, or its allocations grow, by more than --threshold.
+Exit code 1 on any regression.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+from src.models import (School, Student, build_recommendations, calculate_match_score,
+                        categorize_schools, sort_schools_by_match)
+from src.utils import PROVINCE_DISTRICTS
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'matching.json')
+SIZES = (10, 500, 10000)
+SEED = 2024
+
+COMBINATIONS = ['PCM', 'PCB', 'MCB', 'MEG', 'MPG', 'HEG', 'HGL', 'LKE', 'MCE', 'BCG']
+PROGRAM_NAMES = ['Computer Science', 'Software Engineering', 'Medicine', 'Nursing', 'Pharmacy',
+                 'Civil Engineering', 'Electrical Engineering', 'Business Administration',
+                 'Accounting', 'Economics', 'Law', 'Education', 'Agriculture', 'Architecture',
+                 'Public Health', 'Journalism', 'Information Technology', 'Tourism']
+BOARDING_TYPES = ['day', 'boarding', 'both']
+
+
+def synthetic_catalog(size, seed=SEED):
+    """The same `size` schools (1-5 programs each) on every run"""
+    rng = random.Random(seed + size)
+    places = [(district, province) for province, districts in PROVINCE_DISTRICTS.items()
+              for district in districts]
+    schools = []
+    program_id = 1
+    for school_id in range(1, size + 1):
+        district, province = rng.choice(places)
+        min_cutoff = round(rng.uniform(40, 85), 1)
+        school = School(
+            name=f"School {school_id}",
+            district=district,
+            province=province,
+            school_type=rng.choice(['public', 'private']),
+            min_aggregate=min_cutoff,
+            min_cutoff=min_cutoff,
+            max_cutoff=min(100.0, min_cutoff + rng.uniform(5, 20)),
+            boarding_type=rng.choice(BOARDING_TYPES),
+            required_subjects=rng.sample(COMBINATIONS, rng.randint(0, 4)),
+            school_id=school_id
+        )
+        for name in rng.sample(PROGRAM_NAMES, rng.randint(1, 5)):
+            school.programs.append({
+                'id': program_id,
+                'school_id': school_id,
+                'program_name': name,
+                'cutoff_marks': round(min(100.0, min_cutoff + rng.uniform(0, 12)), 1),
+                'required_combination': rng.choice(COMBINATIONS),
+                'duration_years': rng.choice([3, 4, 5, 6])
+            })
+            program_id += 1
+        schools.append(school)
+    return schools
+
+
+def bench_student():
+    return Student('Bench', 'Mark', 'bench@example.com', aggregate_marks=72.5,
+                   subject_combination='PCM', preferred_location='Kigali',
+                   desired_program='Computer Science', preferred_boarding='boarding')
+
+
+def cases(schools, student):
+    """name -> (callable doing one run, function calls per run)"""
+    program = student.desired_program
+    combination = student.subject_combination
+
+    def match_scores():
+        for school in schools:
+            calculate_match_score(student, school)
+
+    def locations():
+        for school in schools:
+            student.matches_location(school.district, school.province)
+
+    def combinations():
+        for school in schools:
+            school.accepts_combination(combination)
+
+    def programs():
+        for school in schools:
+            school.has_program(program)
+
+    count = len(schools)
+    return {
+        'calculate_match_score': (match_scores, count),
+        'matches_location': (locations, count),
+        'accepts_combination': (combinations, count),
+        'has_program': (programs, count),
+        'sort_schools_by_match': (lambda: sort_schools_by_match(schools, student), 1),
+        'categorize_schools': (lambda: categorize_schools(schools, student, program), 1),
+        'build_recommendations': (lambda: build_recommendations(student, schools, program), 1)
+    }
+
+
+def calls_per_second(run, calls, repeat=5, min_time=0.2):
+    """Best of `repeat` timings, each long enough to be measurable"""
+    timer = timeit.Timer(run)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(loops, int(loops * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=loops))
+    return loops * calls / best
+
+
+def allocated_bytes_per_call(run, calls):
+    """Peak bytes allocated during one run, per function call"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(peak - start, 0) / calls
+
+
+def calibration_score():
+    """Calls/second of a fixed pure-Python loop - a yardstick for this machine"""
+    def work():
+        table = {}
+        total = 0
+        for i in range(1000):
+            key = f"k{i % 50}"
+            table[key] = table.get(key, 0) + i
+            total += len(key)
+        return total
+    return calls_per_second(work, 1)
+
+
+def run_suite(sizes, repeat=5):
+    calibration = calibration_score()
+    student = bench_student()
+    results = {}
+    for size in sizes:
+        schools = synthetic_catalog(size)
+        for name, (run, calls) in cases(schools, student).items():
+            ops = calls_per_second(run, calls, repeat=repeat)
+            results[f"{name}[{size}]"] = {
+                'ops_per_s': round(ops, 1),
+                'normalized': round(ops / calibration, 6),
+                'alloc_bytes_per_call': round(allocated_bytes_per_call(run, calls), 1)
+            }
+            print(f"  {name}[{size}]: {ops:,.0f} calls/s, "
+                  f"{results[f'{name}[{size}]']['alloc_bytes_per_call']:,.0f} B/call", file=sys.stderr)
+    return {'calibration_ops_per_s': round(calibration, 1), 'cases': results}
+
+
+def compare(results, baseline, threshold):
+    """Regression messages (empty when everything is within threshold)"""
+    failures = []
+    for name, current in results['cases'].items():
+        base = baseline.get('cases', {}).get(name)
+        if base is None:
+            continue
+        if current['normalized'] < base['normalized'] * (1 - threshold):
+            drop = 1 - current['normalized'] / base['normalized']
+            failures.append(f"{name}: {drop:.0%} slower than baseline")
+        # Small absolute slack so tiny allocations do not flap
+        if current['alloc_bytes_per_call'] > base['alloc_bytes_per_call'] * (1 + threshold) + 64:
+            failures.append(f"{name}: allocates {current['alloc_bytes_per_call']:.0f} B/call "
+                            f"(baseline {base['alloc_bytes_per_call']:.0f})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Matching core microbenchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown / allocation growth (default 0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update', action='store_true', help='Write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, repeat=args.repeat)
+
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline} - run with --update first", file=sys.stderr)
+        print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    failures = compare(results, baseline, args.threshold)
+    print(json.dumps({'results': results, 'regressions': failures}, indent=2))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
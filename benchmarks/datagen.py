@@ -0,0 +1,299 @@
+"""
+Synthetic Rwandan dataset generator for benchmarks and load tests
+Seeded and deterministic: the same arguments always produce the same rows.
+
+Students get aggregates drawn per subject combination (PCM, PCB, MEG, HEG, LKE,
+MCB, ...), home and preferred districts from the same province/district map the
+menus use, and desired programs that follow their combination. Schools get
+plausible cutoffs, boarding types, accepted combinations and programs with fee
+ranges. Rows are generated lazily and written in chunks, so memory stays flat
+for millions of students.
+
+    python -m benchmarks.datagen --schools 300 --students 1000000 --to db
+    python -m benchmarks.datagen --students 200000 --to csv --output-dir data/
+    python -m benchmarks.datagen --students 50000 --hot-program "Computer Science" --hot-share 0.4
+
+CSV output: schools.csv, programs.csv and students.csv (same columns as
+`python main.py import`, so it can also be loaded through the importer).
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from itertools import islice
+
+from src.models import School, Student
+from src.utils import PROVINCE_DISTRICTS
+
+# combination -> (share of candidates, mean aggregate, standard deviation)
+COMBINATION_PROFILES = {
+    'PCM': (0.14, 66, 12),
+    'PCB': (0.13, 64, 12),
+    'MCB': (0.07, 63, 12),
+    'MPG': (0.05, 61, 13),
+    'MCE': (0.08, 62, 12),
+    'MEG': (0.12, 60, 13),
+    'HEG': (0.14, 58, 13),
+    'HGL': (0.08, 57, 13),
+    'LKE': (0.07, 59, 12),
+    'BCG': (0.06, 61, 12),
+    'LFK': (0.06, 58, 13)
+}
+
+# field -> (program names, combinations that lead there)
+PROGRAM_FIELDS = {
+    'ict': (['Computer Science', 'Software Engineering', 'Information Technology',
+             'Computer Engineering'], ['PCM', 'MCE', 'MPG', 'MEG']),
+    'health': (['Medicine', 'Nursing', 'Pharmacy', 'Public Health', 'Dental Surgery'],
+               ['PCB', 'MCB', 'BCG']),
+    'engineering': (['Civil Engineering', 'Electrical Engineering', 'Mechanical Engineering',
+                     'Architecture'], ['PCM', 'MPG']),
+    'business': (['Business Administration', 'Accounting', 'Economics', 'Finance'],
+                 ['MEG', 'MCE', 'HEG']),
+    'humanities': (['Law', 'Journalism', 'International Relations', 'Education'],
+                   ['HEG', 'HGL', 'LKE', 'LFK']),
+    'agriculture': (['Agriculture', 'Veterinary Medicine', 'Environmental Science'],
+                    ['BCG', 'PCB', 'MCB']),
+    'tourism': (['Tourism and Hospitality', 'Languages and Literature'], ['LKE', 'LFK', 'HGL'])
+}
+
+# Rough share of candidates per province (spread evenly over its districts)
+PROVINCE_WEIGHTS = {'Kigali': 0.16, 'Eastern': 0.26, 'Southern': 0.23, 'Western': 0.21, 'Northern': 0.14}
+
+FIRST_NAMES = ['Jean', 'Claude', 'Aline', 'Divine', 'Eric', 'Grace', 'Patrick', 'Yvonne', 'Olivier',
+               'Diane', 'Emmanuel', 'Clarisse', 'Innocent', 'Josiane', 'Kevin', 'Sandrine',
+               'Fabrice', 'Ange', 'Didier', 'Esther', 'Samuel', 'Alice', 'Theogene', 'Chantal']
+LAST_NAMES = ['Uwimana', 'Mugisha', 'Niyonzima', 'Habimana', 'Uwase', 'Nshimiyimana', 'Ingabire',
+              'Hakizimana', 'Mukamana', 'Iradukunda', 'Niyitegeka', 'Bizimana', 'Uwera',
+              'Tuyishime', 'Nsengiyumva', 'Mutoni', 'Ndayisaba', 'Umutoni', 'Twagirayezu', 'Kayitesi']
+SCHOOL_PREFIXES = ['University of', 'Institute of Technology', 'College of', 'Polytechnic',
+                   'School of Sciences', 'Adventist University of']
+
+STUDENT_FIELDS = ['first_name', 'last_name', 'email', 'aggregate_marks', 'marks', 'secondary_school',
+                  'subject_combination', 'location_from', 'preferred_location', 'desired_program',
+                  'preferred_boarding']
+SCHOOL_FIELDS = ['id', 'name', 'district', 'province', 'school_type', 'boarding', 'min_aggregate',
+                 'min_cutoff', 'max_cutoff', 'required_subjects', 'contact_email', 'website']
+PROGRAM_FIELDS_CSV = ['school_id', 'program_name', 'program_code', 'cutoff_marks',
+                      'required_combination', 'duration_years', 'fees_range', 'description']
+
+
+class DatasetGenerator:
+    """
+    Deterministic rows for one seed
+    hot_program / hot_share: that share of students all want the same program
+    (a results-day "everyone applies to Computer Science" scenario).
+    """
+
+    def __init__(self, seed=42, hot_program=None, hot_share=0.0):
+        self.seed = seed
+        self.hot_program = hot_program
+        self.hot_share = hot_share if hot_program else 0.0
+
+        self.districts = []
+        self.district_weights = []
+        for province, districts in PROVINCE_DISTRICTS.items():
+            for district in districts:
+                self.districts.append((district, province))
+                self.district_weights.append(PROVINCE_WEIGHTS.get(province, 0.1) / len(districts))
+        self.combinations = list(COMBINATION_PROFILES)
+        self.combination_weights = [profile[0] for profile in COMBINATION_PROFILES.values()]
+
+        # combination -> programs it usually leads to
+        self.programs_for = {combination: [] for combination in self.combinations}
+        for names, combinations in PROGRAM_FIELDS.values():
+            for combination in combinations:
+                self.programs_for[combination].extend(names)
+
+    # ==================== SCHOOLS ====================
+
+    def schools(self, count):
+        """Yield (School, [program dicts]) for `count` schools"""
+        rng = random.Random(f"{self.seed}:schools")
+        for index in range(1, count + 1):
+            district, province = rng.choices(self.districts, self.district_weights)[0]
+            public = rng.random() < 0.35
+            min_cutoff = round(rng.triangular(45, 88, 62 if public else 55), 1)
+            fields = rng.sample(list(PROGRAM_FIELDS), rng.randint(1, 4))
+            accepted = sorted({combination for field in fields for combination in PROGRAM_FIELDS[field][1]})
+            name = f"{rng.choice(SCHOOL_PREFIXES)} {district} {index}"
+            school = School(
+                name=name,
+                district=district,
+                province=province,
+                school_type='public' if public else 'private',
+                min_aggregate=min_cutoff,
+                min_cutoff=min_cutoff,
+                max_cutoff=round(min(99.0, min_cutoff + rng.uniform(8, 25)), 1),
+                boarding_type=rng.choice(['day', 'boarding', 'both']),
+                required_subjects=accepted if rng.random() < 0.7 else [],
+                contact_email=f"admissions{index}@school{index}.ac.rw",
+                website=f"https://school{index}.ac.rw",
+                school_id=index
+            )
+            programs = []
+            for field in fields:
+                names, combinations = PROGRAM_FIELDS[field]
+                for program_name in rng.sample(names, rng.randint(1, len(names))):
+                    low = rng.randrange(300, 1500, 50) * 1000 * (1 if public else 2)
+                    high = low + rng.randrange(200, 1200, 50) * 1000
+                    programs.append({
+                        'program_name': program_name,
+                        'program_code': ''.join(word[0] for word in program_name.split()).upper() + str(index),
+                        'cutoff_marks': round(min(99.0, min_cutoff + rng.uniform(0, 15)), 1),
+                        'required_combination': rng.choice(combinations),
+                        'duration_years': 6 if program_name == 'Medicine' else rng.choice([3, 4, 4, 5]),
+                        'fees_range': f"{low:,} - {high:,} RWF",
+                        'description': f"{program_name} at {name}"
+                    })
+            yield school, programs
+
+    # ==================== STUDENTS ====================
+
+    def students(self, count, offset=0):
+        """Yield `count` Student objects, numbered from `offset` (emails stay unique)"""
+        rng = random.Random(f"{self.seed}:students:{offset}")
+        for index in range(offset, offset + count):
+            combination = rng.choices(self.combinations, self.combination_weights)[0]
+            _, mean, spread = COMBINATION_PROFILES[combination]
+            aggregate = min(99.0, max(20.0, rng.gauss(mean, spread)))
+            marks = [round(min(100.0, max(0.0, rng.gauss(aggregate, 7))), 1) for _ in range(3)]
+
+            home, _ = rng.choices(self.districts, self.district_weights)[0]
+            roll = rng.random()
+            if roll < 0.45:
+                preferred = home
+            elif roll < 0.8:
+                preferred = rng.choices(self.districts, self.district_weights)[0][1]  # a province
+            else:
+                preferred = None
+
+            if self.hot_share and rng.random() < self.hot_share:
+                program = self.hot_program
+            else:
+                program = rng.choice(self.programs_for[combination])
+
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            yield Student(
+                first_name=first_name,
+                last_name=last_name,
+                email=f"{first_name.lower()}.{last_name.lower()}.{index}@students.rw",
+                marks=marks,
+                secondary_school=f"GS {home} {rng.randint(1, 12)}",
+                aggregate_marks=round(sum(marks) / len(marks), 2),
+                subject_combination=combination,
+                location_from=home,
+                preferred_location=preferred,
+                desired_program=program,
+                preferred_boarding=rng.choice(['boarding', 'day', 'no_preference'])
+            )
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def report_progress(label, done, start):
+    rate = done / (time.perf_counter() - start or 1e-9)
+    print(f"  {label}: {done:,} rows ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+# ==================== WRITERS ====================
+
+def write_database(db, generator, schools, students, offset, chunk_size):
+    """Schools one transaction each (they need their ids), students in executemany batches"""
+    start = time.perf_counter()
+    for school, programs in generator.schools(schools):
+        school.school_id = None
+        db.insert_school_with_programs(school, programs)
+    report_progress('schools', schools, start)
+
+    start = time.perf_counter()
+    written = 0
+    for chunk in chunked(generator.students(students, offset), chunk_size):
+        with db.transaction():
+            db.insert_students_bulk(chunk)
+        written += len(chunk)
+        if written % (chunk_size * 20) == 0:
+            report_progress('students', written, start)
+    report_progress('students', written, start)
+
+
+def write_csv(directory, generator, schools, students, offset, chunk_size):
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(directory, 'schools.csv'), 'w', newline='', encoding='utf-8') as school_file, \
+            open(os.path.join(directory, 'programs.csv'), 'w', newline='', encoding='utf-8') as program_file:
+        school_writer = csv.writer(school_file)
+        school_writer.writerow(SCHOOL_FIELDS)
+        program_writer = csv.DictWriter(program_file, fieldnames=PROGRAM_FIELDS_CSV)
+        program_writer.writeheader()
+        for school, programs in generator.schools(schools):
+            school_writer.writerow([
+                school.school_id, school.name, school.district, school.province, school.school_type,
+                school.boarding_type, school.min_aggregate, school.min_cutoff, school.max_cutoff,
+                ','.join(school.required_subjects), school.contact_email, school.website
+            ])
+            for program in programs:
+                program_writer.writerow(dict(program, school_id=school.school_id))
+    report_progress('schools', schools, start)
+
+    start = time.perf_counter()
+    written = 0
+    with open(os.path.join(directory, 'students.csv'), 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(STUDENT_FIELDS)
+        for chunk in chunked(generator.students(students, offset), chunk_size):
+            writer.writerows([
+                student.first_name, student.last_name, student.email, student.aggregate_marks,
+                ';'.join(str(mark) for mark in student.marks), student.secondary_school,
+                student.subject_combination, student.location_from, student.preferred_location or '',
+                student.desired_program, student.preferred_boarding
+            ] for student in chunk)
+            written += len(chunk)
+    report_progress('students', written, start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seeded synthetic dataset generator')
+    parser.add_argument('--schools', type=int, default=200)
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--offset', type=int, default=0,
+                        help='First student number (add more students to an existing dataset)')
+    parser.add_argument('--to', choices=('db', 'csv'), default='csv')
+    parser.add_argument('--output-dir', default='generated_data', help='Directory for --to csv')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per batch')
+    parser.add_argument('--hot-program', help='Program a share of students all want')
+    parser.add_argument('--hot-share', type=float, default=0.3, help='Share of students for --hot-program')
+    args = parser.parse_args(argv)
+
+    generator = DatasetGenerator(args.seed, args.hot_program, args.hot_share)
+    if args.to == 'csv':
+        write_csv(args.output_dir, generator, args.schools, args.students, args.offset, args.chunk_size)
+        return 0
+
+    from database.db import Database
+
+    db = Database()
+    if not db.connect():
+        print("error: failed to connect to database", file=sys.stderr)
+        return 1
+    try:
+        write_database(db, generator, args.schools, args.students, args.offset, args.chunk_size)
+    finally:
+        db.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Results-day load test for Ishuri-Connect
+Simulates students logging in right after results are published. Every virtual
+student runs one session against Database + the matching code:
+
+    login (get_student_by_email) -> recommendations -> apply (some of them) -> view applications
+
+Sessions arrive at --rate per second (Poisson arrivals, open model) and run on up
+to --concurrency threads, each with its own database connection. With --rate 0
+every thread runs sessions back to back (closed model). In the open model login
+latency counts from the session's scheduled arrival, so time spent waiting for a
+free thread shows up instead of being hidden.
+
+    python -m benchmarks.loadtest --sessions 5000 --concurrency 64 --rate 500
+    python -m benchmarks.loadtest --duration 60 --concurrency 32 --rate 0 --compare benchmarks/results/last.json
+
+Reports throughput, p50/p95/p99 latency and error rate per operation, and saves
+the run as JSON (benchmarks/results/ by default) so runs can be compared.
+Point it at a local MySQL or a disposable copy: sessions really insert applications.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models import Application, build_recommendations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATIONS = ('login', 'recommend', 'apply', 'view_applications')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+class Recorder:
+    """Latencies (ms) and error counts per operation, shared by all threads"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def timed(self, name, call, stats=None, start=None):
+        """
+        Run call(); a raised exception, a None/False result or (with the
+        database's QueryStats) a failed query counts as an error
+        start: perf_counter() time to measure from (default: now)
+        """
+        start = time.perf_counter() if start is None else start
+        try:
+            if stats is None:
+                result = call()
+                failed = result is None or result is False
+            else:
+                # Reads return [] when they fail - the query stats know better
+                with stats.operation(f"loadtest.{name}") as operation:
+                    result = call()
+                failed = result is None or result is False or operation['errors'] > 0
+        except Exception:
+            result, failed = None, True
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if failed:
+                self.errors[name] += 1
+        return result
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+class LoadTest:
+    """One load-test run; see the module docstring for the session flow"""
+
+    def __init__(self, db, emails, apply_ratio=0.3, seed=42):
+        self.db = db
+        self.emails = emails
+        self.apply_ratio = apply_ratio
+        self.seed = seed
+        self.recorder = Recorder()
+        self._local = threading.local()
+        self._clones = []
+        self._lock = threading.Lock()
+
+    def thread_state(self):
+        """This thread's (database clone, random generator)"""
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            db = self.db.clone()
+            db.connect()
+            with self._lock:
+                self._clones.append(db)
+                rng = random.Random(self.seed + len(self._clones))
+            state = self._local.state = (db, rng)
+        return state
+
+    def session(self, scheduled_at=None):
+        """One student session; scheduled_at is its arrival time in the open model"""
+        db, rng = self.thread_state()
+
+        def record(name, call, start=None):
+            return self.recorder.timed(name, call, db.stats, start)
+
+        email = rng.choice(self.emails)
+
+        student = record('login', lambda: db.get_student_by_email(email), start=scheduled_at)
+        if student:
+            recommendations = record('recommend', lambda: build_recommendations(
+                student, db.get_all_schools(), limit=5))
+            if recommendations and rng.random() < self.apply_ratio:
+                school_id = rng.choice(recommendations)['school_id']
+                record('apply', lambda: self.apply(db, student.student_id, school_id))
+            record('view_applications', lambda: db.get_applications_by_student(student.student_id))
+        with self._lock:
+            self.recorder.sessions += 1
+
+    @staticmethod
+    def apply(db, student_id, school_id):
+        """Same check-and-insert as the menu; an existing application is not an error"""
+        with db.transaction():
+            if db.check_existing_application(student_id, school_id):
+                return True
+            return db.insert_application(Application(student_id, school_id))
+
+    def run(self, concurrency, rate=0.0, sessions=None, duration=None):
+        """Run until `sessions` sessions started or `duration` seconds passed; returns wall seconds"""
+        deadline = time.perf_counter() + duration if duration else None
+        arrivals = random.Random(self.seed)
+        started = 0
+        start = time.perf_counter()
+
+        def more():
+            if sessions is not None and started >= sessions:
+                return False
+            return deadline is None or time.perf_counter() < deadline
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='student') as executor:
+            if rate > 0:
+                # Open model: arrivals do not wait for earlier sessions to finish
+                next_arrival = time.perf_counter()
+                pending = set()  # sessions still running; finished ones remove themselves
+
+                def finished(future):
+                    pending.discard(future)
+                    if future.exception() is not None:
+                        print(f"session failed: {future.exception()!r}", file=sys.stderr)
+
+                while more():
+                    next_arrival += arrivals.expovariate(rate)
+                    delay = next_arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    future = executor.submit(self.session, next_arrival)
+                    pending.add(future)
+                    future.add_done_callback(finished)
+                    started += 1
+                for future in list(pending):
+                    future.exception()  # wait; failures were reported by finished()
+            else:
+                # Closed model: each thread starts its next session when the last one ends
+                lock = threading.Lock()
+
+                def worker():
+                    nonlocal started
+                    while True:
+                        with lock:
+                            if not more():
+                                return
+                            started += 1
+                        self.session()
+
+                for future in [executor.submit(worker) for _ in range(concurrency)]:
+                    future.result()
+
+        elapsed = time.perf_counter() - start
+        for db in self._clones:
+            db.disconnect()
+        return elapsed
+
+    def report(self, elapsed, settings):
+        """Results as a dictionary (what gets saved)"""
+        operations = {}
+        for name in OPERATIONS:
+            samples = sorted(self.recorder.latencies[name])
+            count = len(samples)
+            operations[name] = {
+                'count': count,
+                'throughput_per_s': round(count / elapsed, 1) if elapsed else 0.0,
+                'p50_ms': round(percentile(samples, 0.50), 3),
+                'p95_ms': round(percentile(samples, 0.95), 3),
+                'p99_ms': round(percentile(samples, 0.99), 3),
+                'max_ms': round(samples[-1], 3) if samples else 0.0,
+                'errors': self.recorder.errors[name],
+                'error_rate': round(self.recorder.errors[name] / count, 4) if count else 0.0
+            }
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'settings': settings,
+            'elapsed_seconds': round(elapsed, 3),
+            'sessions': self.recorder.sessions,
+            'sessions_per_s': round(self.recorder.sessions / elapsed, 1) if elapsed else 0.0,
+            'operations': operations
+        }
+
+
+def print_report(report, baseline=None, out=sys.stderr):
+    """Table per operation; with a baseline, p95 and throughput changes too"""
+    print(f"{report['sessions']} sessions in {report['elapsed_seconds']}s "
+          f"({report['sessions_per_s']} sessions/s)", file=out)
+    header = f"{'operation':<18}{'count':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>13}{'ops/s vs base':>15}"
+    print(header, file=out)
+    for name, op in report['operations'].items():
+        line = (f"{name:<18}{op['count']:>8}{op['throughput_per_s']:>10}{op['p50_ms']:>10}"
+                f"{op['p95_ms']:>10}{op['p99_ms']:>10}{op['error_rate']:>9.2%}")
+        base = (baseline or {}).get('operations', {}).get(name)
+        if base:
+            line += f"{change(op['p95_ms'], base['p95_ms']):>13}"
+            line += f"{change(op['throughput_per_s'], base['throughput_per_s']):>15}"
+        print(line, file=out)
+
+
+def change(value, base):
+    if not base:
+        return 'n/a'
+    return f"{(value - base) / base:+.1%}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Results-day load test')
+    parser.add_argument('--concurrency', type=int, default=32, help='Threads / open connections')
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help='Session arrivals per second (0 = closed loop)')
+    parser.add_argument('--sessions', type=int, help='Stop after this many sessions')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--apply-ratio', type=float, default=0.3, help='Share of sessions that apply')
+    parser.add_argument('--students', type=int, default=5000, help='Distinct students to sample from')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Where to save the JSON results')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args(argv)
+    if args.sessions is None and args.duration is None:
+        args.sessions = 1000
+
+    from database.db import Database
+
+    db = Database()
+    if not db.connect():
+        print("error: failed to connect to database", file=sys.stderr)
+        return 1
+    emails = sorted(db.get_all_student_emails())
+    if not emails:
+        print("error: no students to log in as - generate some with benchmarks.datagen", file=sys.stderr)
+        return 1
+    emails = random.Random(args.seed).sample(emails, min(args.students, len(emails)))
+
+    test = LoadTest(db, emails, apply_ratio=args.apply_ratio, seed=args.seed)
+    elapsed = test.run(args.concurrency, rate=args.rate, sessions=args.sessions, duration=args.duration)
+    db.disconnect()
+
+    settings = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    report = test.report(elapsed, settings)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+    print_report(report, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results saved to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
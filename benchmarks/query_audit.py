@@ -0,0 +1,349 @@
+"""
+Query plan audit for the Database class
+Calls every Database method that talks to MySQL with representative parameters
+taken from the connected (seeded) database, captures each statement it issues
+and runs EXPLAIN FORMAT=JSON on it. Plans are flagged for:
+
+    full_scan:<table>         access_type ALL - every row of the table is read
+    full_index_scan:<table>   access_type index - the whole index is read
+    filesort:<table>          ORDER BY / GROUP BY sorted outside an index
+    temporary_table:<table>   DISTINCT / GROUP BY / UNION through a temp table
+
+    python -m benchmarks.datagen --to db --schools 300 --students 100000   # seed first
+    python -m benchmarks.query_audit                  # audit, compare with accepted findings
+    python -m benchmarks.query_audit --update         # accept the current findings
+    python -m benchmarks.query_audit --output query_audit.json
+
+Writes are only captured, never executed, so the audit is safe to run against
+a seeded test database (EXPLAIN does not modify data). Exit code 1 when a plan
+has a finding that is not in the accepted baseline, when EXPLAIN fails, or when
+a Database method issues queries but has no audit scenario - so the audit can
+gate releases.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import sys
+
+from database.db import Database
+from database.sql_text import fingerprint
+from src.models import Application, School, Student
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'query_plans.json')
+
+# Helpers that other methods go through - audited via their callers
+QUERY_HELPERS = {'fetch_query', 'execute_query', 'execute_many', 'iter_keyset'}
+QUERY_CALLS = ('self.fetch_query(', 'self.execute_query(', 'self.execute_many(', 'self.iter_keyset(')
+EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'replace', 'with')
+
+
+class CapturingDatabase(Database):
+    """
+    A Database that records every statement issued while a scenario runs
+    Reads still run (their results feed the calling method); writes are
+    recorded and reported as successful without touching the data.
+    """
+
+    def __init__(self):
+        super().__init__(replicas=[])
+        self.cache = None
+        self.scenario = None
+        self.captured = []  # (scenario, query, params)
+
+    def _fetch(self, query, params=None):
+        if self.scenario is not None:
+            self.captured.append((self.scenario, query, params))
+        return super()._fetch(query, params)
+
+    def _execute(self, query, params=None, many=False):
+        if self.scenario is None:
+            return None
+        if many:
+            self.captured.append((self.scenario, query, params[0] if params else None))
+            return len(params)
+        self.captured.append((self.scenario, query, params))
+        return 1
+
+
+# ==================== SCENARIOS ====================
+
+def first_row(db, query):
+    rows = db.fetch_query(query, use_cache=False)
+    return rows[0] if rows else {}
+
+
+def sample_values(db):
+    """Representative parameters: real ids and values from the seeded data"""
+    student_row = first_row(db, "SELECT id FROM students ORDER BY id DESC LIMIT 1")
+    school_row = first_row(db, """
+        SELECT school_id, COUNT(*) AS programs FROM programs
+        GROUP BY school_id ORDER BY programs DESC LIMIT 1
+    """)
+    program_row = first_row(db, "SELECT * FROM programs ORDER BY id LIMIT 1")
+    application_row = first_row(db, "SELECT id FROM applications ORDER BY id DESC LIMIT 1")
+
+    student = db.get_student_by_id(student_row['id']) if student_row else None
+    if student is None:
+        student = Student('Audit', 'Student', 'audit.student@example.com', aggregate_marks=65.0,
+                          subject_combination='PCM', location_from='Gasabo', student_id=0)
+    school = db.get_school_by_id(school_row['school_id']) if school_row else None
+    if school is None:
+        school = School('Audit School', 'Gasabo', province='Kigali City', min_aggregate=60.0, school_id=0)
+    program_name = (program_row.get('program_name') or 'Computer Science').split()[0]
+
+    return {
+        'student': student,
+        'school': school,
+        'program': dict(program_row) or {'school_id': school.school_id, 'program_name': 'Audit Program'},
+        'program_name': program_name,
+        'application_id': application_row.get('id', 0),
+        'min_mark': student.aggregate_marks or 60.0
+    }
+
+
+def first_chunk(rows):
+    """Only the first keyset page - enough to capture the statement"""
+    return next(iter(rows), None)
+
+
+SCENARIOS = {
+    'insert_student': lambda db, s: db.insert_student(Student(
+        'Audit', 'Student', 'audit.new@example.com', aggregate_marks=s['student'].aggregate_marks,
+        subject_combination=s['student'].subject_combination, location_from=s['student'].location_from)),
+    'insert_students_bulk': lambda db, s: db.insert_students_bulk([s['student'], s['student']]),
+    'get_all_student_emails': lambda db, s: db.get_all_student_emails(),
+    'get_student_by_id': lambda db, s: db.get_student_by_id(s['student'].student_id),
+    'get_student_by_email': lambda db, s: db.get_student_by_email(s['student'].email),
+    'get_all_students': lambda db, s: db.get_all_students(),
+    'insert_student_marks': lambda db, s: db.insert_student_marks(
+        s['student'].student_id, s['student'].subject_marks() or {'Mathematics': 70.0}),
+    'insert_marks_bulk': lambda db, s: db.insert_marks_bulk([(s['student'].student_id, 'Mathematics', 70.0)]),
+    'get_marks_by_students': lambda db, s: db.get_marks_by_students([s['student'].student_id]),
+    'get_all_marks': lambda db, s: db.get_all_marks(),
+    'update_student': lambda db, s: db.update_student(s['student']),
+    'delete_student': lambda db, s: db.delete_student(s['student'].student_id),
+    'insert_school': lambda db, s: db.insert_school(s['school']),
+    'get_school_by_id': lambda db, s: db.get_school_by_id(s['school'].school_id),
+    'get_all_schools': lambda db, s: db.get_all_schools(),
+    'get_schools_by_min_mark': lambda db, s: db.get_schools_by_min_mark(s['min_mark']),
+    'get_catalog_version': lambda db, s: db.get_catalog_version(),
+    'insert_program': lambda db, s: db.insert_program(dict(s['program'])),
+    'get_programs_by_school': lambda db, s: db.get_programs_by_school(s['school'].school_id),
+    'get_program_by_id': lambda db, s: db.get_program_by_id(s['program'].get('id', 0)),
+    'search_programs_by_name': lambda db, s: db.search_programs_by_name(s['program_name']),
+    'search_programs_by_budget': lambda db, s: db.search_programs_by_budget(1500000, max_years=4),
+    'insert_application': lambda db, s: db.insert_application(
+        Application(s['student'].student_id, s['school'].school_id)),
+    'get_applications_by_student': lambda db, s: db.get_applications_by_student(s['student'].student_id),
+    'get_applications_by_school': lambda db, s: db.get_applications_by_school(s['school'].school_id),
+    'update_application_status': lambda db, s: db.update_application_status(s['application_id'], 'accepted'),
+    'delete_application': lambda db, s: db.delete_application(s['application_id']),
+    'check_existing_application': lambda db, s: db.check_existing_application(
+        s['student'].student_id, s['school'].school_id),
+    'iter_students': lambda db, s: first_chunk(db.iter_students(
+        chunk_size=1000, combination=s['student'].subject_combination,
+        districts=[s['student'].location_from or 'Gasabo'])),
+    'iter_student_aggregates': lambda db, s: first_chunk(db.iter_student_aggregates(0, chunk_size=100)),
+    'iter_applications': lambda db, s: first_chunk(db.iter_applications(
+        chunk_size=1000, province=s['school'].province, combination=s['student'].subject_combination)),
+    'get_admission_stats': lambda db, s: db.get_admission_stats([s['school'].school_id]),
+    'rebuild_admission_stats': lambda db, s: db.rebuild_admission_stats(chunk_size=100),
+    'get_statistics': lambda db, s: db.get_statistics(),
+    'advanced_match_search': lambda db, s: db.advanced_match_search(s['student'])
+}
+
+
+def query_methods():
+    """Public Database methods that issue SQL themselves"""
+    names = []
+    for name, function in inspect.getmembers(Database, inspect.isfunction):
+        if name.startswith('_') or name in QUERY_HELPERS:
+            continue
+        source = inspect.getsource(function)
+        if any(call in source for call in QUERY_CALLS):
+            names.append(name)
+    return names
+
+
+# ==================== PLANS ====================
+
+def first_table(node):
+    """Name of the first table in a plan subtree"""
+    if isinstance(node, dict):
+        if 'table_name' in node:
+            return node['table_name']
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        name = first_table(child)
+        if name:
+            return name
+    return None
+
+
+def plan_findings(plan):
+    """Flags for one EXPLAIN FORMAT=JSON plan, as (finding, rows examined)"""
+    findings = []
+
+    def walk(node):
+        if isinstance(node, list):
+            for child in node:
+                walk(child)
+            return
+        if not isinstance(node, dict):
+            return
+        table = node.get('table_name')
+        access_type = node.get('access_type')
+        rows = node.get('rows_examined_per_scan')
+        if table and access_type == 'ALL':
+            findings.append((f"full_scan:{table}", rows))
+        elif table and access_type == 'index':
+            findings.append((f"full_index_scan:{table}", rows))
+        if node.get('using_filesort'):
+            findings.append((f"filesort:{first_table(node) or '?'}", None))
+        if node.get('using_temporary_table'):
+            findings.append((f"temporary_table:{first_table(node) or '?'}", None))
+        for child in node.values():
+            walk(child)
+
+    walk(plan)
+    return findings
+
+
+def explain(db, query, params):
+    """Parsed EXPLAIN FORMAT=JSON plan; raises on failure"""
+    rows = db._fetch_on(db.connection, f"EXPLAIN FORMAT=JSON {query.strip()}", params)
+    if not rows:
+        raise ValueError("EXPLAIN returned no plan")
+    return json.loads(next(iter(rows[0].values())))
+
+
+# ==================== AUDIT ====================
+
+def run_audit(db, scenarios=SCENARIOS):
+    db.fetch_query("ANALYZE TABLE students, schools, programs, applications", use_cache=False)
+    sample = sample_values(db)
+
+    errors = []
+    for name, scenario in scenarios.items():
+        db.scenario = name
+        try:
+            scenario(db, sample)
+        except Exception as e:
+            errors.append(f"{name}: scenario failed: {e}")
+        finally:
+            db.scenario = None
+
+    queries = []
+    seen = set()
+    for method, query, params in db.captured:
+        key = (method, fingerprint(query))
+        if key in seen:
+            continue
+        seen.add(key)
+        entry = {'method': method, 'query': key[1], 'findings': []}
+        if not key[1].startswith(EXPLAINABLE):
+            entry['skipped'] = 'not explainable'
+            queries.append(entry)
+            continue
+        try:
+            plan = explain(db, query, params)
+        except Exception as e:
+            errors.append(f"{method}: EXPLAIN failed for '{key[1][:80]}': {e}")
+            entry['error'] = str(e)
+            queries.append(entry)
+            continue
+        entry['cost'] = plan.get('query_block', {}).get('cost_info', {}).get('query_cost')
+        for finding, rows in plan_findings(plan):
+            entry['findings'].append(finding if rows is None else f"{finding} ({rows} rows)")
+        entry['plan'] = plan
+        queries.append(entry)
+
+    uncovered = sorted(set(query_methods()) - set(scenarios))
+    return {'queries': queries, 'errors': errors, 'uncovered_methods': uncovered}
+
+
+def finding_key(finding):
+    """'full_scan:schools (300 rows)' -> 'full_scan:schools' (row counts vary by dataset)"""
+    return finding.split(' (')[0]
+
+
+def findings_by_method(report):
+    accepted = {}
+    for entry in report['queries']:
+        for finding in entry['findings']:
+            accepted.setdefault(entry['method'], set()).add(finding_key(finding))
+    return {method: sorted(findings) for method, findings in sorted(accepted.items())}
+
+
+def new_findings(report, baseline):
+    """Findings not accepted in the baseline, as messages"""
+    messages = []
+    for method, findings in findings_by_method(report).items():
+        accepted = set(baseline.get(method, []))
+        for finding in findings:
+            if finding not in accepted:
+                messages.append(f"{method}: {finding}")
+    return messages
+
+
+def print_report(report, out=sys.stderr):
+    for entry in report['queries']:
+        status = entry.get('skipped') or entry.get('error') or ', '.join(entry['findings']) or 'ok'
+        print(f"  {entry['method']:<30} {status}", file=out)
+        if entry['findings']:
+            print(f"      {entry['query'][:110]}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN audit of every Database query')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Accepted findings per method')
+    parser.add_argument('--update', action='store_true', help='Accept the current findings as the baseline')
+    parser.add_argument('--output', help='Where to save the full JSON report (with plans)')
+    args = parser.parse_args(argv)
+
+    db = CapturingDatabase()
+    if not db.connect():
+        print("error: failed to connect to database", file=sys.stderr)
+        return 1
+    try:
+        report = run_audit(db)
+    finally:
+        db.disconnect()
+
+    print_report(report)
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as handle:
+            json.dump(findings_by_method(report), handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        baseline = findings_by_method(report)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+    else:
+        print(f"no baseline at {args.baseline} - every finding counts (accept with --update)",
+              file=sys.stderr)
+        baseline = {}
+
+    failures = new_findings(report, baseline) + report['errors'] + [
+        f"{method}: issues queries but has no audit scenario" for method in report['uncovered_methods']
+    ]
+    report['failures'] = failures
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2, default=str)
+        print(f"report saved to {args.output}", file=sys.stderr)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Startup budget check for Ishuri-Connect
+Fails (exit code 1) when starting the interactive app gets slower than budget:
+
+  1. import time of `main` + `src.cli`, measured with `python -X importtime`;
+     the MySQL driver and dotenv must not be imported before the menu
+  2. wall time from process start until the main menu is printed
+     (median of several runs; the database connects in the background)
+
+    python -m benchmarks.startup_budget
+    python -m benchmarks.startup_budget --import-budget-ms 150 --menu-budget-ms 400 --runs 7
+
+Budgets can also come from STARTUP_IMPORT_BUDGET_MS / STARTUP_MENU_BUDGET_MS.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of the import path to the menu
+DEFERRED_MODULES = ('mysql', 'dotenv')
+
+MENU_MARKER = 'MAIN MENU'
+
+
+def measure_imports():
+    """
+    Import `main` and `src.cli` under -X importtime
+    Returns (total_ms, {top-level module: cumulative ms}, every module name imported)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main, src.cli'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing the app failed:\n{result.stderr}")
+
+    modules = {}
+    imported = set()
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()[1:]
+        imported.add(name.strip())
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith(' '):
+            modules[name] = modules.get(name, 0.0) + int(parts[1]) / 1000
+
+    return sum(modules.values()), modules, imported
+
+
+def measure_menu(runs):
+    """Median wall time (ms) from spawning `python main.py` to the main menu"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-u', 'main.py'], cwd=ROOT, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        elapsed = None
+        for line in process.stdout:
+            if MENU_MARKER in line:
+                elapsed = (time.perf_counter() - start) * 1000
+                break
+        try:
+            process.communicate('0\n', timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+        if elapsed is None:
+            raise RuntimeError("the main menu was never printed")
+        samples.append(elapsed)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--import-budget-ms', type=float,
+                        default=float(os.getenv('STARTUP_IMPORT_BUDGET_MS', 150)))
+    parser.add_argument('--menu-budget-ms', type=float,
+                        default=float(os.getenv('STARTUP_MENU_BUDGET_MS', 400)))
+    parser.add_argument('--runs', type=int, default=5, help='Menu timing runs (median is used)')
+    parser.add_argument('--top', type=int, default=8, help='Slowest imports to list')
+    args = parser.parse_args(argv)
+
+    failures = []
+    import_ms, modules, imported = measure_imports()
+    for name in sorted(imported):
+        if name.split('.')[0] in DEFERRED_MODULES:
+            failures.append(f"{name} is imported before the menu (should be lazy)")
+    if import_ms > args.import_budget_ms:
+        failures.append(f"imports took {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+
+    menu_ms = measure_menu(max(args.runs, 1))
+    if menu_ms > args.menu_budget_ms:
+        failures.append(f"menu appeared after {menu_ms:.1f} ms (budget {args.menu_budget_ms:.0f} ms)")
+
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    print(json.dumps({
+        'import_ms': round(import_ms, 1),
+        'import_budget_ms': args.import_budget_ms,
+        'menu_ms': round(menu_ms, 1),
+        'menu_budget_ms': args.menu_budget_ms,
+        'slowest_imports': {name: round(ms, 1) for name, ms in slowest},
+        'ok': not failures
+    }, indent=2))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
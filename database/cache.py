@@ -0,0 +1,118 @@
+"""
+Query result cache for Ishuri-Connect
+LRU cache of fetch_query results keyed by whitespace-normalized SQL + params,
+with a TTL.
+Every entry is tagged with the tables it reads; a write to any of those tables
+evicts it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from database.sql_text import normalize_whitespace, read_tables
+from src.metrics import registry
+
+CACHE_LOOKUPS = registry.counter('ishuri_query_cache_lookups_total', 'Query cache lookups', ['result'])
+CACHE_EVICTIONS = registry.counter('ishuri_query_cache_evictions_total',
+                                   'Entries dropped by the LRU bound or a table write', ['reason'])
+HIT, MISS = ('hit',), ('miss',)
+
+
+class QueryCache:
+    """
+    Bounded LRU + TTL cache for SELECT results
+    Cached rows are shared between callers - treat them as read-only.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # key -> (expires_at, tables, rows)
+        self._by_table = {}             # table -> set of keys
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query, params=None):
+        # Not fingerprint(): that folds literals to ?, so "WHERE id = 1" and
+        # "WHERE id = 2" would share an entry
+        return (normalize_whitespace(query), tuple(params) if params else ())
+
+    def get(self, key):
+        """Cached rows, or None on a miss or an expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(labels=MISS)
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                CACHE_LOOKUPS.inc(labels=MISS)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(labels=HIT)
+            return entry[2]
+
+    def put(self, key, query, rows):
+        tables = read_tables(query)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tables, rows)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+                CACHE_EVICTIONS.inc(labels=('lru',))
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that reads from any of the given tables"""
+        with self._lock:
+            for table in tables:
+                for key in self._by_table.pop(table, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+                        CACHE_EVICTIONS.inc(labels=('write',))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def _remove(self, key):
+        """Remove one entry and its table tags (caller holds the lock)"""
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """Counters as a dictionary"""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4),
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
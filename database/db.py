@@ -3,99 +3,713 @@ Database Operations for Ishuri-Connect
 Demonstrates: MySQL connections, CRUD operations, Functions, Error handling
 """
 
-import mysql.connector
-from mysql.connector import Error
+from contextlib import contextmanager
 from typing import Optional, List, Dict, Any
+import hashlib
 import os
-from dotenv import load_dotenv
+import sys
+import threading
+import time
+import weakref
 from src.models import Student, School, Application
+from src.utils import parse_fees_range
+from src.catalog import SnapshotError, load_snapshot, write_snapshot
+from src.admissions import admission_counts, aggregate_bucket, intake_of, status_key
+from database.instrumentation import query_stats
+from database.resilience import backoff_delays, breaker_for, LastGoodReads
+from database.sql_text import read_tables, written_tables
+from database.cache import QueryCache
+from src.metrics import registry
 
-# Load environment variables
-load_dotenv()
+_mysql_connector = None
+_environment_loaded = False
+
+
+def mysql_connector():
+    """
+    Import mysql.connector on first use
+    It is by far the slowest import of the app and the menu can render without it.
+    """
+    global _mysql_connector
+    if _mysql_connector is None:
+        import mysql.connector
+        _mysql_connector = mysql.connector
+    return _mysql_connector
+
+
+def load_environment():
+    """Load environment variables from .env once, when the first Database is created"""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
+# How long a replica that failed is skipped before it is tried again
+REPLICA_RETRY_SECONDS = 30
+
+# Catalog reads are remembered and served while the database is unavailable
+CATALOG_TABLES = frozenset({'schools', 'programs'})
+
+# MySQL client/server error numbers that mean "server unreachable or too slow"
+UNAVAILABLE_ERRNOS = {2003, 2006, 2013, 2055, 3024}
+# "Duplicate entry ... for key" - e.g. two registrations of one email at once
+DUPLICATE_KEY_ERRNO = 1062
+# "Cannot add or update a child row: a foreign key constraint fails"
+FOREIGN_KEY_ERRNO = 1452
+
+# Tables and columns added after the original schema - applied by
+# `python main.py migrate` (db.migrate()), and safe to run again
+SCHEMA_UPGRADES = [
+    """
+    CREATE TABLE IF NOT EXISTS student_marks (
+        student_id INT NOT NULL,
+        subject VARCHAR(50) NOT NULL,
+        mark DECIMAL(5,2) NOT NULL,
+        PRIMARY KEY (student_id, subject),
+        INDEX idx_student_marks_subject (subject, mark),
+        FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+    )
+    """,
+    # Numeric fees parsed from programs.fees_range, for budget searches
+    "ALTER TABLE programs ADD COLUMN fees_min INT NULL",
+    "ALTER TABLE programs ADD COLUMN fees_max INT NULL",
+    "CREATE INDEX idx_programs_fees ON programs (fees_max, duration_years)",
+    # Applications counted per school, intake, status and whole aggregate percent
+    """
+    CREATE TABLE IF NOT EXISTS admission_stats (
+        school_id INT NOT NULL,
+        intake SMALLINT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        bucket TINYINT UNSIGNED NOT NULL,
+        applicants INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (school_id, intake, status, bucket),
+        FOREIGN KEY (school_id) REFERENCES schools(id) ON DELETE CASCADE
+    )
+    """
+]
+# "Duplicate column name" / "Duplicate key name": that upgrade already ran
+ALREADY_APPLIED_ERRNOS = {1060, 1061}
+# (host, port, database) -> (admission_stats exists, monotonic time checked)
+_admission_stats_checked = {}
+ADMISSION_STATS_RECHECK_SECONDS = 60
+
+# One application with what admission_stats counts it by
+ADMISSION_SOURCE = """
+SELECT a.school_id, a.status, a.applied_at, st.aggregate_marks
+FROM applications a
+JOIN students st ON a.student_id = st.id
+"""
+ADMISSION_UPSERT = """
+INSERT INTO admission_stats (school_id, intake, status, bucket, applicants)
+VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE applicants = applicants + VALUES(applicants)
+"""
+
+# Rows per IN (...) list when reading marks for many students
+MARKS_CHUNK_SIZE = 1000
+
+
+def parse_replicas(value, default_port=3306):
+    """
+    Parse DB_REPLICAS ("host1:3307,host2") into a list of (host, port) tuples
+    """
+    replicas = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        replicas.append((host, int(port) if port else default_port))
+    return replicas
+
+
+# Every Database object, for the open-connections gauge
+_databases = weakref.WeakSet()
+
+
+def open_connection_count():
+    return sum((db.connection is not None) + len(db.replica_connections) for db in list(_databases))
+
+
+registry.gauge('ishuri_db_connections', 'Open MySQL connections (primary and replicas)',
+               function=open_connection_count)
+
+
+class DatabaseError(Exception):
+    """
+    Raised when a statement fails inside db.transaction() so the block rolls back
+    errno is the MySQL error number when there is one (e.g. DUPLICATE_KEY_ERRNO).
+    """
+    
+    def __init__(self, message, errno=None):
+        super().__init__(message)
+        self.errno = errno
 
 
 class Database:
     """Database class - handles all MySQL operations"""
     
-    def __init__(self):
-        """Initialize database connection parameters"""
+    def __init__(self, replicas=None, sticky_seconds=None, stats=None, cache=None):
+        """
+        Initialize database connection parameters
+        
+        replicas: optional list of (host, port) read replicas; defaults to DB_REPLICAS.
+        sticky_seconds: after a write, reads stay on the primary this long so the
+                        session always sees its own writes (read-your-writes).
+        stats: QueryStats collecting per-query timings (shared process-wide by default)
+        cache: optional QueryCache for fetch_query results; built from DB_CACHE_SIZE
+               and DB_CACHE_TTL when not given (disabled when DB_CACHE_SIZE is 0)
+        """
+        load_environment()
         self.host = os.getenv('DB_HOST', 'localhost')
+        self.port = int(os.getenv('DB_PORT', 3306))
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', '')
         self.database = os.getenv('DB_NAME', 'ishuri_connect')
         self.connection: Optional[Any] = None
+        
+        # Read replicas - fetch_query is routed here when it is safe to do so
+        if replicas is None:
+            replicas = parse_replicas(os.getenv('DB_REPLICAS'), self.port)
+        self.replicas = list(replicas)
+        if sticky_seconds is None:
+            sticky_seconds = float(os.getenv('DB_STICKY_SECONDS', 5))
+        self.sticky_seconds = sticky_seconds
+        self.replica_connections: Dict[int, Any] = {}
+        self._replica_down_until: Dict[int, float] = {}
+        self._next_replica = 0
+        self._last_write_at = None
+        self._primary_reads = 0  # depth of reads_from_primary() blocks
+        
+        # Query timings, round trips and slow-query log
+        self.stats = stats if stats is not None else query_stats
+        
+        # Timeouts, bounded retries and a circuit breaker shared per server
+        self.connect_timeout = int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+        self.query_timeout_ms = int(os.getenv('DB_QUERY_TIMEOUT_MS', 10000))
+        self.connect_attempts = int(os.getenv('DB_CONNECT_ATTEMPTS', 3))
+        self.breaker = breaker_for(
+            self.host, self.port,
+            failure_threshold=int(os.getenv('DB_BREAKER_THRESHOLD', 5)),
+            reset_seconds=float(os.getenv('DB_BREAKER_RESET_SECONDS', 30))
+        )
+        self.last_good_reads = LastGoodReads()
+        
+        # Optional result cache, invalidated by table on every write
+        if cache is None:
+            cache_size = int(os.getenv('DB_CACHE_SIZE', 0))
+            if cache_size > 0:
+                cache = QueryCache(cache_size, float(os.getenv('DB_CACHE_TTL', 60)))
+        self.cache = cache
+        
+        # Memory-mapped catalog snapshot (see load_catalog_snapshot)
+        self.catalog_snapshot = None
+        
+        # Background connection started by connect_in_background()
+        self._connecting: Optional[threading.Thread] = None
+        
+        _databases.add(self)
+        
+        # Transaction state - commits are deferred while depth > 0
+        self._transaction_depth = 0
+        self._savepoint_counter = 0
+        self._transaction_tables = set()
+    
+    def _open_connection(self, host, port, autocommit=False):
+        """
+        Open a new MySQL connection to the given server
+        Connect and socket timeouts keep a stalled server from blocking forever;
+        max_execution_time makes the server abort SELECTs that run too long.
+        """
+        options = {
+            'host': host,
+            'port': port,
+            'user': self.user,
+            'password': self.password,
+            'database': self.database,
+            'autocommit': autocommit,
+            'connection_timeout': self.connect_timeout
+        }
+        if self.query_timeout_ms:
+            # Socket timeouts a little above the server-side limit
+            socket_timeout = self.query_timeout_ms // 1000 + 2
+            options['read_timeout'] = socket_timeout
+            options['write_timeout'] = socket_timeout
+        connection = mysql_connector().connect(**options)
+        
+        if self.query_timeout_ms:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SET SESSION max_execution_time = %s", (self.query_timeout_ms,))
+            finally:
+                cursor.close()
+        return connection
     
     def connect(self):
         """Establish database connection - demonstrates function"""
-        try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                autocommit=False
-            )
-            if self.connection.is_connected():
-                return True
-        except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+        if not self.breaker.allow_request():
+            print("Error connecting to MySQL: database marked unavailable, retrying later")
+            return False
+        return self._connect_with_retry()
+    
+    def clone(self):
+        """
+        A second Database for another thread (a MySQL connection is not thread-safe)
+        Shares stats, result cache, breaker, last good reads and the catalog
+        snapshot with this one; call connect() on it before use.
+        """
+        other = Database(replicas=self.replicas, sticky_seconds=self.sticky_seconds,
+                         stats=self.stats, cache=self.cache)
+        other.last_good_reads = self.last_good_reads
+        other.catalog_snapshot = self.catalog_snapshot
+        return other
+    
+    def connect_in_background(self, then=None):
+        """
+        Connect on a background thread so the menu can render meanwhile
+        `then` (optional) runs on that thread after a successful connect, e.g. to
+        verify the catalog snapshot. Queries wait for all of it to finish.
+        """
+        def run():
+            if self.connect() and then is not None:
+                then()
+        
+        self._connecting = threading.Thread(target=run, name='db-connect', daemon=True)
+        self._connecting.start()
+    
+    def wait_until_connected(self, timeout=None):
+        """Block until a background connect has finished; True when connected"""
+        thread = self._connecting
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if not thread.is_alive():
+                self._connecting = None
+        return self.connection is not None and self.connection.is_connected()
+    
+    def _connect_with_retry(self):
+        """Try to connect a bounded number of times with jittered backoff"""
+        last_error = None
+        for delay in backoff_delays(self.connect_attempts) + [None]:
+            try:
+                self.connection = self._open_connection(self.host, self.port)
+                if self.connection.is_connected():
+                    self.breaker.record_success()
+                    return True
+            except mysql_connector().Error as e:
+                last_error = e
+            if delay is not None:
+                time.sleep(delay)
+        
+        self.breaker.record_failure()
+        print(f"Error connecting to MySQL: {last_error}")
+        return False
+    
+    def migrate(self):
+        """
+        Apply SCHEMA_UPGRADES and fill the new columns and tables from existing rows
+        Run explicitly (`python main.py migrate`) - connect() never changes the schema.
+        Returns True when every upgrade applied (or had already been applied).
+        """
+        if self.connection is None or not self.connection.is_connected():
+            print("Error upgrading schema: MySQL Connection not available.")
             return False
+        ok = True
+        cursor = self.connection.cursor()
+        try:
+            for statement in SCHEMA_UPGRADES:
+                try:
+                    cursor.execute(statement)
+                except mysql_connector().Error as e:
+                    if getattr(e, 'errno', None) not in ALREADY_APPLIED_ERRNOS:
+                        print(f"Error upgrading schema: {e}")
+                        ok = False
+            self._backfill_program_fees(cursor)
+            self._backfill_admission_stats(cursor)
+        except mysql_connector().Error as e:
+            print(f"Error upgrading schema: {e}")
+            ok = False
+        finally:
+            cursor.close()
+        _admission_stats_checked.pop((self.host, self.port, self.database), None)
+        if self.cache is not None:
+            self.cache.invalidate_tables({'programs', 'admission_stats'})
+        return ok
+    
+    def _backfill_program_fees(self, cursor):
+        """Fill fees_min/fees_max for programs written before those columns existed"""
+        cursor.execute("SELECT id, fees_range FROM programs WHERE fees_max IS NULL AND fees_range IS NOT NULL")
+        updates = []
+        for program_id, fees_range in cursor.fetchall():
+            fees_min, fees_max = parse_fees_range(fees_range)
+            if fees_max is not None:
+                updates.append((fees_min, fees_max, program_id))
+        if updates:
+            cursor.executemany("UPDATE programs SET fees_min = %s, fees_max = %s WHERE id = %s", updates)
+        self.connection.commit()
+    
+    def _backfill_admission_stats(self, cursor):
+        """Count applications made before admission_stats existed (only while it is empty)"""
+        cursor.execute("SELECT COUNT(*) FROM admission_stats")
+        if cursor.fetchall()[0][0]:
+            return
+        cursor.execute(ADMISSION_SOURCE)
+        rows = admission_counts(dict(zip(('school_id', 'status', 'applied_at', 'aggregate_marks'), row))
+                                for row in cursor.fetchall())
+        if rows:
+            cursor.executemany(ADMISSION_UPSERT, rows)
+        self.connection.commit()
+    
+    @staticmethod
+    def _is_unavailable(error):
+        """True for errors that mean the server is unreachable or too slow (not a bad query)"""
+        return (isinstance(error, (mysql_connector().errors.OperationalError,
+                                   mysql_connector().errors.InterfaceError))
+                or getattr(error, 'errno', None) in UNAVAILABLE_ERRNOS)
+    
+    def _record_outcome(self, error=None):
+        """Feed the circuit breaker: only availability problems count as failures"""
+        if error is not None and self._is_unavailable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
     
     def disconnect(self):
-        """Close database connection"""
+        """Close database connection (primary and replicas)"""
         if self.connection and self.connection.is_connected():
             self.connection.close()
+        self.connection = None
+        for connection in self.replica_connections.values():
+            try:
+                if connection.is_connected():
+                    connection.close()
+            except mysql_connector().Error:
+                pass
+        self.replica_connections.clear()
+    
+    # ==================== READ ROUTING ====================
+    
+    @contextmanager
+    def reads_from_primary(self, enabled=True):
+        """
+        Send the reads inside the block to the primary, e.g. when another session
+        (another clone) has just written what they read
+        """
+        if not enabled:
+            yield self
+            return
+        self._primary_reads += 1
+        try:
+            yield self
+        finally:
+            self._primary_reads -= 1
+    
+    def _reads_pinned_to_primary(self):
+        """
+        Reads go to the primary when there are no replicas, inside a transaction,
+        inside reads_from_primary(), or shortly after this session wrote something
+        (replicas may lag behind).
+        """
+        if not self.replicas or self.in_transaction or self._primary_reads:
+            return True
+        if self._last_write_at is None:
+            return False
+        return time.monotonic() - self._last_write_at < self.sticky_seconds
+    
+    def _mark_replica_down(self, index, error):
+        """Skip a failing replica for a while and drop its connection"""
+        print(f"Replica {self.replicas[index][0]}:{self.replicas[index][1]} unavailable: {error}")
+        self._replica_down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+        connection = self.replica_connections.pop(index, None)
+        if connection is not None:
+            try:
+                connection.close()
+            except mysql_connector().Error:
+                pass
+    
+    def _replica_order(self):
+        """Healthy replica indexes in round-robin order"""
+        count = len(self.replicas)
+        start = self._next_replica % count
+        self._next_replica += 1
+        now = time.monotonic()
+        order = []
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._replica_down_until.get(index, 0) <= now:
+                order.append(index)
+        return order
+    
+    def _replica_connection(self, index):
+        """Return a live connection to a replica, opening it on first use"""
+        connection = self.replica_connections.get(index)
+        if connection is None or not connection.is_connected():
+            host, port = self.replicas[index]
+            # Replicas are read-only: autocommit so each read sees a fresh snapshot
+            connection = self._open_connection(host, port, autocommit=True)
+            self.replica_connections[index] = connection
+        return connection
+    
+    def _fetch_on(self, connection, query, params=None):
+        """Run a SELECT on a specific connection and return all rows as dicts"""
+        cursor = connection.cursor(dictionary=True)
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return cursor.fetchall()  # Returns list of dictionaries
+        finally:
+            cursor.close()
+    
+    @property
+    def in_transaction(self):
+        """True while inside a db.transaction() block"""
+        return self._transaction_depth > 0
+    
+    def _run_statement(self, statement):
+        """Run a control statement (SAVEPOINT, ROLLBACK TO ...) without committing"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several statements into a single commit
+        Nested blocks become SAVEPOINTs, so a failing inner block only undoes its own work.
+        
+            with db.transaction():
+                db.insert_student(student)
+                db.insert_application(application)
+        
+        Any exception rolls back the block and is re-raised.
+        """
+        if self._transaction_depth == 0:
+            if self._connecting is not None:
+                self.wait_until_connected()
+            if self.connection is None or not self.connection.is_connected():
+                if not self.connect():
+                    raise DatabaseError("MySQL Connection not available.")
+            
+            self._transaction_depth = 1
+            try:
+                yield self
+                self.connection.commit()
+                self._last_write_at = time.monotonic()
+            except BaseException:
+                try:
+                    self.connection.rollback()
+                except mysql_connector().Error as e:
+                    print(f"Error rolling back transaction: {e}")
+                raise
+            finally:
+                self._transaction_depth = 0
+                # Other sessions may have cached pre-commit rows meanwhile
+                if self.cache is not None and self._transaction_tables:
+                    self.cache.invalidate_tables(self._transaction_tables)
+                self._transaction_tables.clear()
+            return
+        
+        # Nested block - use a savepoint inside the outer transaction
+        self._savepoint_counter += 1
+        savepoint = f"sp_{self._savepoint_counter}"
+        self._run_statement(f"SAVEPOINT {savepoint}")
+        self._transaction_depth += 1
+        try:
+            yield self
+            self._run_statement(f"RELEASE SAVEPOINT {savepoint}")
+        except BaseException:
+            self._run_statement(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        finally:
+            self._transaction_depth -= 1
     
     def execute_query(self, query, params=None):
         """
         Execute a query (INSERT, UPDATE, DELETE)
         Demonstrates: function with parameters, tuple usage
+        
+        Commits immediately, unless called inside db.transaction() where the
+        commit is deferred to the end of the block and errors are raised.
+        The calling method and wall time are recorded in self.stats.
         """
+        method = sys._getframe(1).f_code.co_name
+        return self._timed_execute(method, query, params)
+    
+    def execute_many(self, query, params_list):
+        """
+        Execute one statement for many parameter tuples in a single round trip
+        (mysql-connector batches INSERT ... VALUES into one multi-row statement).
+        Returns the number of affected rows, or None on failure.
+        """
+        if not params_list:
+            return 0
+        method = sys._getframe(1).f_code.co_name
+        return self._timed_execute(method, query, params_list, many=True)
+    
+    def _timed_execute(self, method, query, params, many=False):
+        """Run a write, record its timing and evict cached reads of the written table"""
+        start = time.perf_counter()
+        result = None
         try:
-            # Reconnect if connection is lost
+            result = self._execute(query, params, many)
+            return result
+        finally:
+            self.stats.record(method, query, time.perf_counter() - start,
+                              rows=result if many and result else 0, error=result is None)
+            tables = written_tables(query)
+            if tables & CATALOG_TABLES:
+                self.catalog_snapshot = None  # stale now - fall back to live queries
+            if self.cache is not None and tables:
+                self.cache.invalidate_tables(tables)
+                if self.in_transaction:
+                    self._transaction_tables.update(tables)
+    
+    def _execute(self, query, params=None, many=False):
+        """
+        Run a write statement
+        Returns lastrowid/True (or the affected row count when many=True), None on failure
+        """
+        if not self.breaker.allow_request():
+            message = "Database unavailable (circuit breaker open)"
+            if self.in_transaction:
+                raise DatabaseError(message)
+            print(f"Error executing query: {message}")
+            return None
+        
+        if self._connecting is not None:
+            self.wait_until_connected()
+        
+        cursor = None
+        try:
+            # Reconnect if connection is lost (never mid-transaction - the work would be lost)
             if self.connection is None or not self.connection.is_connected():
-                if not self.connect():
+                if self.in_transaction:
+                    self.breaker.record_failure()
+                    raise DatabaseError("MySQL Connection lost during transaction.")
+                if not self._connect_with_retry():
                     print(f"Error: MySQL Connection not available.")
                     return None
             
             cursor = self.connection.cursor()
-            if params:
+            if many:
+                cursor.executemany(query, params)
+            elif params:
                 cursor.execute(query, params)  # Using tuple for params
             else:
                 cursor.execute(query)
-            self.connection.commit()
+            if not self.in_transaction:
+                self.connection.commit()
+            self._record_outcome()
+            self._last_write_at = time.monotonic()
+            if many:
+                return cursor.rowcount
             return cursor.lastrowid if cursor.lastrowid else True
-        except Error as e:
+        except mysql_connector().Error as e:
+            self._record_outcome(e)
+            if self.in_transaction:
+                raise DatabaseError(f"Error executing query: {e}", getattr(e, 'errno', None)) from e
             print(f"Error executing query: {e}")
+            try:
+                self.connection.rollback()
+            except mysql_connector().Error:
+                pass
             return None
         finally:
-            cursor.close()
+            if cursor is not None:
+                cursor.close()
     
-    def fetch_query(self, query, params=None) -> List[Dict[str, Any]]:
+    def fetch_query(self, query, params=None, use_cache=True, method=None) -> List[Dict[str, Any]]:
         """
         Fetch data from database
         Demonstrates: function returning lists/tuples
+        
+        Served by a read replica when one is configured and the session has not
+        written recently; falls back to the primary if every replica fails.
+        The calling method (or `method`), wall time and row count are recorded in self.stats.
+        With a cache configured, repeated reads are answered without a round trip
+        (never inside a transaction). Cached rows are shared - do not modify them.
+        Pass use_cache=False for one-off bulk reads that would only flood the cache.
+        """
+        method = method or sys._getframe(1).f_code.co_name
+        start = time.perf_counter()
+        
+        cache_key = None
+        if use_cache and self.cache is not None and not self.in_transaction:
+            cache_key = QueryCache.make_key(query, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.stats.record(method, query, time.perf_counter() - start,
+                                  len(cached), cached=True)
+                return cached
+        
+        results = self._fetch(query, params)
+        elapsed = time.perf_counter() - start
+        if results is None:
+            self.stats.record(method, query, elapsed, error=True)
+            return []
+        self.stats.record(method, query, elapsed, len(results))
+        if cache_key is not None:
+            self.cache.put(cache_key, query, results)
+        return results
+    
+    def _fetch(self, query, params=None):
+        """
+        Route a SELECT to a replica or the primary; returns rows, or None on failure
+        Catalog reads fall back to the last good result while the database is down.
         """
+        if self._connecting is not None:
+            self.wait_until_connected()
+        
+        catalog_key = None
+        tables = read_tables(query)
+        if tables and tables <= CATALOG_TABLES:
+            catalog_key = (query, tuple(params) if params else None)
+        
+        if not self._reads_pinned_to_primary():
+            for index in self._replica_order():
+                try:
+                    results = self._fetch_on(self._replica_connection(index), query, params)
+                except mysql_connector().Error as e:
+                    if not self._is_unavailable(e):
+                        # A bad query fails on every server - the replica is fine
+                        print(f"Error fetching data: {e}")
+                        return self.last_good_reads.get(catalog_key) if catalog_key else None
+                    self._mark_replica_down(index, e)
+                    continue
+                if catalog_key:
+                    self.last_good_reads.remember(catalog_key, results)
+                return results
+        
+        if not self.breaker.allow_request():
+            # Fail fast - serve the cached catalog if we have it
+            if catalog_key:
+                cached = self.last_good_reads.get(catalog_key)
+                if cached is not None:
+                    return cached
+            print("Error fetching data: database unavailable (circuit breaker open)")
+            return None
+        
         try:
             # Reconnect if connection is lost
             if self.connection is None or not self.connection.is_connected():
-                if not self.connect():
+                if not self._connect_with_retry():
                     print(f"Error fetching data: MySQL Connection not available.")
-                    return []
+                    return self.last_good_reads.get(catalog_key) if catalog_key else None
             
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            results = cursor.fetchall()  # Returns list of dictionaries
-            return results  # type: ignore
-        except Error as e:
+            results = self._fetch_on(self.connection, query, params)
+            self._record_outcome()
+        except mysql_connector().Error as e:
+            self._record_outcome(e)
             print(f"Error fetching data: {e}")
-            return []
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
+            return self.last_good_reads.get(catalog_key) if catalog_key else None
+        
+        if catalog_key:
+            self.last_good_reads.remember(catalog_key, results)
+        return results
     
     # ==================== STUDENT OPERATIONS ====================
     
@@ -121,9 +735,57 @@ class Database:
         student_id = self.execute_query(query, params)
         if student_id:
             student.student_id = student_id
+            if student.marks:
+                self.insert_student_marks(student_id, student.subject_marks())
             return student_id
         return None
     
+    def insert_students_bulk(self, students):
+        """
+        Insert many students in one batched statement (used by the CSV import)
+        Returns the number of rows inserted, or None on failure.
+        Per-subject marks are written in a second batch, in the same transaction.
+        """
+        query = """
+        INSERT INTO students (first_name, last_name, email, average_mark, aggregate_marks,
+                             secondary_school, subject_combination, location_from,
+                             preferred_location, desired_program, preferred_boarding)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        params_list = [
+            (student.first_name, student.last_name, student.email,
+             student.average_mark, student.aggregate_marks,
+             student.secondary_school, student.subject_combination,
+             student.location_from, student.preferred_location,
+             student.desired_program, student.preferred_boarding)
+            for student in students
+        ]
+        if not any(student.marks for student in students):
+            return self.execute_many(query, params_list)
+        with self.transaction():
+            inserted = self.execute_many(query, params_list)
+            self._insert_bulk_marks(students)
+        return inserted
+    
+    def _insert_bulk_marks(self, students):
+        """Marks of freshly bulk-inserted students (ids looked up by email in one query)"""
+        emails = [student.email for student in students if student.marks]
+        query = f"SELECT id, email FROM students WHERE email IN ({', '.join(['%s'] * len(emails))})"
+        ids = {row['email'].lower(): row['id'] for row in self.fetch_query(query, tuple(emails), use_cache=False)}
+        rows = []
+        for student in students:
+            student_id = ids.get(student.email.lower())
+            if student.marks and student_id:
+                student.student_id = student_id
+                rows.extend((student_id, subject, mark) for subject, mark in student.subject_marks().items())
+        return self.insert_marks_bulk(rows)
+    
+    def get_all_student_emails(self):
+        """All registered emails, lower-cased, as a set (for duplicate checks in bulk)"""
+        # One-off bulk read - caching every email would only flood the cache
+        results = self.fetch_query("SELECT email FROM students", use_cache=False)
+        return {row['email'].lower() for row in results if row['email']}
+    
     def get_student_by_id(self, student_id):
         """
         Get student by ID - demonstrates SELECT operation
@@ -134,7 +796,7 @@ class Database:
         
         if results:
             data = results[0]  # Getting first element from list
-            return Student(
+            student = Student(
                 first_name=data['first_name'],
                 last_name=data['last_name'],
                 email=data['email'],
@@ -147,6 +809,8 @@ class Database:
                 desired_program=data.get('desired_program'),
                 preferred_boarding=data.get('preferred_boarding', 'no_preference')
             )
+            self._attach_marks([student])
+            return student
         return None
     
     def get_student_by_email(self, email):
@@ -156,7 +820,7 @@ class Database:
         
         if results:
             data = results[0]
-            return Student(
+            student = Student(
                 first_name=data['first_name'],
                 last_name=data['last_name'],
                 email=data['email'],
@@ -169,6 +833,8 @@ class Database:
                 desired_program=data.get('desired_program'),
                 preferred_boarding=data.get('preferred_boarding', 'no_preference')
             )
+            self._attach_marks([student])
+            return student
         return None
     
     def get_all_students(self):
@@ -196,6 +862,7 @@ class Database:
             )
             students.append(student)
         
+        self._attach_marks(students, all_students=True)
         return students
     
     def update_student(self, student):
@@ -214,6 +881,62 @@ class Database:
         query = "DELETE FROM students WHERE id = %s"
         return self.execute_query(query, (student_id,))
     
+    # ==================== MARKS OPERATIONS ====================
+    
+    def insert_student_marks(self, student_id, subject_marks):
+        """Store (or replace) one student's marks - subject_marks is {subject: mark}"""
+        return self.insert_marks_bulk([(student_id, subject, mark) for subject, mark in subject_marks.items()])
+    
+    def insert_marks_bulk(self, rows):
+        """
+        Store many (student_id, subject, mark) rows in one batched statement
+        Existing marks for the same student and subject are replaced.
+        """
+        query = """
+        INSERT INTO student_marks (student_id, subject, mark)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE mark = VALUES(mark)
+        """
+        return self.execute_many(query, rows)
+    
+    def get_marks_by_students(self, student_ids):
+        """
+        Marks of many students as {student_id: {subject: mark}}
+        One query per MARKS_CHUNK_SIZE students instead of one per student.
+        """
+        student_ids = list(student_ids)
+        marks = {}
+        for start in range(0, len(student_ids), MARKS_CHUNK_SIZE):
+            chunk = student_ids[start:start + MARKS_CHUNK_SIZE]
+            query = f"""
+            SELECT student_id, subject, mark FROM student_marks
+            WHERE student_id IN ({', '.join(['%s'] * len(chunk))})
+            """
+            # Single-student reads (logins) may be cached; cohort reads would only flood the cache
+            for row in self.fetch_query(query, tuple(chunk), use_cache=len(student_ids) == 1):
+                marks.setdefault(row['student_id'], {})[row['subject']] = float(row['mark'])
+        return marks
+    
+    def get_all_marks(self):
+        """Every stored mark as {student_id: {subject: mark}} (whole cohort at once)"""
+        marks = {}
+        for row in self.fetch_query("SELECT student_id, subject, mark FROM student_marks", use_cache=False):
+            marks.setdefault(row['student_id'], {})[row['subject']] = float(row['mark'])
+        return marks
+    
+    def _attach_marks(self, students, all_students=False):
+        """Fill in Student.marks / subjects from the marks table (batched like _attach_programs)"""
+        if not students:
+            return
+        if all_students:
+            marks = self.get_all_marks()
+        else:
+            marks = self.get_marks_by_students([student.student_id for student in students])
+        for student in students:
+            subject_marks = marks.get(student.student_id)
+            if subject_marks:
+                student.set_subject_marks(subject_marks)
+    
     # ==================== SCHOOL OPERATIONS ====================
     
     def insert_school(self, school):
@@ -248,27 +971,7 @@ class Database:
         results = self.fetch_query(query, (school_id,))
         
         if results:
-            data = results[0]
-            
-            # Parse comma-separated strings to lists
-            required_subj = data.get('required_subjects', '').split(',') if data.get('required_subjects') else []
-            competencies = data.get('competencies_needed', '').split(',') if data.get('competencies_needed') else []
-            
-            school = School(
-                name=data['name'],
-                district=data.get('district'),
-                province=data.get('province'),
-                school_type=data.get('school_type', 'private'),
-                min_aggregate=float(data['min_aggregate']),
-                min_cutoff=float(data.get('min_cutoff', data['min_aggregate'])),
-                max_cutoff=float(data.get('max_cutoff', data['min_aggregate'])),
-                boarding_type=data.get('boarding', 'day'),
-                required_subjects=required_subj,
-                competencies_needed=competencies,
-                contact_email=data.get('contact_email'),
-                website=data.get('website'),
-                school_id=data['id']
-            )
+            school = self._school_from_row(results[0])  # Getting first element from list
             
             # Load programs for this school
             school.programs = self.get_programs_by_school(school_id)
@@ -280,37 +983,18 @@ class Database:
         """
         Get all schools with comprehensive data
         Returns: list of School objects
+        
+        Served from the catalog snapshot when one is loaded (no query at all);
+        otherwise two queries - schools, then every program at once.
         """
+        if self.catalog_snapshot is not None:
+            return self.catalog_snapshot.schools()
+        
         query = "SELECT * FROM schools ORDER BY name"
         results = self.fetch_query(query)
         
-        schools = []
-        for data in results:
-            # Parse comma-separated strings to lists
-            required_subj = data.get('required_subjects', '').split(',') if data.get('required_subjects') else []
-            competencies = data.get('competencies_needed', '').split(',') if data.get('competencies_needed') else []
-            
-            school = School(
-                name=data['name'],
-                district=data.get('district'),
-                province=data.get('province'),
-                school_type=data.get('school_type', 'private'),
-                min_aggregate=float(data['min_aggregate']),
-                min_cutoff=float(data.get('min_cutoff', data['min_aggregate'])),
-                max_cutoff=float(data.get('max_cutoff', data['min_aggregate'])),
-                boarding_type=data.get('boarding', 'day'),
-                required_subjects=required_subj,
-                competencies_needed=competencies,
-                contact_email=data.get('contact_email'),
-                website=data.get('website'),
-                school_id=data['id']
-            )
-            
-            # Load programs for this school
-            school.programs = self.get_programs_by_school(data['id'])
-            
-            schools.append(school)
-        
+        schools = [self._school_from_row(data) for data in results]
+        self._attach_programs(schools, all_programs=True)
         return schools
     
     def get_schools_by_min_mark(self, min_mark):
@@ -321,40 +1005,116 @@ class Database:
         query = "SELECT * FROM schools WHERE min_cutoff <= %s ORDER BY min_cutoff DESC"
         results = self.fetch_query(query, (min_mark,))
         
-        schools = []
-        for data in results:
-            required_subj = data.get('required_subjects', '').split(',') if data.get('required_subjects') else []
-            competencies = data.get('competencies_needed', '').split(',') if data.get('competencies_needed') else []
-            
-            school = School(
-                name=data['name'],
-                district=data.get('district'),
-                province=data.get('province'),
-                school_type=data.get('school_type', 'private'),
-                min_aggregate=float(data['min_aggregate']),
-                min_cutoff=float(data.get('min_cutoff', data['min_aggregate'])),
-                max_cutoff=float(data.get('max_cutoff', data['min_aggregate'])),
-                boarding_type=data.get('boarding', 'day'),
-                required_subjects=required_subj,
-                competencies_needed=competencies,
-                contact_email=data.get('contact_email'),
-                website=data.get('website'),
-                school_id=data['id']
-            )
-            school.programs = self.get_programs_by_school(data['id'])
-            schools.append(school)
-        
+        schools = [self._school_from_row(data) for data in results]
+        self._attach_programs(schools)
         return schools
     
+    def _school_from_row(self, data):
+        """Build a School object from a schools table row"""
+        # Parse comma-separated strings to lists
+        required_subj = data.get('required_subjects', '').split(',') if data.get('required_subjects') else []
+        competencies = data.get('competencies_needed', '').split(',') if data.get('competencies_needed') else []
+        
+        return School(
+            name=data['name'],
+            district=data.get('district'),
+            province=data.get('province'),
+            school_type=data.get('school_type', 'private'),
+            min_aggregate=float(data['min_aggregate']),
+            min_cutoff=float(data.get('min_cutoff', data['min_aggregate'])),
+            max_cutoff=float(data.get('max_cutoff', data['min_aggregate'])),
+            boarding_type=data.get('boarding', 'day'),
+            required_subjects=required_subj,
+            competencies_needed=competencies,
+            contact_email=data.get('contact_email'),
+            website=data.get('website'),
+            school_id=data['id']
+        )
+    
+    def _attach_programs(self, schools, all_programs=False):
+        """
+        Load programs for many schools in one query instead of one per school (N+1)
+        all_programs=True fetches the whole programs table (for the full catalog).
+        """
+        if not schools:
+            return
+        if all_programs:
+            query = "SELECT * FROM programs ORDER BY school_id, cutoff_marks DESC"
+            rows = self.fetch_query(query)
+        else:
+            school_ids = [school.school_id for school in schools]
+            query = f"""
+            SELECT * FROM programs WHERE school_id IN ({', '.join(['%s'] * len(school_ids))})
+            ORDER BY school_id, cutoff_marks DESC
+            """
+            rows = self.fetch_query(query, tuple(school_ids))
+        
+        programs_by_school = {}
+        for row in rows:
+            programs_by_school.setdefault(row['school_id'], []).append(row)
+        for school in schools:
+            school.programs = programs_by_school.get(school.school_id, [])
+    
+    # ==================== CATALOG SNAPSHOT ====================
+    
+    def get_catalog_version(self):
+        """
+        Identify the current state of the schools and programs tables
+        Any insert/update/delete changes the table checksums and thus the version.
+        """
+        results = self.fetch_query("CHECKSUM TABLE schools, programs", use_cache=False)
+        if not results:
+            return None
+        parts = [f"{row.get('Table')}={row.get('Checksum')}" for row in results]
+        return hashlib.sha1(';'.join(parts).encode('utf-8')).hexdigest()[:32]
+    
+    def write_catalog_snapshot(self, path):
+        """Write the full catalog from MySQL to a snapshot file; returns its version"""
+        snapshot, self.catalog_snapshot = self.catalog_snapshot, None
+        try:
+            version = self.get_catalog_version()
+            schools = self.get_all_schools()
+        finally:
+            self.catalog_snapshot = snapshot
+        if version is None or not schools:
+            return None
+        if snapshot is not None:
+            snapshot.release()  # it may map the file we are about to replace
+        try:
+            write_snapshot(path, schools, version)
+        except SnapshotError as e:
+            print(f"Error writing catalog snapshot: {e}")
+            return None
+        return version
+    
+    def load_catalog_snapshot(self, path, check_version=True):
+        """
+        Serve get_all_schools from a memory-mapped snapshot file
+        With check_version, the snapshot is compared with the live catalog and
+        rebuilt when it is missing or stale. Returns True when a snapshot is in use.
+        """
+        expected = self.get_catalog_version() if check_version else None
+        snapshot = load_snapshot(path, expected)
+        if snapshot is None and check_version and expected is not None:
+            if self.write_catalog_snapshot(path):
+                snapshot = load_snapshot(path)
+        previous, self.catalog_snapshot = self.catalog_snapshot, snapshot
+        if previous is not None:
+            previous.release()  # other clones may still hold it
+        return snapshot is not None
+    
     # ==================== PROGRAM OPERATIONS ====================
     
     def insert_program(self, program_data):
         """Insert a new program for a school"""
         query = """
         INSERT INTO programs (school_id, program_name, program_code, cutoff_marks,
-                            required_combination, duration_years, fees_range, description)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                            required_combination, duration_years, fees_range, description,
+                            fees_min, fees_max)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
+        # Numeric fees for budget searches, parsed once here instead of on every search
+        fees_min, fees_max = parse_fees_range(program_data.get('fees_range'))
         params = (
             program_data.get('school_id'),
             program_data.get('program_name'),
@@ -363,10 +1123,24 @@ class Database:
             program_data.get('required_combination'),
             program_data.get('duration_years', 4),
             program_data.get('fees_range'),
-            program_data.get('description')
+            program_data.get('description'),
+            program_data.get('fees_min', fees_min),
+            program_data.get('fees_max', fees_max)
         )
         return self.execute_query(query, params)
     
+    def insert_school_with_programs(self, school, programs):
+        """
+        Seed a school and its programs with a single commit
+        If any program fails, the school is rolled back too.
+        """
+        with self.transaction():
+            school_id = self.insert_school(school)
+            for program_data in programs:
+                program_data['school_id'] = school_id
+                self.insert_program(program_data)
+        return school_id
+
     def get_programs_by_school(self, school_id):
         """Get all programs offered by a specific school"""
         query = "SELECT * FROM programs WHERE school_id = %s ORDER BY cutoff_marks DESC"
@@ -391,17 +1165,60 @@ class Database:
         search_term = f"%{program_name}%"
         return self.fetch_query(query, (search_term,))
     
+    def search_programs_by_budget(self, max_fees, min_years=None, max_years=None,
+                                  program_name=None, limit=50):
+        """
+        Programs whose whole fee range fits in max_fees (RWF per year), cheapest first
+        Optionally limited to a duration in years and a program name.
+        Answered from the catalog snapshot's fee index when one is loaded; otherwise a
+        range scan on idx_programs_fees (fees_max, duration_years).
+        """
+        if self.catalog_snapshot is not None:
+            return self.catalog_snapshot.fee_index().search(
+                max_fees, min_years, max_years, program_name, limit)
+        
+        conditions = ["p.fees_max <= %s"]
+        params = [max_fees]
+        if min_years is not None:
+            conditions.append("p.duration_years >= %s")
+            params.append(min_years)
+        if max_years is not None:
+            conditions.append("p.duration_years <= %s")
+            params.append(max_years)
+        if program_name:
+            conditions.append("p.program_name LIKE %s")
+            params.append(f"%{program_name}%")
+        query = f"""
+        SELECT p.*, s.name AS school_name, s.district, s.province
+        FROM programs p
+        JOIN schools s ON p.school_id = s.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.fees_max
+        LIMIT %s
+        """
+        params.append(limit)
+        return self.fetch_query(query, tuple(params))
+    
     # ==================== APPLICATION OPERATIONS ====================
     
     def insert_application(self, application):
-        """Insert a new application"""
+        """Insert a new application (and count it in admission_stats, same commit)"""
         query = """
         INSERT INTO applications (student_id, school_id, status)
         VALUES (%s, %s, %s)
         """
         params = (application.student_id, application.school_id, application.status)
         
-        app_id = self.execute_query(query, params)
+        try:
+            with self.transaction():
+                app_id = self.execute_query(query, params)
+                if app_id:
+                    self._count_admission(self._admission_source(app_id), application.status, 1)
+        except DatabaseError as e:
+            if self.in_transaction:
+                raise  # inside the caller's transaction, errors are raised (as in execute_query)
+            print(f"Error inserting application: {e}")
+            return None
         if app_id:
             application.application_id = app_id
             return app_id
@@ -428,7 +1245,8 @@ class Database:
                 school_id=data['school_id'],
                 application_id=data['id'],
                 status=data['status'],
-                applied_date=data['applied_at']
+                applied_date=data['applied_at'],
+                school_name=data.get('school_name')
             )
             applications.append(app)
         
@@ -459,9 +1277,120 @@ class Database:
         return applications
     
     def update_application_status(self, application_id, new_status):
-        """Update application status - demonstrates UPDATE"""
+        """
+        Update application status - demonstrates UPDATE
+        admission_stats moves the application from its old status to the new one
+        in the same transaction.
+        """
         query = "UPDATE applications SET status = %s WHERE id = %s"
-        return self.execute_query(query, (new_status, application_id))
+        try:
+            with self.transaction():
+                # Locked until commit, so two status changes cannot both move the old count
+                source = self._admission_source(application_id, lock=True)
+                result = self.execute_query(query, (new_status, application_id))
+                if source and status_key(source['status']) != status_key(new_status):
+                    self._count_admission(source, source['status'], -1)
+                    self._count_admission(source, new_status, 1)
+        except DatabaseError as e:
+            if self.in_transaction:
+                raise
+            print(f"Error updating application: {e}")
+            return None
+        return result
+    
+    def delete_application(self, application_id):
+        """Delete an application (and take it out of admission_stats, same commit)"""
+        try:
+            with self.transaction():
+                source = self._admission_source(application_id, lock=True)
+                result = self.execute_query("DELETE FROM applications WHERE id = %s", (application_id,))
+                if source:
+                    self._count_admission(source, source['status'], -1)
+        except DatabaseError as e:
+            if self.in_transaction:
+                raise
+            print(f"Error deleting application: {e}")
+            return None
+        return result
+    
+    # ==================== ADMISSIONS ANALYTICS ====================
+    
+    def _admission_source(self, application_id, lock=False):
+        """
+        School, status, applied_at and applicant aggregate of one application
+        lock=True reads it with FOR UPDATE (inside a transaction).
+        """
+        query = ADMISSION_SOURCE + " WHERE a.id = %s" + (" FOR UPDATE" if lock else "")
+        results = self.fetch_query(query, (application_id,), use_cache=False)
+        return results[0] if results else None
+    
+    def _admission_stats_ready(self):
+        """
+        True when the admission_stats table exists (checked once per server, again
+        every ADMISSION_STATS_RECHECK_SECONDS while it is missing)
+        """
+        key = (self.host, self.port, self.database)
+        checked = _admission_stats_checked.get(key)
+        if checked and (checked[0] or time.monotonic() - checked[1] < ADMISSION_STATS_RECHECK_SECONDS):
+            return checked[0]
+        ready = True
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT 1 FROM admission_stats LIMIT 1")
+            cursor.fetchall()
+        except mysql_connector().Error:
+            ready = False
+        finally:
+            cursor.close()
+        if not ready and checked is None:
+            print("Warning: the admission_stats table is missing - run `python main.py migrate`. "
+                  "Applications are saved without admission analytics until then.")
+        _admission_stats_checked[key] = (ready, time.monotonic())
+        return ready
+    
+    def _count_admission(self, source, status, delta):
+        """Add delta applications to one admission_stats cell (skipped before migrate)"""
+        if not source or not self._admission_stats_ready():
+            return None
+        row = (source['school_id'], intake_of(source['applied_at']), status_key(status),
+               aggregate_bucket(source['aggregate_marks']), delta)
+        return self.execute_query(ADMISSION_UPSERT, row)
+    
+    def get_admission_stats(self, school_ids=None):
+        """admission_stats rows (school_id, intake, status, bucket, applicants) for some schools or all"""
+        query = "SELECT school_id, intake, status, bucket, applicants FROM admission_stats"
+        params = None
+        if school_ids is not None:
+            school_ids = list(school_ids)
+            if not school_ids:
+                return []
+            query += f" WHERE school_id IN ({', '.join(['%s'] * len(school_ids))})"
+            params = tuple(school_ids)
+        return self.fetch_query(query, params, use_cache=False)
+    
+    def rebuild_admission_stats(self, chunk_size=5000):
+        """
+        Recount admission_stats from the applications table (streamed), in one
+        transaction with the reads. Returns the number of applications counted.
+        """
+        sources = self.iter_keyset(ADMISSION_SOURCE.replace("SELECT", "SELECT a.id,", 1), "a.id",
+                                   chunk_size=chunk_size, method='rebuild_admission_stats')
+        counted = 0
+        
+        def counting(rows):
+            nonlocal counted
+            for row in rows:
+                counted += 1
+                yield row
+        
+        with self.transaction():
+            # Delete first: the deleted rows stay locked, so a concurrent application
+            # write waits at its admission_stats upsert until this commits. The reads
+            # below share one snapshot that holds every write committed before them.
+            self.execute_query("DELETE FROM admission_stats")
+            rows = admission_counts(counting(sources))
+            self.execute_many(ADMISSION_UPSERT, rows)
+        return counted
     
     def check_existing_application(self, student_id, school_id):
         """
@@ -475,6 +1404,71 @@ class Database:
         results = self.fetch_query(query, (student_id, school_id))
         return len(results) > 0
     
+    # ==================== STREAMING READS ====================
+    
+    def iter_keyset(self, select, key_column, conditions=None, params=None,
+                    chunk_size=1000, method='iter_keyset', start_after=0):
+        """
+        Yield rows of a large table chunk by chunk, in constant memory
+        Uses keyset pagination (WHERE key > last ORDER BY key LIMIT n), so every
+        chunk is an index range scan and no cursor stays open between chunks.
+        
+        select: "SELECT ... FROM ... [JOIN ...]" without WHERE/ORDER BY
+        key_column: unique, indexed column to page on (e.g. "a.id"); must be selected as "id"
+        conditions: extra WHERE conditions, combined with AND
+        start_after: only rows with a key above this one
+        """
+        where = [f"{key_column} > %s"] + list(conditions or [])
+        query = f"{select} WHERE {' AND '.join(where)} ORDER BY {key_column} LIMIT %s"
+        last_key = start_after
+        while True:
+            rows = self.fetch_query(query, (last_key, *(params or ()), chunk_size),
+                                    use_cache=False, method=method)
+            if not rows:
+                return
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last_key = rows[-1]['id']
+    
+    def iter_students(self, chunk_size=1000, combination=None, districts=None):
+        """Stream student rows (dicts), optionally filtered by combination and/or districts"""
+        conditions, params = [], []
+        if combination:
+            conditions.append("subject_combination = %s")
+            params.append(combination)
+        if districts:
+            conditions.append(f"location_from IN ({', '.join(['%s'] * len(districts))})")
+            params.extend(districts)
+        return self.iter_keyset("SELECT * FROM students", "id", conditions, params,
+                                chunk_size, method='iter_students')
+    
+    def iter_student_aggregates(self, after_id=0, chunk_size=5000):
+        """Stream (id, subject_combination, aggregate_marks) of students registered after after_id"""
+        return self.iter_keyset("SELECT id, subject_combination, aggregate_marks FROM students", "id",
+                                chunk_size=chunk_size, method='iter_student_aggregates',
+                                start_after=after_id)
+    
+    def iter_applications(self, chunk_size=1000, province=None, combination=None):
+        """Stream applications joined with school and student names"""
+        select = """
+        SELECT a.id, a.student_id, st.email, st.first_name, st.last_name,
+               st.subject_combination, a.school_id, s.name AS school_name,
+               s.province AS school_province, a.status, a.applied_at
+        FROM applications a
+        JOIN schools s ON a.school_id = s.id
+        JOIN students st ON a.student_id = st.id
+        """
+        conditions, params = [], []
+        if province:
+            conditions.append("s.province = %s")
+            params.append(province)
+        if combination:
+            conditions.append("st.subject_combination = %s")
+            params.append(combination)
+        return self.iter_keyset(select, "a.id", conditions, params,
+                                chunk_size, method='iter_applications')
+    
     # ==================== STATISTICS & REPORTS ====================
     
     def get_statistics(self):
@@ -525,27 +1519,6 @@ class Database:
         params = (student.aggregate_marks, student.subject_combination)
         results = self.fetch_query(query, params)
         
-        schools = []
-        for data in results:
-            required_subj = data.get('required_subjects', '').split(',') if data.get('required_subjects') else []
-            competencies = data.get('competencies_needed', '').split(',') if data.get('competencies_needed') else []
-            
-            school = School(
-                name=data['name'],
-                district=data.get('district'),
-                province=data.get('province'),
-                school_type=data.get('school_type', 'private'),
-                min_aggregate=float(data['min_aggregate']),
-                min_cutoff=float(data.get('min_cutoff', data['min_aggregate'])),
-                max_cutoff=float(data.get('max_cutoff', data['min_aggregate'])),
-                boarding_type=data.get('boarding', 'day'),
-                required_subjects=required_subj,
-                competencies_needed=competencies,
-                contact_email=data.get('contact_email'),
-                website=data.get('website'),
-                school_id=data['id']
-            )
-            school.programs = self.get_programs_by_school(data['id'])
-            schools.append(school)
-        
+        schools = [self._school_from_row(data) for data in results]
+        self._attach_programs(schools)
         return schools
@@ -0,0 +1,217 @@
+"""
+Query instrumentation for Ishuri-Connect
+Times every query, counts round trips per high-level operation and keeps a
+slow-query log, so we can see which Database methods dominate latency.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from database.sql_text import fingerprint
+from src.metrics import registry
+
+# Histogram bucket upper bounds in milliseconds (last bucket is everything slower)
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+slow_query_logger = logging.getLogger('ishuri.slow_query')
+
+# Exported metrics (see src/metrics.py)
+DB_ROUND_TRIPS = registry.counter('ishuri_db_round_trips_total', 'Queries sent to MySQL', ['method'])
+DB_CACHE_HITS = registry.counter('ishuri_db_cache_hits_total', 'Reads answered by the query cache', ['method'])
+DB_ERRORS = registry.counter('ishuri_db_errors_total', 'Failed queries', ['method'])
+DB_QUERY_SECONDS = registry.histogram('ishuri_db_query_seconds', 'Query latency', ['method'])
+
+
+def bucket_index(elapsed_ms):
+    """Index of the histogram bucket for a latency in milliseconds"""
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+class LatencyAggregate:
+    """Count, total/max time, rows and a latency histogram for one key"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.round_trips = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms, rows=0, round_trips=1, error=False):
+        self.count += 1
+        self.rows += rows
+        self.round_trips += round_trips
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        if error:
+            self.errors += 1
+        self.buckets[bucket_index(elapsed_ms)] += 1
+
+    def percentile(self, fraction):
+        """Approximate percentile (bucket upper bound) in milliseconds"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'round_trips': self.round_trips,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': list(self.buckets)
+        }
+
+
+class QueryStats:
+    """
+    In-process aggregate of query timings
+    - per Database method (get_all_schools, insert_student, ...)
+    - per normalized SQL fingerprint
+    - per high-level operation (e.g. one get_school_recommendations call)
+    """
+
+    def __init__(self, slow_query_ms=None, slow_log_path=None):
+        """
+        slow_query_ms / slow_log_path default to DB_SLOW_QUERY_MS / DB_SLOW_QUERY_LOG,
+        read on first use so a .env file loaded later still applies
+        """
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self._configured = False
+        self.methods = {}
+        self.fingerprints = {}
+        self.operations = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _configure(self):
+        """Resolve settings from the environment and attach the slow-query log file"""
+        self._configured = True
+        if self.slow_query_ms is None:
+            self.slow_query_ms = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+        self.slow_log_path = self.slow_log_path or os.getenv('DB_SLOW_QUERY_LOG')
+        if self.slow_log_path:
+            handler = logging.FileHandler(self.slow_log_path)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_logger.addHandler(handler)
+            slow_query_logger.setLevel(logging.INFO)
+
+    def record(self, method, query, elapsed, rows=0, error=False, cached=False):
+        """
+        Record one query; elapsed is in seconds
+        cached=True means it was answered from the result cache (no round trip).
+        """
+        if not self._configured:
+            self._configure()
+        elapsed_ms = elapsed * 1000
+        key = fingerprint(query)
+        round_trips = 0 if cached else 1
+        labels = (method,)
+        if cached:
+            DB_CACHE_HITS.inc(labels=labels)
+        else:
+            DB_ROUND_TRIPS.inc(labels=labels)
+            DB_QUERY_SECONDS.observe(elapsed, labels)
+        if error:
+            DB_ERRORS.inc(labels=labels)
+        with self._lock:
+            self.methods.setdefault(method, LatencyAggregate()).add(
+                elapsed_ms, rows, round_trips=round_trips, error=error)
+            self.fingerprints.setdefault(key, LatencyAggregate()).add(
+                elapsed_ms, rows, round_trips=round_trips, error=error)
+
+        # Attribute the query to every operation currently open in this thread
+        for operation in getattr(self._local, 'operations', ()):
+            operation['round_trips'] += round_trips
+            operation['rows'] += rows
+            operation['db_ms'] += elapsed_ms
+            operation['errors'] += 1 if error else 0
+
+        if elapsed_ms >= self.slow_query_ms:
+            slow_query_logger.warning("slow query %.1fms method=%s rows=%d sql=%s",
+                                      elapsed_ms, method, rows, key)
+
+    @contextmanager
+    def operation(self, name):
+        """
+        Measure a high-level operation and the round trips it makes
+
+            with db.stats.operation('get_school_recommendations'):
+                schools = db.get_all_schools()
+        """
+        stack = getattr(self._local, 'operations', None)
+        if stack is None:
+            stack = self._local.operations = []
+        current = {'round_trips': 0, 'rows': 0, 'db_ms': 0.0, 'errors': 0}
+        stack.append(current)
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stack.remove(current)
+            current['wall_ms'] = elapsed_ms
+            with self._lock:
+                self.operations.setdefault(name, LatencyAggregate()).add(
+                    elapsed_ms, current['rows'], round_trips=current['round_trips'])
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.methods.clear()
+            self.fingerprints.clear()
+            self.operations.clear()
+
+    def snapshot(self):
+        """All aggregates as plain dictionaries (e.g. for JSON output)"""
+        with self._lock:
+            return {
+                'methods': {name: agg.to_dict() for name, agg in self.methods.items()},
+                'fingerprints': {sql: agg.to_dict() for sql, agg in self.fingerprints.items()},
+                'operations': {name: agg.to_dict() for name, agg in self.operations.items()}
+            }
+
+    def report(self):
+        """Text report: latency histogram per method and per operation"""
+        snapshot = self.snapshot()
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        lines = []
+        for section in ('operations', 'methods'):
+            entries = snapshot[section]
+            if not entries:
+                continue
+            lines.append(f"== {section} ==")
+            for name, data in sorted(entries.items(), key=lambda item: -item[1]['total_ms']):
+                lines.append(f"{name}: n={data['count']} avg={data['avg_ms']}ms "
+                             f"p95={data['p95_ms']}ms max={data['max_ms']}ms "
+                             f"round_trips={data['round_trips']} rows={data['rows']} errors={data['errors']}")
+                peak = max(data['buckets']) or 1
+                for label, count in zip(labels, data['buckets']):
+                    if count:
+                        lines.append(f"  {label:>10} {'#' * max(1, int(30 * count / peak))} {count}")
+        return "\n".join(lines)
+
+
+# Shared by every Database instance in the process
+query_stats = QueryStats()
@@ -0,0 +1,112 @@
+"""
+Resilience helpers for Ishuri-Connect
+Circuit breaker, jittered retry delays and a last-known-good store for catalog
+reads, so a stalled MySQL server makes the CLI fail fast instead of hanging.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+
+def backoff_delays(attempts, base_delay=0.2, max_delay=2.0):
+    """
+    Sleep times between retries - exponential backoff with full jitter
+    attempts=3 -> two delays, e.g. [0.13, 0.31]
+    """
+    delays = []
+    for attempt in range(max(attempts - 1, 0)):
+        ceiling = min(max_delay, base_delay * (2 ** attempt))
+        delays.append(random.uniform(0, ceiling))
+    return delays
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker
+    - closed: calls go through; consecutive failures are counted
+    - open: calls fail fast until reset_seconds have passed
+    - half-open: one trial call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self):
+        """False while the breaker is open (callers should fail fast)"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host, port, failure_threshold=5, reset_seconds=30.0):
+    """One breaker per server, shared by every Database instance in the process"""
+    key = (host, port)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(failure_threshold, reset_seconds)
+        return breaker
+
+
+class LastGoodReads:
+    """
+    Bounded store of the latest successful result per catalog query
+    Served while the database is unavailable so recommendations keep working.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, key, rows):
+        with self._lock:
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
@@ -0,0 +1,65 @@
+"""
+SQL text helpers for Ishuri-Connect
+Normalizes queries into fingerprints and finds the tables a statement touches.
+"""
+
+import re
+from functools import lru_cache
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_READ_TABLES = re.compile(r"\b(?:from|join)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_TABLES = re.compile(r"^\s*(?:insert\s+(?:ignore\s+)?into|update|delete\s+from|replace\s+into)\s+`?(\w+)`?",
+                           re.IGNORECASE)
+
+_fingerprints = {}
+_normalized = {}
+
+
+def fingerprint(query):
+    """
+    Normalize SQL so queries that differ only in values group together
+    "SELECT * FROM schools WHERE id = 7" -> "select * from schools where id = ?"
+    """
+    cached = _fingerprints.get(query)
+    if cached is not None:
+        return cached
+    text = _STRING_LITERAL.sub('?', query)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('(?+)', text)
+    text = _WHITESPACE.sub(' ', text).strip().lower()
+    if len(_fingerprints) < 4096:  # queries are mostly constants, keep the memo bounded
+        _fingerprints[query] = text
+    return text
+
+
+def normalize_whitespace(query):
+    """
+    The query with runs of whitespace collapsed - same statement, same text
+    (unlike fingerprint(), literals are kept, so it is safe as a cache key)
+    """
+    cached = _normalized.get(query)
+    if cached is not None:
+        return cached
+    text = _WHITESPACE.sub(' ', query).strip()
+    if len(_normalized) < 4096:
+        _normalized[query] = text
+    return text
+
+
+@lru_cache(maxsize=1024)
+def read_tables(query):
+    """Tables a SELECT reads from (FROM and JOIN clauses)"""
+    return frozenset(name.lower() for name in _READ_TABLES.findall(query))
+
+
+@lru_cache(maxsize=1024)
+def written_tables(query):
+    """Table an INSERT/UPDATE/DELETE writes to (empty for other statements)"""
+    match = _WRITE_TABLES.match(query)
+    return frozenset([match.group(1).lower()]) if match else frozenset()
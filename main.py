@@ -3,9 +3,10 @@ Ishuri Connect - Main entry point.
 Handles startup, prints welcome banner, and launches the CLI application.
 """
 
+import os
+import sys
 from colorama import init, Fore, Style
 from datetime import datetime
-from src.cli import start_application
 
 # Initialize colorama for Windows compatibility
 init(autoreset=True)
@@ -31,10 +32,26 @@ def main():
     """Main function: prints banner and launches CLI application."""
     print_welcome_banner()
     # Launch the CLI interface defined in src/cli.py
+    from src.cli import start_application
     start_application()
 
 
 if __name__ == "__main__":
+    # --profile works with both the menus and command mode
+    if "--profile" in sys.argv[1:]:
+        sys.argv.remove("--profile")
+        from src.profiling import enable_profiling
+        enable_profiling()
+    # Command mode (e.g. `python main.py recommend --email ...`): no banner, no menus
+    if len(sys.argv) > 1:
+        from src.commands import run_command
+        try:
+            sys.exit(run_command(sys.argv[1:]))
+        except BrokenPipeError:
+            # Reader went away (e.g. `| head`) - silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+
     try:
         main()
     except KeyboardInterrupt:
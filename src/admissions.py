@@ -0,0 +1,187 @@
+"""
+Admissions analytics for Ishuri-Connect
+"What aggregate typically got accepted at this school?" is answered from the
+admission_stats table, a pre-aggregated count of applications per school,
+intake (year applied), status and whole aggregate percent (0-100). The database
+keeps it current as applications are made and their status changes, so the
+screens never need a GROUP BY over the applications table:
+
+    tables = load_admission_tables(db, [school.school_id for school in schools])
+    tables.summary(school_id)                 # per intake: applicants, acceptance rate, quantiles
+    tables.likelihood(school_id, 72.5)        # {'label': 'High', 'chance': 0.78, ...} or None
+
+Applications are made to schools (not to single programs), so the tables are
+per school. `python main.py admissions --rebuild` recounts everything (e.g.
+after students were deleted).
+"""
+
+from datetime import datetime
+
+BUCKETS = 101  # whole aggregate percents 0..100
+
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+PENDING = 'pending'
+
+RECENT_INTAKES = 3      # intakes used for admission likelihood
+SIMILAR_MARKS = 5       # "similar applicants" are within this many percent
+MIN_SIMILAR = 5         # decided similar applicants needed to quote a chance
+HIGH_CHANCE = 0.6
+MEDIUM_CHANCE = 0.3
+
+
+def intake_of(applied_at):
+    """Intake (year) of an application from its applied_at datetime (or text)"""
+    if applied_at is None:
+        return datetime.now().year
+    if hasattr(applied_at, 'year'):
+        return applied_at.year
+    try:
+        return int(str(applied_at)[:4])
+    except ValueError:
+        return datetime.now().year
+
+
+def aggregate_bucket(aggregate):
+    """Whole-percent bucket (0-100) of an aggregate"""
+    return min(max(int(float(aggregate or 0)), 0), BUCKETS - 1)
+
+
+def status_key(status):
+    return (status or PENDING).strip().lower()
+
+
+def quantile(histogram, fraction):
+    """Bucket at the given fraction (0-1) of a histogram, or None if it is empty"""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = max(fraction * total, 1)
+    running = 0
+    for bucket, count in enumerate(histogram):
+        running += count
+        if running >= target:
+            return bucket
+    return BUCKETS - 1
+
+
+def admission_counts(sources):
+    """
+    admission_stats rows (school_id, intake, status, bucket, applicants) from
+    application rows with school_id, status, applied_at and aggregate_marks
+    """
+    counts = {}
+    for row in sources:
+        key = (row['school_id'], intake_of(row['applied_at']), status_key(row['status']),
+               aggregate_bucket(row['aggregate_marks']))
+        counts[key] = counts.get(key, 0) + 1
+    return [key + (count,) for key, count in counts.items()]
+
+
+class AdmissionTables:
+    """In-memory view of admission_stats rows: histograms per (school, intake, status)"""
+
+    def __init__(self, rows):
+        self.histograms = {}  # (school_id, intake) -> {status: [count per bucket]}
+        for row in rows:
+            statuses = self.histograms.setdefault((row['school_id'], int(row['intake'])), {})
+            histogram = statuses.setdefault(status_key(row['status']), [0] * BUCKETS)
+            histogram[int(row['bucket'])] += int(row['applicants'])
+
+    def intakes(self, school_id):
+        """Intakes with applications to this school, most recent first"""
+        return sorted((intake for school, intake in self.histograms if school == school_id), reverse=True)
+
+    def decided(self, school_id, intake):
+        """Accepted plus rejected applications of one intake"""
+        statuses = self.histograms.get((school_id, intake), {})
+        return sum(statuses.get(ACCEPTED, ())) + sum(statuses.get(REJECTED, ()))
+
+    def _histogram(self, school_id, intakes, status):
+        combined = [0] * BUCKETS
+        for intake in intakes:
+            histogram = self.histograms.get((school_id, intake), {}).get(status)
+            if histogram:
+                combined = [total + count for total, count in zip(combined, histogram)]
+        return combined
+
+    def intake_summary(self, school_id, intake):
+        """Applicant counts, acceptance rate and accepted-aggregate quantiles for one intake"""
+        statuses = self.histograms.get((school_id, intake), {})
+        counts = {status: sum(histogram) for status, histogram in statuses.items()}
+        accepted, rejected = counts.get(ACCEPTED, 0), counts.get(REJECTED, 0)
+        admitted = statuses.get(ACCEPTED, [0] * BUCKETS)
+        return {
+            'school_id': school_id,
+            'intake': intake,
+            'applicants': sum(counts.values()),
+            'accepted': accepted,
+            'rejected': rejected,
+            'pending': counts.get(PENDING, 0),
+            'acceptance_rate': round(accepted / (accepted + rejected), 3) if accepted + rejected else None,
+            'accepted_p25': quantile(admitted, 0.25),
+            'accepted_median': quantile(admitted, 0.5),
+            'accepted_p75': quantile(admitted, 0.75)
+        }
+
+    def summary(self, school_id=None):
+        """intake_summary rows for one school (or all), most recent intake first"""
+        keys = sorted(self.histograms, key=lambda key: (key[0], -key[1]))
+        return [self.intake_summary(school, intake) for school, intake in keys
+                if school_id is None or school == school_id]
+
+    def likelihood(self, school_id, aggregate, recent_intakes=RECENT_INTAKES):
+        """
+        Admission likelihood for an aggregate at one school, from its recent intakes
+        With enough decided applicants of similar marks the chance is their
+        acceptance rate; otherwise the label comes from where the aggregate falls
+        among the students accepted before. None without any decided applications.
+        """
+        # The current intake is mostly still pending, so only intakes with decisions count
+        intakes = [intake for intake in self.intakes(school_id) if self.decided(school_id, intake)]
+        intakes = intakes[:recent_intakes]
+        accepted = self._histogram(school_id, intakes, ACCEPTED)
+        rejected = self._histogram(school_id, intakes, REJECTED)
+        if not sum(accepted) + sum(rejected):
+            return None
+
+        bucket = aggregate_bucket(aggregate)
+        low, high = max(bucket - SIMILAR_MARKS, 0), min(bucket + SIMILAR_MARKS, BUCKETS - 1)
+        similar_accepted = sum(accepted[low:high + 1])
+        similar_decided = similar_accepted + sum(rejected[low:high + 1])
+        admitted = sum(accepted)
+        admitted_below = sum(accepted[:bucket + 1])
+
+        chance = None
+        if similar_decided >= MIN_SIMILAR:
+            chance = similar_accepted / similar_decided
+            score = chance
+        else:
+            # Share of earlier admits with the same or lower aggregate
+            score = admitted_below / admitted if admitted else 0.0
+        label = 'High' if score >= HIGH_CHANCE else 'Medium' if score >= MEDIUM_CHANCE else 'Low'
+        return {
+            'label': label,
+            'chance': round(chance, 2) if chance is not None else None,
+            'similar_applicants': similar_decided,
+            'admitted': admitted,
+            'admitted_at_or_below': admitted_below,
+            'accepted_median': quantile(accepted, 0.5),
+            'intakes': intakes
+        }
+
+
+def load_admission_tables(db, school_ids=None):
+    """AdmissionTables for some schools (or all) - one indexed read of admission_stats"""
+    return AdmissionTables(db.get_admission_stats(school_ids))
+
+
+def describe_likelihood(likelihood):
+    """One-line text for the recommendation screens"""
+    if likelihood is None:
+        return "no admissions history yet"
+    if likelihood['chance'] is not None:
+        return (f"{likelihood['label']} - {round(likelihood['chance'] * 100)}% of "
+                f"{likelihood['similar_applicants']} similar applicants accepted")
+    return (f"{likelihood['label']} - above or equal to {likelihood['admitted_at_or_below']} of "
+            f"{likelihood['admitted']} admitted students")
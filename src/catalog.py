@@ -0,0 +1,298 @@
+"""
+Binary catalog snapshot for Ishuri-Connect
+A compact, memory-mapped file holding every school and program, so a new
+process can show recommendations without querying MySQL first.
+
+File layout (little-endian):
+    header    MAGIC, format version, catalog version, counts, section offsets, CRC32
+    schools   fixed-size records (numbers inline, text as string-table indexes)
+    programs  fixed-size records, grouped by school
+    strings   uint32 end offsets followed by one UTF-8 blob
+
+ProgramFeeIndex answers budget searches over the in-memory catalog with a
+binary search on programs sorted by their maximum fee.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+
+from src.models import School
+from src.utils import parse_fees_range
+
+MAGIC = b'ISHCAT\x00\x00'
+FORMAT_VERSION = 2  # 2: numeric fees_min / fees_max in program records
+
+# magic, format, catalog version, created_at, schools, programs, strings, body offset, crc32
+HEADER = struct.Struct('<8sH32sdIIIII')
+
+# id, name, district, province, school_type, boarding, min_aggregate, min_cutoff, max_cutoff,
+# required_subjects, competencies, contact_email, website, first_program, program_count
+SCHOOL_RECORD = struct.Struct('<iIIIIIdddIIIIII')
+
+# id, school_id, program_name, program_code, cutoff_marks, required_combination,
+# duration_years, fees_range, description, fees_min, fees_max
+PROGRAM_RECORD = struct.Struct('<iiIIdIiIIqq')
+
+NO_STRING = 0xFFFFFFFF
+NO_FEES = -1
+
+
+class SnapshotError(Exception):
+    """The snapshot file is missing, corrupt or from another format version"""
+
+
+class _StringTable:
+    """Deduplicating string table used while writing"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def add(self, value):
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+    def to_bytes(self):
+        blob = bytearray()
+        ends = []
+        for value in self.values:
+            blob += value.encode('utf-8')
+            ends.append(len(blob))
+        return struct.pack(f'<{len(ends)}I', *ends) + bytes(blob)
+
+
+def _number(value, default=0.0):
+    return float(value) if value is not None else default
+
+
+def program_fees(program):
+    """(fees_min, fees_max) of a program dict - stored columns, else parsed from fees_range"""
+    if program.get('fees_max') is not None:
+        return program.get('fees_min'), program['fees_max']
+    return parse_fees_range(program.get('fees_range'))
+
+
+def write_snapshot(path, schools, catalog_version):
+    """
+    Write schools (with their .programs dicts) to path, atomically
+    catalog_version: string identifying the database catalog state
+    """
+    strings = _StringTable()
+    school_records = bytearray()
+    program_records = bytearray()
+    program_index = 0
+
+    for school in schools:
+        programs = school.programs or []
+        school_records += SCHOOL_RECORD.pack(
+            school.school_id or 0,
+            strings.add(school.name), strings.add(school.district), strings.add(school.province),
+            strings.add(school.school_type), strings.add(school.boarding_type),
+            _number(school.min_aggregate), _number(school.min_cutoff), _number(school.max_cutoff),
+            strings.add(','.join(school.required_subjects) if school.required_subjects else None),
+            strings.add(','.join(school.competencies_needed) if school.competencies_needed else None),
+            strings.add(school.contact_email), strings.add(school.website),
+            program_index, len(programs)
+        )
+        for program in programs:
+            fees_min, fees_max = program_fees(program)
+            program_records += PROGRAM_RECORD.pack(
+                program.get('id') or 0, school.school_id or 0,
+                strings.add(program.get('program_name')), strings.add(program.get('program_code')),
+                _number(program.get('cutoff_marks')), strings.add(program.get('required_combination')),
+                int(program.get('duration_years') or 0),
+                strings.add(program.get('fees_range')), strings.add(program.get('description')),
+                NO_FEES if fees_min is None else int(fees_min), NO_FEES if fees_max is None else int(fees_max)
+            )
+        program_index += len(programs)
+
+    body = bytes(school_records) + bytes(program_records) + strings.to_bytes()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, str(catalog_version).encode('ascii')[:32],
+                         time.time(), len(schools), program_index, len(strings.values),
+                         HEADER.size, zlib.crc32(body))
+
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as handle:
+        handle.write(header)
+        handle.write(body)
+    try:
+        os.replace(temp_path, path)  # readers never see a half-written file
+    except OSError as e:
+        os.remove(temp_path)
+        raise SnapshotError(f"cannot replace snapshot {path}: {e}")
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a snapshot file through mmap
+    School objects are decoded once, on first use of schools(); the file is
+    unmapped then, so it can be replaced (Windows refuses to replace a mapped file).
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        try:
+            with open(path, 'rb') as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"cannot open snapshot {path}: {e}")
+
+        if len(self._map) < HEADER.size:
+            raise SnapshotError("snapshot too short")
+        (magic, format_version, version, self.created_at, self.school_count,
+         self.program_count, self.string_count, body_offset, crc) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError("not a catalog snapshot (or unsupported format version)")
+        self.version = version.rstrip(b'\x00').decode('ascii')
+
+        self._schools_at = body_offset
+        self._programs_at = self._schools_at + self.school_count * SCHOOL_RECORD.size
+        self._string_ends_at = self._programs_at + self.program_count * PROGRAM_RECORD.size
+        self._blob_at = self._string_ends_at + self.string_count * 4
+        if self._blob_at > len(self._map):
+            raise SnapshotError("snapshot truncated")
+        if verify and zlib.crc32(memoryview(self._map)[body_offset:]) != crc:
+            raise SnapshotError("snapshot checksum mismatch")
+        self._schools = None
+        self._fee_index = None
+        self._lock = threading.Lock()  # one decode; the map is closed after it
+
+    def _string(self, index):
+        if index == NO_STRING:
+            return None
+        end = struct.unpack_from('<I', self._map, self._string_ends_at + index * 4)[0]
+        start = struct.unpack_from('<I', self._map, self._string_ends_at + (index - 1) * 4)[0] if index else 0
+        return self._map[self._blob_at + start:self._blob_at + end].decode('utf-8')
+
+    def _program(self, position):
+        (program_id, school_id, name, code, cutoff, combination,
+         duration, fees, description, fees_min, fees_max) = PROGRAM_RECORD.unpack_from(
+            self._map, self._programs_at + position * PROGRAM_RECORD.size)
+        return {
+            'id': program_id,
+            'school_id': school_id,
+            'program_name': self._string(name),
+            'program_code': self._string(code),
+            'cutoff_marks': cutoff,
+            'required_combination': self._string(combination),
+            'duration_years': duration,
+            'fees_range': self._string(fees),
+            'description': self._string(description),
+            'fees_min': None if fees_min == NO_FEES else fees_min,
+            'fees_max': None if fees_max == NO_FEES else fees_max
+        }
+
+    def _school(self, position):
+        (school_id, name, district, province, school_type, boarding, min_aggregate,
+         min_cutoff, max_cutoff, required, competencies, email, website,
+         first_program, program_count) = SCHOOL_RECORD.unpack_from(
+            self._map, self._schools_at + position * SCHOOL_RECORD.size)
+        required = self._string(required)
+        competencies = self._string(competencies)
+        school = School(
+            name=self._string(name),
+            district=self._string(district),
+            province=self._string(province),
+            school_type=self._string(school_type),
+            min_aggregate=min_aggregate,
+            min_cutoff=min_cutoff,
+            max_cutoff=max_cutoff,
+            boarding_type=self._string(boarding),
+            required_subjects=required.split(',') if required else [],
+            competencies_needed=competencies.split(',') if competencies else [],
+            contact_email=self._string(email),
+            website=self._string(website),
+            school_id=school_id
+        )
+        school.programs = [self._program(first_program + offset) for offset in range(program_count)]
+        return school
+
+    def schools(self):
+        """All schools with programs, in the order they were written"""
+        with self._lock:
+            if self._schools is None:
+                self._schools = [self._school(position) for position in range(self.school_count)]
+                self.close()
+        return list(self._schools)
+
+    def release(self):
+        """Unmap the file; the decoded schools keep this snapshot usable"""
+        self.schools()
+
+    def fee_index(self):
+        """ProgramFeeIndex over this snapshot's programs (built on first use)"""
+        if self._fee_index is None:
+            self._fee_index = ProgramFeeIndex(self.schools())
+        return self._fee_index
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class ProgramFeeIndex:
+    """
+    Programs of an in-memory catalog sorted by maximum fee
+    A budget search is a bisect to the last affordable program, then a walk over
+    the cheaper ones with the duration / name filters.
+    """
+
+    def __init__(self, schools):
+        self.schools = schools
+        entries = []
+        for school in schools:
+            for program in school.programs or []:
+                fees_max = program_fees(program)[1]
+                if fees_max is not None:
+                    entries.append((fees_max, program, school))
+        entries.sort(key=lambda entry: entry[0])
+        self.fees = [entry[0] for entry in entries]
+        self.entries = [(program, school) for _, program, school in entries]
+
+    def search(self, max_fees, min_years=None, max_years=None, program_name=None, limit=50):
+        """Same rows as Database.search_programs_by_budget, cheapest first"""
+        name = program_name.lower() if program_name else None
+        results = []
+        for program, school in self.entries[:bisect_right(self.fees, max_fees)]:
+            duration = program.get('duration_years') or 0
+            if min_years is not None and duration < min_years:
+                continue
+            if max_years is not None and duration > max_years:
+                continue
+            if name and name not in (program.get('program_name') or '').lower():
+                continue
+            results.append(dict(program, school_name=school.name,
+                                district=school.district, province=school.province))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+
+def load_snapshot(path, expected_version=None):
+    """
+    Open a snapshot, or return None when it is missing, invalid or stale
+    expected_version: when given, a snapshot with another version is ignored
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = CatalogSnapshot(path)
+    except SnapshotError as e:
+        print(f"Ignoring catalog snapshot: {e}")
+        return None
+    if expected_version is not None and snapshot.version != expected_version:
+        snapshot.close()
+        return None
+    return snapshot
@@ -3,10 +3,16 @@ Enhanced CLI for Ishuri-Connect
 Demonstrates: Functions, Menu systems, User interaction, Lists, Dictionaries
 """
 
+import os
+import time
 from colorama import Fore, Style, init
-from src.utils import validate_email
-from src.models import Student, School, Application, sort_schools_by_match
-from database.db import Database
+from src.utils import validate_email, COMBINATION_SUBJECTS
+from src import gazetteer
+from src.models import (Student, School, Application, sort_schools_by_match, categorize_schools,
+                        RECOMMENDATION_SECONDS)
+from database.db import Database, DatabaseError
+# Ranks, admissions, facets, replay, prefetch, metrics and profiling are imported
+# inside the menu actions that use them, so the first menu appears sooner
 
 # Initialize colorama
 init(autoreset=True)
@@ -41,14 +47,19 @@ def print_menu(title, options):
     print()
 
 
-def get_marks_input():
+def get_marks_input(subjects=()):
+    """
+    Ask for marks one by one; the first ones are labelled with `subjects`
+    (the student's combination subjects), later ones are numbered
+    """
     marks = []  # Using list
     print(Fore.CYAN + "\n  📊 Enter your marks (press Enter to finish):\n" + Style.RESET_ALL)
     
     i = 1
     while True:
         try:
-            mark_input = input(Fore.WHITE + f"  📝 Mark #{i}: " + Style.RESET_ALL).strip()
+            label = subjects[i - 1] if i <= len(subjects) else f"Mark #{i}"
+            mark_input = input(Fore.WHITE + f"  📝 {label}: " + Style.RESET_ALL).strip()
             if mark_input == "":
                 break
             
@@ -101,16 +112,8 @@ def get_district_choice():
     Get student's district/province with organized menu
     Demonstrates: nested dictionaries, complex data structures
     """
-    districts = {
-        "Kigali": ["Kigali City", "Gasabo", "Kicukiro", "Nyarugenge"],
-        "Northern": ["Musanze", "Gicumbi", "Burera", "Gakenke", "Rulindo"],
-        "Southern": ["Huye", "Nyanza", "Muhanga", "Ruhango", "Nyamagabe", "Nyaruguru", "Gisagara", "Kamonyi"],
-        "Eastern": ["Rwamagana", "Nyagatare", "Gatsibo", "Kayonza", "Kirehe", "Ngoma", "Bugesera"],
-        "Western": ["Rubavu", "Rusizi", "Nyamasheke", "Karongi", "Rutsiro", "Ngororero", "Nyabihu"]
-    }
-    
     print(Fore.CYAN + "\n  🌍 Select your province first:\n" + Style.RESET_ALL)
-    provinces = list(districts.keys())
+    provinces = gazetteer.PROVINCES
     for i, province in enumerate(provinces, 1):
         print(f"  {Fore.YELLOW}{i}.{Style.RESET_ALL} {province}")
     
@@ -120,7 +123,7 @@ def get_district_choice():
             selected_province = provinces[province_choice - 1]
             
             print(Fore.CYAN + f"\n  📍 Select district in {selected_province}:\n" + Style.RESET_ALL)
-            district_list = districts[selected_province]
+            district_list = gazetteer.district_names(selected_province)
             for i, district in enumerate(district_list, 1):
                 print(f"  {Fore.YELLOW}{i}.{Style.RESET_ALL} {district}")
             
@@ -183,8 +186,12 @@ def register_student(db):
     # Previous education
     secondary_school = input("  🏫 Secondary school attended: ").strip()
     
+    # Subject combination (asked first so marks can be entered per subject)
+    subject_combination = get_subject_combination()
+    print_success(f"Selected: {subject_combination}")
+    
     # Get marks for aggregate calculation
-    marks = get_marks_input()
+    marks = get_marks_input(COMBINATION_SUBJECTS.get(subject_combination, ()))
     if not marks:
         print_error("At least one mark is required")
         return None
@@ -199,10 +206,6 @@ def register_student(db):
     else:
         aggregate_marks = round(sum(marks)/len(marks), 2)
     
-    # Subject combination
-    subject_combination = get_subject_combination()
-    print_success(f"Selected: {subject_combination}")
-    
     # Location information
     print(Fore.CYAN + "\n  🌍 Where are you from?" + Style.RESET_ALL)
     location_from, province_from = get_district_choice()
@@ -234,9 +237,17 @@ def register_student(db):
         preferred_boarding=preferred_boarding
     )
     
-    # Save to database
-    student_id = db.insert_student(student)
+    # Save to database - one commit for the whole registration
+    try:
+        with db.transaction():
+            student_id = db.insert_student(student)
+    except DatabaseError as e:
+        print_error(str(e))
+        student_id = None
+    
     if student_id:
+        from src.ranks import note_registration
+        note_registration(student)  # the profile's rank counts the new student at once
         print_success(f"✅ Registration successful! Student ID: {student_id}")
         print(f"  {Fore.CYAN}Welcome {student.get_full_name()}!{Style.RESET_ALL}")
         print_info(f"Aggregate: {student.aggregate_marks}% | Combination: {student.subject_combination}")
@@ -264,6 +275,7 @@ def view_student_profile(db, student):
     print(f"  {Fore.CYAN}Email:{Style.RESET_ALL} {student.email}")
     print(f"  {Fore.CYAN}Student ID:{Style.RESET_ALL} {student.student_id}")
     print(f"  {Fore.CYAN}Aggregate:{Style.RESET_ALL} {student.aggregate_marks}%")
+    print_student_rank(db, student)
     
     # Educational background
     if student.secondary_school:
@@ -284,27 +296,81 @@ def view_student_profile(db, student):
     # Display marks if available
     if student.marks:
         print(f"\n  {Fore.YELLOW}Individual Marks:{Style.RESET_ALL}")
-        for i, mark in enumerate(student.marks, 1):  # List iteration
-            print(f"    {i}. {mark}%")
+        for subject, mark in student.subject_marks().items():  # Dictionary iteration
+            print(f"    {subject}: {mark}%")
 
 
 # ==================== SCHOOL FUNCTIONS ====================
 
-def view_all_schools(db):
+def print_student_rank(db, student):
+    """Rank and percentile among students of the same combination and nationally"""
+    from src.ranks import rank_index
+    
+    try:
+        ranking = rank_index(db).summary(student.aggregate_marks, student.subject_combination or '')
+    except (OSError, ValueError, DatabaseError) as e:
+        print_error(f"Rank not available: {e}")
+        return
+    print(f"  {Fore.CYAN}Rank ({ranking['combination']}):{Style.RESET_ALL} {ranking['rank']} of {ranking['of']}"
+          f" - at or above {ranking['percentile']}% of them")
+    print(f"  {Fore.CYAN}National rank:{Style.RESET_ALL} {ranking['national_rank']} of {ranking['national_of']}"
+          f" ({ranking['national_percentile']}th percentile)")
+
+
+def view_all_schools(db, prefetcher=None):
     """
-    Display all schools
-    Demonstrates: List operations, for loop
+    Browse schools with filters (province, district, type, boarding, combination,
+    program field) and live counts for every option
+    Demonstrates: List operations, for loop, dictionaries
     """
+    from src.facets import FACETS, FACET_LABELS, facet_index_for
+    
     print_header("🏫  AVAILABLE SCHOOLS")
     
-    schools = db.get_all_schools()  # Returns list of objects
+    with db.stats.operation('view_all_schools'):
+        schools = prefetcher.get('schools') if prefetcher else db.get_all_schools()  # Returns list of objects
     
     if not schools:
         print_info("No schools available")
         return schools
     
-    print(f"\n  {Fore.GREEN}Found {len(schools)} schools:{Style.RESET_ALL}\n")
+    index = facet_index_for(schools)
+    filters = {}  # facet -> chosen value
+    while True:
+        result = index.search(filters)
+        active = ', '.join(f"{FACET_LABELS[facet]}: {value}" for facet, value in filters.items())
+        print(f"\n  {Fore.GREEN}Found {len(result)} schools{Style.RESET_ALL}" + (f" ({active})" if active else ""))
+        for number, facet in enumerate(FACETS, 1):
+            options = ', '.join(f"{value} ({count})" for value, count in list(result.counts[facet].items())[:5])
+            print(f"  {Fore.YELLOW}{number}.{Style.RESET_ALL} {FACET_LABELS[facet]}: {options}")
+        
+        choice = input(f"\n  Filter by (1-{len(FACETS)}), L to list schools, C to clear, Enter to go back: ").strip().lower()
+        if choice == "":
+            break
+        elif choice == "l":
+            print_school_list(result.schools)
+        elif choice == "c":
+            filters = {}
+        elif choice.isdigit() and 1 <= int(choice) <= len(FACETS):
+            facet = FACETS[int(choice) - 1]
+            values = list(result.counts[facet].items())
+            print()
+            for number, (value, count) in enumerate(values, 1):
+                print(f"    {Fore.YELLOW}{number}.{Style.RESET_ALL} {value} ({count})")
+            pick = input(f"  {FACET_LABELS[facet]} (number, Enter for any): ").strip()
+            if pick.isdigit() and 1 <= int(pick) <= len(values):
+                filters[facet] = values[int(pick) - 1][0]
+            else:
+                filters.pop(facet, None)
+        else:
+            print_error("Invalid option")
     
+    return result.schools
+
+
+def print_school_list(schools):
+    """Print schools with location, cutoffs, boarding and program count"""
+    print()
     for i, school in enumerate(schools, 1):  # List enumeration
         print(f"  {Fore.YELLOW}{i}. {school.name}{Style.RESET_ALL}")
         print(f"     📍 Location: {school.district}, {school.province}")
@@ -312,15 +378,17 @@ def view_all_schools(db):
         print(f"     🏠 Boarding: {school.boarding_type}")
         print(f"     📚 Programs: {len(school.programs)}")
         print()
-    
-    return schools
 
 
-def get_school_recommendations(db, student, search_program=None):
+def get_school_recommendations(db, student, search_program=None, prefetcher=None):
     """
     Get intelligent personalized school recommendations with keyword filtering
     Demonstrates: Complex logic, sorting, tuple usage, multi-criteria matching
+    prefetcher: optional SessionPrefetcher holding the catalog already loaded
     """
+    from src.admissions import load_admission_tables
+    from src.replay import record_matching
+    
     print_header("🎯  INTELLIGENT SCHOOL MATCHING")
     
     # Use provided search_program or student's desired program
@@ -333,58 +401,24 @@ def get_school_recommendations(db, student, search_program=None):
     print(f"  Searching for: {Fore.YELLOW}{desired_program or 'Any Program'}{Style.RESET_ALL}")
     print(f"  Preferred Location: {student.preferred_location or 'Any'}")
     
-    # Get ALL schools from database
-    all_schools = db.get_all_schools()
+    # Get ALL schools from database (timed as one high-level operation)
+    start = time.perf_counter()
+    with db.stats.operation('get_school_recommendations'):
+        all_schools = prefetcher.get('schools') if prefetcher else db.get_all_schools()
     
     if not all_schools:
         print_error("No schools found in database")
         return
     
-    # Remove duplicates by school ID
-    unique_schools = {}
-    for school in all_schools:
-        if school.school_id not in unique_schools:
-            unique_schools[school.school_id] = school
-    all_schools = list(unique_schools.values())
-    
     # Categorize schools based on keyword matching and marks
-    schools_with_matching_programs = []  # Has desired program AND student qualifies
-    schools_with_program_no_marks = []   # Has desired program BUT marks too low
-    schools_no_program_with_marks = []   # No desired program BUT marks qualify
-    schools_no_program_no_marks = []     # No desired program AND marks too low
+    categories = categorize_schools(all_schools, student, desired_program)
+    RECOMMENDATION_SECONDS.observe(time.perf_counter() - start, ('menu',))
+    record_matching(db, student, desired_program, all_schools, time.perf_counter() - start)
+    schools_with_matching_programs = categories['matching']          # Has desired program AND student qualifies
+    schools_with_program_no_marks = categories['program_no_marks']   # Has desired program BUT marks too low
+    schools_no_program_with_marks = categories['no_program_with_marks']  # No desired program BUT marks qualify
     
     if desired_program:
-        desired_keywords = desired_program.lower().split()
-        
-        for school in all_schools:
-            has_matching_program = False
-            student_qualifies_for_school = student.aggregate_marks >= school.min_cutoff
-            has_qualifying_program = False
-            
-            if school.programs:
-                for prog in school.programs:
-                    prog_name = prog.get('program_name', '').lower()
-                    prog_cutoff = prog.get('cutoff_marks', 0)
-                    
-                    # Check if program matches any keyword
-                    matches_keyword = any(keyword in prog_name for keyword in desired_keywords)
-                    
-                    if matches_keyword:
-                        has_matching_program = True
-                        if student.aggregate_marks >= prog_cutoff:
-                            has_qualifying_program = True
-                            break
-            
-            # Categorize the school
-            if has_matching_program and has_qualifying_program:
-                schools_with_matching_programs.append(school)
-            elif has_matching_program and not has_qualifying_program:
-                schools_with_program_no_marks.append(school)
-            elif not has_matching_program and student_qualifies_for_school:
-                schools_no_program_with_marks.append(school)
-            else:
-                schools_no_program_no_marks.append(school)
-        
         # Display results summary
         if schools_with_matching_programs:
             print(f"\n  {Fore.GREEN}✨ Found {len(schools_with_matching_programs)} schools with '{desired_program}' programs you qualify for!{Style.RESET_ALL}")
@@ -398,14 +432,12 @@ def get_school_recommendations(db, student, search_program=None):
             print(f"  {Fore.CYAN}💡 {len(schools_no_program_with_marks)} other schools (without '{desired_program}') accept your marks{Style.RESET_ALL}")
     else:
         # No desired program - show all schools student qualifies for
-        for school in all_schools:
-            if student.aggregate_marks >= school.min_cutoff:
-                schools_with_matching_programs.append(school)
-            else:
-                schools_with_program_no_marks.append(school)
-        
         print(f"\n  {Fore.GREEN}✨ Found {len(schools_with_matching_programs)} schools that accept your marks:{Style.RESET_ALL}\n")
     
+    # Admission likelihood from pre-aggregated history, for the schools shown below
+    shown = schools_with_matching_programs[:10] + schools_with_program_no_marks[:5] + schools_no_program_with_marks[:5]
+    admissions = load_admission_tables(db, [school.school_id for school in shown])
+    
     # Display schools with matching programs
     print()
     display_count = 0
@@ -417,7 +449,8 @@ def get_school_recommendations(db, student, search_program=None):
         
         for i, school in enumerate(schools_with_matching_programs[:10], 1):
             display_count += 1
-            display_school_with_programs(school, student, i, desired_program, show_only_matching=True)
+            display_school_with_programs(school, student, i, desired_program, show_only_matching=True,
+                                         admissions=admissions)
     
     # Display schools with matching programs but marks too low
     if schools_with_program_no_marks:
@@ -427,7 +460,8 @@ def get_school_recommendations(db, student, search_program=None):
         
         for i, school in enumerate(schools_with_program_no_marks[:5], display_count + 1):
             display_count += 1
-            display_school_with_programs(school, student, i, desired_program, show_only_matching=True, marks_insufficient=True)
+            display_school_with_programs(school, student, i, desired_program, show_only_matching=True, marks_insufficient=True,
+                                         admissions=admissions)
     
     # Display other schools (no desired program but marks qualify)
     if schools_no_program_with_marks and len(schools_with_matching_programs) < 5:
@@ -436,7 +470,8 @@ def get_school_recommendations(db, student, search_program=None):
         print(f"  {Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
         
         for i, school in enumerate(schools_no_program_with_marks[:5], display_count + 1):
-            display_school_with_programs(school, student, i, desired_program, show_only_matching=False)
+            display_school_with_programs(school, student, i, desired_program, show_only_matching=False,
+                                         admissions=admissions)
     
     # Offer to search for different program
     print(f"\n  {Fore.CYAN}{'─' * 70}{Style.RESET_ALL}")
@@ -453,15 +488,19 @@ def get_school_recommendations(db, student, search_program=None):
     if choice == "1":
         new_program = input(f"\n  {Fore.CYAN}Enter program to search (e.g., Medicine, Engineering, Business): {Style.RESET_ALL}").strip()
         if new_program:
-            get_school_recommendations(db, student, search_program=new_program)
+            get_school_recommendations(db, student, search_program=new_program, prefetcher=prefetcher)
     elif choice == "2":
-        get_school_recommendations(db, student, search_program=None)
+        get_school_recommendations(db, student, search_program=None, prefetcher=prefetcher)
 
 
-def display_school_with_programs(school, student, index, desired_program, show_only_matching=False, marks_insufficient=False):
+def display_school_with_programs(school, student, index, desired_program, show_only_matching=False, marks_insufficient=False,
+                                 admissions=None):
     """
     Display a single school with its programs
+    admissions: optional AdmissionTables, to show the admission likelihood
     """
+    from src.admissions import describe_likelihood
+    
     # Color code by how much above cutoff the student is
     if marks_insufficient:
         badge = "❌ Marks Too Low"
@@ -482,6 +521,11 @@ def display_school_with_programs(school, student, index, desired_program, show_o
     print(f"  {Fore.CYAN}│{Style.RESET_ALL} {Fore.YELLOW}#{index}. {school.name}{Style.RESET_ALL}" + " " * (68 - len(school.name) - len(str(index)) - 4) + f"{Fore.CYAN}│{Style.RESET_ALL}")
     print(f"  {Fore.CYAN}│{Style.RESET_ALL}    {color}{badge}{Style.RESET_ALL} - Your marks: {student.aggregate_marks}% (Min: {school.min_cutoff}%)" + " " * (10) + f"{Fore.CYAN}│{Style.RESET_ALL}")
     print(f"  {Fore.CYAN}│{Style.RESET_ALL}    📍 {school.district}, {school.province} | 🏠 {school.boarding_type}" + " " * (25) + f"{Fore.CYAN}│{Style.RESET_ALL}")
+    if admissions is not None:
+        likelihood = admissions.likelihood(school.school_id, student.aggregate_marks)
+        if likelihood is not None:
+            text = f"🎲 Admission likelihood: {describe_likelihood(likelihood)}"
+            print(f"  {Fore.CYAN}│{Style.RESET_ALL}    {text}" + " " * max(0, 65 - len(text)) + f"{Fore.CYAN}│{Style.RESET_ALL}")
     
     # Show programs
     if school.programs:
@@ -566,16 +610,20 @@ def apply_to_school(db, student):
         if 1 <= choice <= len(schools):
             selected_school = schools[choice - 1]  # List indexing
             
-            # Check existing application
-            if db.check_existing_application(student.student_id, selected_school.school_id):
-                print_error("You already applied to this school")
-                return
-            
-            # Create Application object
-            application = Application(student.student_id, selected_school.school_id)
+            # Check and insert in one transaction (single commit, clean rollback)
+            try:
+                with db.transaction():
+                    if db.check_existing_application(student.student_id, selected_school.school_id):
+                        print_error("You already applied to this school")
+                        return
+                    
+                    # Create Application object
+                    application = Application(student.student_id, selected_school.school_id)
+                    app_id = db.insert_application(application)
+            except DatabaseError as e:
+                print_error(str(e))
+                app_id = None
             
-            # Save to database
-            app_id = db.insert_application(application)
             if app_id:
                 print_success(f"Application submitted successfully!")
                 print_info(f"Application ID: {app_id}")
@@ -589,14 +637,17 @@ def apply_to_school(db, student):
         print_error("Invalid input")
 
 
-def view_my_applications(db, student):
+def view_my_applications(db, student, prefetcher=None):
     """
     View student's applications
     Demonstrates: Database JOIN, list operations, dictionary
     """
     print_header("📋  MY APPLICATIONS")
     
-    applications = db.get_applications_by_student(student.student_id)
+    if prefetcher:
+        applications = prefetcher.get('applications')
+    else:
+        applications = db.get_applications_by_student(student.student_id)
     
     if not applications:
         print_info("You haven't applied to any schools yet")
@@ -612,7 +663,11 @@ def view_my_applications(db, student):
     
     # Display each application
     for i, app in enumerate(applications, 1):
-        school = db.get_school_by_id(app.school_id)
+        # School names come with the applications (one JOIN, no query per row)
+        school_name = app.school_name
+        if school_name is None:
+            school = db.get_school_by_id(app.school_id)
+            school_name = school.name if school else None
         
         # Color based on status
         if app.status == "Accepted":
@@ -629,8 +684,8 @@ def view_my_applications(db, student):
             icon = "📋"
         
         print(f"  {color}{icon} Application #{app.application_id}{Style.RESET_ALL}")
-        if school:
-            print(f"     School: {school.name}")
+        if school_name:
+            print(f"     School: {school_name}")
         print(f"     Status: {color}{app.status}{Style.RESET_ALL}")
         print(f"     Applied: {app.applied_date}")
         print()
@@ -643,14 +698,14 @@ def view_my_applications(db, student):
 
 # ==================== STATISTICS FUNCTIONS ====================
 
-def view_statistics(db):
+def view_statistics(db, prefetcher=None):
     """
     Display system statistics
     Demonstrates: Dictionary operations, formatted output
     """
     print_header("📊  SYSTEM STATISTICS")
     
-    stats = db.get_statistics()  # Returns dictionary
+    stats = prefetcher.get('statistics') if prefetcher else db.get_statistics()  # Returns dictionary
     
     print(f"\n  {Fore.CYAN}{'─' * 60}{Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}Total Students:{Style.RESET_ALL}        {stats['total_students']}")
@@ -660,6 +715,34 @@ def view_statistics(db):
     print(f"  {Fore.CYAN}{'─' * 60}{Style.RESET_ALL}\n")
 
 
+def search_programs_by_budget(db, student):
+    """
+    Programs the student can afford, optionally limited by duration
+    Demonstrates: input validation, list of dictionaries, formatted output
+    """
+    print_header("💰  PROGRAMS WITHIN MY BUDGET")
+    
+    try:
+        max_fees = int(input("\n  💵 Maximum fees per year (RWF): ").strip().replace(',', ''))
+    except ValueError:
+        print_error("Please enter an amount in RWF, e.g. 1,000,000")
+        return
+    max_years_input = input("  ⏳ Maximum duration in years (press Enter for any): ").strip()
+    max_years = int(max_years_input) if max_years_input.isdigit() else None
+    program_name = input(f"  🎓 Program (press Enter for any{', e.g. ' + student.desired_program if student.desired_program else ''}): ").strip()
+    
+    programs = db.search_programs_by_budget(max_fees, max_years=max_years, program_name=program_name or None)
+    if not programs:
+        print_info(f"No programs found under {max_fees:,} RWF per year")
+        return
+    
+    print(f"\n  {Fore.GREEN}✨ {len(programs)} programs within {max_fees:,} RWF per year (cheapest first):{Style.RESET_ALL}\n")
+    for i, program in enumerate(programs, 1):
+        print(f"  {Fore.YELLOW}{i:2}.{Style.RESET_ALL} {program['program_name']} - {program['school_name']} ({program.get('district')})")
+        print(f"      Fees: {program.get('fees_range')} | Duration: {program.get('duration_years')}yrs | Cutoff: {program.get('cutoff_marks')}%")
+    print()
+
+
 # ==================== MAIN MENU SYSTEM ====================
 
 def student_menu(db, student):
@@ -674,31 +757,51 @@ def student_menu(db, student):
         "4": "Apply to School",
         "5": "View My Applications",
         "6": "View Statistics",
+        "7": "Search Programs by Budget",
         "0": "Logout"
     }
     
+    # Warm the catalog, applications and statistics while the student reads the menu
+    from src.prefetch import SessionPrefetcher
+    prefetcher = SessionPrefetcher(db, student)
+    prefetcher.start()
+    try:
+        student_menu_loop(db, student, menu_options, prefetcher)
+    finally:
+        prefetcher.close()
+
+
+def student_menu_loop(db, student, menu_options, prefetcher):
+    """Student menu loop - actions read from the session prefetcher"""
+    from src.profiling import profile_action
+    
     while True:
         print_menu(f"👤 STUDENT MENU - Welcome {student.get_full_name()}!", menu_options)
         
         choice = input(f"  {Fore.YELLOW}Choose an option: {Style.RESET_ALL}").strip()
         
-        if choice == "1":
-            view_student_profile(db, student)
-        elif choice == "2":
-            view_all_schools(db)
-        elif choice == "3":
-            get_school_recommendations(db, student)
-        elif choice == "4":
-            apply_to_school(db, student)
-        elif choice == "5":
-            view_my_applications(db, student)
-        elif choice == "6":
-            view_statistics(db)
-        elif choice == "0":
-            print_success("Logged out successfully!")
-            break
-        else:
-            print_error("Invalid option")
+        # No-op unless profiling is enabled (python main.py --profile)
+        with profile_action(f"student_menu.{menu_options.get(choice, 'invalid')}"):
+            if choice == "1":
+                view_student_profile(db, student)
+            elif choice == "2":
+                view_all_schools(db, prefetcher)
+            elif choice == "3":
+                get_school_recommendations(db, student, prefetcher=prefetcher)
+            elif choice == "4":
+                apply_to_school(db, student)
+                prefetcher.refresh('applications', 'statistics')
+            elif choice == "5":
+                view_my_applications(db, student, prefetcher)
+            elif choice == "6":
+                view_statistics(db, prefetcher)
+            elif choice == "7":
+                search_programs_by_budget(db, student)
+            elif choice == "0":
+                print_success("Logged out successfully!")
+                break
+            else:
+                print_error("Invalid option")
         
         input(f"\n  {Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
 
@@ -708,6 +811,8 @@ def main_menu(db):
     Main menu - entry point
     Demonstrates: Menu system, while loop, function organization
     """
+    from src.profiling import profile_action
+    
     menu_options = {
         "1": "Signup Student",
         "2": "Login (Existing Student)",
@@ -721,14 +826,22 @@ def main_menu(db):
         
         choice = input(f"  {Fore.YELLOW}Choose an option: {Style.RESET_ALL}").strip()
         
+        # Schools can be browsed from the catalog snapshot without a connection
+        if choice in ("1", "2", "4") and not db.wait_until_connected():
+            print_error("Failed to connect to database!")
+            print_info("Please check your .env configuration")
+            continue
+        
         if choice == "1":
-            student = register_student(db)
+            with profile_action('main_menu.signup'):
+                student = register_student(db)
             if student:
                 student_menu(db, student)
         
         elif choice == "2":
             email = input("\n  📧 Enter your email: ").strip()
-            student = db.get_student_by_email(email)
+            with profile_action('main_menu.login'):
+                student = db.get_student_by_email(email)
             if student:
                 print_success("Login successful!")
                 student_menu(db, student)
@@ -736,11 +849,13 @@ def main_menu(db):
                 print_error("Student not found")
         
         elif choice == "3":
-            view_all_schools(db)
+            with profile_action('main_menu.view_all_schools'):
+                view_all_schools(db)
             input(f"\n  {Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
         
         elif choice == "4":
-            view_statistics(db)
+            with profile_action('main_menu.view_statistics'):
+                view_statistics(db)
             input(f"\n  {Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
         
         elif choice == "0":
@@ -756,18 +871,40 @@ def start_application():
     Start the application
     Demonstrates: Function as entry point, error handling
     """
-    # Connect to database
+    from src.metrics import start_file_export
+    
     db = Database()
-    if not db.connect():
-        print_error("Failed to connect to database!")
-        print_info("Please check your .env configuration")
-        return
+    start_file_export()  # only when ISHURI_METRICS_FILE is set
+    
+    # Catalog from the memory-mapped snapshot - no MySQL round trip before the menu
+    snapshot_path = os.getenv('CATALOG_SNAPSHOT', 'catalog.snapshot')
+    if snapshot_path:
+        db.load_catalog_snapshot(snapshot_path, check_version=False)
+    
+    def verify_snapshot():
+        # Rebuilt here if the catalog changed since the file was written
+        if snapshot_path:
+            db.load_catalog_snapshot(snapshot_path)
+    
+    # Connect while the menu renders; the first query waits for it
+    db.connect_in_background(then=verify_snapshot)
     
-    print_success("Database connected successfully!")
+    # Optional anonymized session recording for replay: ISHURI_RECORD=sessions.jsonl
+    recorder = None
+    if os.getenv('ISHURI_RECORD'):
+        from src.replay import SessionRecorder
+        recorder = SessionRecorder(os.environ['ISHURI_RECORD'])
     
     try:
-        main_menu(db)
+        main_menu(recorder.wrap(db) if recorder else db)
     except KeyboardInterrupt:
         print("\n\n" + Fore.YELLOW + "  👋 Goodbye!" + Style.RESET_ALL)
     finally:
         db.disconnect()
+        if recorder:
+            recorder.close()
+        # Optional latency report: DB_STATS_REPORT=1 python main.py
+        if os.getenv('DB_STATS_REPORT'):
+            print(db.stats.report())
+            if db.cache is not None:
+                print(f"query cache: {db.cache.stats()}")
@@ -0,0 +1,521 @@
+"""
+Non-interactive command mode for Ishuri-Connect
+Lets cron jobs and counselling tools script recommendations, imports, exports
+and statistics without the banner, menus or input() prompts.
+
+    python main.py recommend --email student@example.com
+    python main.py recommend --emails-file emails.txt --format csv
+    python main.py stats
+    python main.py snapshot
+    python main.py import students.csv
+    python main.py export applications --format csv --gzip --output apps.csv.gz
+    python main.py benchmark --email student@example.com --iterations 50
+    python main.py serve --port 8080
+    python main.py replay sessions.jsonl --compare last_replay.json
+    python main.py program-scores "Civil Engineering" --combination PCM --format csv
+    python main.py rank --aggregate 72 --combination PCM --histogram
+    python main.py admissions --school-id 3 --format csv
+
+Output goes to stdout as JSON (one object per line) or CSV; errors go to stderr.
+Add --profile (or set ISHURI_PROFILE=1) to write cProfile and collapsed-stack files.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+from src.models import Student, build_recommendations
+from src.metrics import start_file_export
+from src.profiling import profile_action
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_NOT_FOUND = 3
+
+RECOMMENDATION_FIELDS = ['email', 'rank', 'category', 'school_id', 'school_name', 'district',
+                         'province', 'min_cutoff', 'score', 'matching_programs']
+
+ADMISSION_FIELDS = ['school_id', 'intake', 'applicants', 'accepted', 'rejected', 'pending',
+                    'acceptance_rate', 'accepted_p25', 'accepted_median', 'accepted_p75']
+
+
+def build_parser():
+    """Argument parser with one subcommand per scripted workload"""
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description='Ishuri Connect - run without arguments for the interactive menu.',
+        epilog='--profile anywhere on the command line profiles the run (see src/profiling.py).'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    recommend = subparsers.add_parser('recommend', help='School recommendations for one or more students')
+    recommend.add_argument('--email', action='append', default=[], help='Student email (repeatable)')
+    recommend.add_argument('--emails-file', help="File with one email per line ('-' for stdin)")
+    recommend.add_argument('--program', help="Program keywords (default: the student's desired program)")
+    recommend.add_argument('--limit', type=int, default=10, help='Max schools per category (default 10)')
+    recommend.add_argument('--format', choices=('json', 'csv'), default='json')
+
+    import_cmd = subparsers.add_parser('import', help='Import students from a results CSV file')
+    import_cmd.add_argument('file', help="CSV file ('-' for stdin)")
+    import_cmd.add_argument('--rejects', help='Where to write rejected rows (default: <file>.rejects.csv)')
+    import_cmd.add_argument('--chunk-size', type=int, default=1000, help='Rows per batch insert')
+    import_cmd.add_argument('--workers', type=int, default=4, help='Validation threads')
+    import_cmd.add_argument('--progress', action='store_true', help='Report rows/s on stderr per chunk')
+
+    export = subparsers.add_parser('export', help='Stream students, applications or recommendations')
+    export.add_argument('dataset', choices=('students', 'applications', 'recommendations'))
+    export.add_argument('--format', choices=('csv', 'jsonl', 'json'), default='jsonl',
+                        help='json is an alias for jsonl')
+    export.add_argument('--output', help="File to write (default: stdout)")
+    export.add_argument('--gzip', action='store_true', help='Compress the output')
+    export.add_argument('--chunk-size', type=int, default=1000, help='Rows fetched per query')
+    export.add_argument('--combination', help='Only students with this subject combination')
+    export.add_argument('--province', help="Only this province (student's home district, or the school's)")
+
+    stats = subparsers.add_parser('stats', help='System statistics')
+    stats.add_argument('--format', choices=('json', 'csv'), default='json')
+
+    subparsers.add_parser('migrate', help='Add the tables and columns newer versions need (safe to re-run)')
+
+    snapshot = subparsers.add_parser('snapshot', help='Write the catalog snapshot file')
+    snapshot.add_argument('--output', help='Snapshot path (default: $CATALOG_SNAPSHOT or catalog.snapshot)')
+
+    benchmark = subparsers.add_parser('benchmark', help='Time the recommendation path')
+    benchmark.add_argument('--email', help='Student to benchmark (default: a synthetic profile)')
+    benchmark.add_argument('--program', help='Program keywords to search for')
+    benchmark.add_argument('--iterations', type=int, default=20)
+
+    replay = subparsers.add_parser('replay', help='Re-run recorded sessions and compare latencies')
+    replay.add_argument('file', help='Recording made with ISHURI_RECORD=<file>')
+    replay.add_argument('--skip-writes', action='store_true',
+                        help='Do not replay inserts/updates (the session student is still created)')
+    replay.add_argument('--output', help='Save the replay report (JSON) for a later --compare')
+    replay.add_argument('--compare', help='Earlier replay report to compute deltas against')
+
+    scores = subparsers.add_parser('program-scores',
+                                   help='Subject-weighted scores and minimum-mark eligibility for a program')
+    scores.add_argument('program', help='Program name, e.g. "Civil Engineering"')
+    scores.add_argument('--combination', help='Only students with this subject combination')
+    scores.add_argument('--eligible-only', action='store_true', help='Skip students below a subject minimum')
+    scores.add_argument('--chunk-size', type=int, default=1000, help='Students scored per batch')
+    scores.add_argument('--format', choices=('json', 'csv'), default='json')
+
+    rank = subparsers.add_parser('rank', help='Rank and percentile of an aggregate (or of a student)')
+    rank.add_argument('--email', help="Use this student's aggregate and combination")
+    rank.add_argument('--aggregate', type=float, help='Aggregate marks, e.g. 72.5')
+    rank.add_argument('--combination', help='Rank within this subject combination')
+    rank.add_argument('--histogram', action='store_true', help='Also print students per 10%% band')
+    rank.add_argument('--rebuild', action='store_true', help='Rebuild the index file from the students table')
+
+    admissions = subparsers.add_parser('admissions', help='Applicants, acceptance rates and admitted aggregates per intake')
+    admissions.add_argument('--school-id', type=int, help='Only this school')
+    admissions.add_argument('--rebuild', action='store_true', help='Recount the tables from the applications table')
+    admissions.add_argument('--format', choices=('json', 'csv'), default='json')
+
+    serve = subparsers.add_parser('serve', help='Run the HTTP JSON service')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--workers', type=int, default=16, help='Database threads (default 16)')
+    serve.add_argument('--max-pending', type=int, default=2000,
+                       help='Requests in flight before answering 503 (default 2000)')
+    serve.add_argument('--timeout', type=float, default=5.0, help='Seconds per request before 504')
+    serve.add_argument('--catalog-ttl', type=float, default=60.0,
+                       help='Seconds to reuse the in-memory catalog (default 60)')
+
+    return parser
+
+
+def error(message):
+    """Print an error to stderr (stdout is reserved for data)"""
+    print(f"error: {message}", file=sys.stderr)
+
+
+def write_json_line(record, out):
+    out.write(json.dumps(record, default=str))
+    out.write('\n')
+
+
+# ==================== RECOMMEND ====================
+
+def read_emails(args):
+    """Emails from --email and --emails-file, in order"""
+    emails = list(args.email)
+    if args.emails_file:
+        handle = sys.stdin if args.emails_file == '-' else open(args.emails_file, encoding='utf-8')
+        try:
+            emails.extend(line.strip() for line in handle if line.strip())
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+    return emails
+
+
+def cmd_recommend(db, args, out):
+    emails = read_emails(args)
+    if not emails:
+        error("give at least one --email or --emails-file")
+        return EXIT_ERROR
+
+    # Load the catalog once for every student in this run
+    use_catalog_snapshot(db)
+    schools = db.get_all_schools()
+    writer = None
+    if args.format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=RECOMMENDATION_FIELDS)
+        writer.writeheader()
+
+    missing = 0
+    for email in emails:
+        student = db.get_student_by_email(email)
+        if not student:
+            missing += 1
+            error(f"student not found: {email}")
+            if writer is None:
+                write_json_line({'email': email, 'error': 'student not found'}, out)
+            continue
+
+        recommendations = build_recommendations(student, schools, args.program, args.limit)
+        if writer is None:
+            write_json_line({'email': email, 'student_id': student.student_id,
+                             'aggregate_marks': student.aggregate_marks,
+                             'recommendations': recommendations}, out)
+        else:
+            for row in recommendations:
+                row['email'] = email
+                row['matching_programs'] = '; '.join(row['matching_programs'])
+                writer.writerow(row)
+
+    return EXIT_NOT_FOUND if missing else EXIT_OK
+
+
+# ==================== IMPORT / EXPORT ====================
+
+def cmd_import(db, args, out):
+    """Stream a results CSV into the students table; rejects go to a side file"""
+    from src.importer import import_students
+
+    rejects_path = args.rejects or (
+        'rejects.csv' if args.file == '-' else args.file.rsplit('.', 1)[0] + '.rejects.csv')
+
+    def progress(result):
+        print(f"  {result.rows_read} rows, {result.inserted} inserted, "
+              f"{result.rejected} rejected ({result.rows_per_second:.0f} rows/s)", file=sys.stderr)
+
+    handle = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+    try:
+        with open(rejects_path, 'w', newline='', encoding='utf-8') as rejects_handle:
+            result = import_students(db, handle, rejects_handle, chunk_size=args.chunk_size,
+                                     workers=args.workers, progress=progress if args.progress else None)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+    summary = result.to_dict()
+    summary['rejects_file'] = rejects_path
+    write_json_line(summary, out)
+    return EXIT_OK
+
+
+def cmd_export(db, args, out):
+    """Stream a dataset to stdout or --output, as CSV or JSON Lines"""
+    from src.exporter import EXPORTERS, open_output
+
+    fmt = 'jsonl' if args.format == 'json' else args.format
+    exporter = EXPORTERS[args.dataset]
+    if args.dataset == 'recommendations':
+        use_catalog_snapshot(db)
+    try:
+        # Without --output the rows go to `out` (the real stdout; sys.stdout is
+        # redirected to stderr while commands run)
+        with open_output(args.output or '-', args.gzip, stream=out) as handle:
+            count = exporter(db, handle, fmt, args.chunk_size, args.combination, args.province)
+    except ValueError as e:
+        error(str(e))
+        return EXIT_ERROR
+    print(f"exported {count} {args.dataset} rows", file=sys.stderr)
+    return EXIT_OK
+
+
+# ==================== STATS / MIGRATE / SNAPSHOT / BENCHMARK ====================
+
+def cmd_stats(db, args, out):
+    stats = db.get_statistics()
+    if args.format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(['metric', 'value'])
+        writer.writerows(stats.items())
+    else:
+        write_json_line(stats, out)
+    return EXIT_OK
+
+
+def snapshot_path():
+    """Catalog snapshot location ('' disables snapshots)"""
+    return os.getenv('CATALOG_SNAPSHOT', 'catalog.snapshot')
+
+
+def use_catalog_snapshot(db):
+    """
+    Serve the catalog from the snapshot file (checked against the live catalog)
+    Only the commands that read the whole catalog call this - the check costs a
+    CHECKSUM TABLE and may rewrite the file.
+    """
+    if snapshot_path():
+        db.load_catalog_snapshot(snapshot_path())
+
+
+def cmd_migrate(db, args, out):
+    """Apply the schema upgrades; the only command that changes the schema"""
+    start = time.perf_counter()
+    if not db.migrate():
+        error("schema upgrade failed - see the messages above")
+        return EXIT_ERROR
+    write_json_line({'migrated': True, 'seconds': round(time.perf_counter() - start, 3)}, out)
+    return EXIT_OK
+
+
+def cmd_snapshot(db, args, out):
+    path = args.output or snapshot_path() or 'catalog.snapshot'
+    start = time.perf_counter()
+    version = db.write_catalog_snapshot(path)
+    if version is None:
+        error("could not read the catalog from the database")
+        return EXIT_ERROR
+    write_json_line({'path': path, 'version': version, 'bytes': os.path.getsize(path),
+                     'seconds': round(time.perf_counter() - start, 3)}, out)
+    return EXIT_OK
+
+
+def cmd_benchmark(db, args, out):
+    """Time catalog load and matching separately over several iterations"""
+    if args.email:
+        student = db.get_student_by_email(args.email)
+        if not student:
+            error(f"student not found: {args.email}")
+            return EXIT_NOT_FOUND
+    else:
+        student = Student('Bench', 'Mark', 'bench@example.com', aggregate_marks=72.5,
+                          subject_combination='PCM', preferred_location='Kigali',
+                          desired_program='Computer Science')
+
+    load_times, match_times = [], []
+    for _ in range(max(args.iterations, 1)):
+        start = time.perf_counter()
+        schools = db.get_all_schools()
+        loaded = time.perf_counter()
+        build_recommendations(student, schools, args.program)
+        load_times.append((loaded - start) * 1000)
+        match_times.append((time.perf_counter() - loaded) * 1000)
+
+    def summary(samples):
+        samples = sorted(samples)
+        return {
+            'min_ms': round(samples[0], 3),
+            'p50_ms': round(samples[len(samples) // 2], 3),
+            'max_ms': round(samples[-1], 3),
+            'avg_ms': round(sum(samples) / len(samples), 3)
+        }
+
+    result = {
+        'iterations': len(load_times),
+        'schools': len(schools),
+        'catalog_load': summary(load_times),
+        'matching': summary(match_times),
+        'queries': db.stats.snapshot()['methods']
+    }
+    if db.cache is not None:
+        result['cache'] = db.cache.stats()
+    write_json_line(result, out)
+    return EXIT_OK
+
+
+# ==================== REPLAY ====================
+
+def cmd_replay(db, args, out):
+    """Replay a session recording; one JSON line per step name with latency deltas"""
+    from src.replay import Replayer, read_sessions, summarize
+
+    try:
+        sessions = read_sessions(args.file)
+    except (OSError, ValueError) as e:
+        error(f"cannot read recording: {e}")
+        return EXIT_ERROR
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, encoding='utf-8') as handle:
+                baseline = json.load(handle)
+        except (OSError, ValueError) as e:
+            error(f"cannot read comparison report: {e}")
+            return EXIT_ERROR
+
+    steps = Replayer(db, skip_writes=args.skip_writes).replay(sessions)
+    summary = summarize(steps, baseline)
+    for name, entry in summary.items():
+        write_json_line(dict(entry, step=name), out)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'recording': args.file, 'sessions': len(sessions),
+                       'summary': summary, 'steps': steps}, handle, indent=2)
+    return EXIT_OK
+
+
+# ==================== PROGRAM SCORES / RANK / ADMISSIONS ====================
+
+def cmd_program_scores(db, args, out):
+    """Score every student's per-subject marks for one program, a batch at a time"""
+    from src.marks import load_cohort, requirements_for
+
+    weights, minimums = requirements_for(args.program)
+    print(f"weights: {weights or 'average of all marks'}, minimums: {minimums or 'none'}", file=sys.stderr)
+    writer = None
+    if args.format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(['student_id', 'email', 'score', 'eligible'])
+
+    scored = eligible_count = 0
+    batch = []
+
+    def score_batch():
+        nonlocal scored, eligible_count
+        emails = {row['id']: row['email'] for row in batch}
+        for student_id, score, eligible in load_cohort(db, list(emails)).program_scores(args.program):
+            scored += 1
+            eligible_count += eligible
+            if args.eligible_only and not eligible:
+                continue
+            if writer is None:
+                write_json_line({'student_id': student_id, 'email': emails[student_id],
+                                 'score': score, 'eligible': eligible}, out)
+            else:
+                writer.writerow([student_id, emails[student_id], score, eligible])
+        batch.clear()
+
+    for row in db.iter_students(args.chunk_size, combination=args.combination):
+        batch.append(row)
+        if len(batch) >= args.chunk_size:
+            score_batch()
+    if batch:
+        score_batch()
+    print(f"scored {scored} students with marks, {eligible_count} meet the subject minimums",
+          file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_rank(db, args, out):
+    """Rank / percentile lookups on the rank index (see src/ranks.py)"""
+    from src.ranks import build_rank_index, rank_index, rank_index_path
+
+    start = time.perf_counter()
+    if args.rebuild:
+        index = build_rank_index(db, rank_index_path())
+        print(f"rank index rebuilt: {index.count()} students in {time.perf_counter() - start:.2f}s",
+              file=sys.stderr)
+    else:
+        index = rank_index(db)
+
+    aggregate, combination = args.aggregate, args.combination
+    if args.email:
+        student = db.get_student_by_email(args.email)
+        if not student:
+            error(f"student not found: {args.email}")
+            return EXIT_NOT_FOUND
+        aggregate = student.aggregate_marks if aggregate is None else aggregate
+        combination = combination or student.subject_combination
+
+    if aggregate is None:
+        record = {'students': index.count(), 'combinations': index.combinations()}
+    else:
+        record = index.summary(aggregate, combination)
+    if args.histogram:
+        record['histogram'] = index.histogram(combination)
+    write_json_line(record, out)
+    return EXIT_OK
+
+
+def cmd_admissions(db, args, out):
+    """Per-intake admissions table from the pre-aggregated admission_stats"""
+    from src.admissions import load_admission_tables
+
+    if args.rebuild:
+        start = time.perf_counter()
+        counted = db.rebuild_admission_stats()
+        print(f"admission_stats rebuilt from {counted} applications in {time.perf_counter() - start:.2f}s",
+              file=sys.stderr)
+    rows = load_admission_tables(db, [args.school_id] if args.school_id else None).summary(args.school_id)
+    if args.format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=ADMISSION_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            write_json_line(row, out)
+    return EXIT_OK
+
+
+# ==================== SERVE ====================
+
+def cmd_serve(db, args, out):
+    """Run the asyncio HTTP service until interrupted"""
+    import asyncio
+    from src.service import MatchingService, serve
+
+    use_catalog_snapshot(db)  # before the service clones db for its threads
+    service = MatchingService(db, workers=args.workers, max_pending=args.max_pending,
+                              request_timeout=args.timeout, catalog_ttl=args.catalog_ttl)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("service stopped", file=sys.stderr)
+    finally:
+        service.close()
+    return EXIT_OK
+
+
+COMMANDS = {
+    'recommend': cmd_recommend,
+    'import': cmd_import,
+    'export': cmd_export,
+    'stats': cmd_stats,
+    'migrate': cmd_migrate,
+    'snapshot': cmd_snapshot,
+    'benchmark': cmd_benchmark,
+    'serve': cmd_serve,
+    'replay': cmd_replay,
+    'program-scores': cmd_program_scores,
+    'rank': cmd_rank,
+    'admissions': cmd_admissions
+}
+
+
+def run_command(argv, out=None):
+    """
+    Entry point for command mode - returns a process exit code
+    The database module is imported here so argument errors stay fast.
+    Anything the database layer prints goes to stderr; stdout carries only data.
+    """
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+
+    with redirect_stdout(sys.stderr):
+        from database.db import Database, DatabaseError
+
+        db = Database()
+        start_file_export()  # only when ISHURI_METRICS_FILE is set
+        if not db.connect():
+            error("failed to connect to database - check your .env configuration")
+            return EXIT_ERROR
+        try:
+            with profile_action(f"command.{args.command}"):
+                return COMMANDS[args.command](db, args, out)
+        except DatabaseError as e:
+            error(str(e))
+            return EXIT_ERROR
+        finally:
+            out.flush()
+            db.disconnect()
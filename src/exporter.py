@@ -0,0 +1,143 @@
+"""
+Streaming exports for Ishuri-Connect
+Students, applications and computed recommendations go out as CSV or JSON
+Lines, optionally gzipped. Rows are fetched in keyset-paginated chunks and
+written as they arrive, so memory stays flat however large the table is.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from contextlib import contextmanager
+
+from src.models import Student, build_recommendations
+from src.utils import districts_in_province
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+STUDENT_FIELDS = ['id', 'first_name', 'last_name', 'email', 'average_mark', 'aggregate_marks',
+                  'secondary_school', 'subject_combination', 'location_from',
+                  'preferred_location', 'desired_program', 'preferred_boarding']
+
+APPLICATION_FIELDS = ['id', 'student_id', 'email', 'first_name', 'last_name', 'subject_combination',
+                      'school_id', 'school_name', 'school_province', 'status', 'applied_at']
+
+RECOMMENDATION_FIELDS = ['student_id', 'email', 'rank', 'category', 'school_id', 'school_name',
+                         'district', 'province', 'min_cutoff', 'score', 'matching_programs']
+
+
+@contextmanager
+def open_output(path, compress=False, stream=None):
+    """
+    Text stream for '-' (stream, default stdout) or a file path, gzip-compressed
+    if asked
+    """
+    if path in (None, '-'):
+        stream = stream or sys.stdout
+        if compress:
+            buffer = getattr(stream, 'buffer', None)
+            if buffer is None:
+                raise ValueError("--gzip needs --output when the output stream is not binary")
+            stream.flush()
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8', newline='') as handle:
+                    yield handle
+            buffer.flush()
+        else:
+            yield stream
+            stream.flush()
+        return
+
+    if compress:
+        handle = gzip.open(path, 'wt', encoding='utf-8', newline='')
+    else:
+        handle = open(path, 'w', encoding='utf-8', newline='')
+    with handle:
+        yield handle
+
+
+class RowWriter:
+    """Writes dictionaries as CSV (fixed columns) or JSON Lines"""
+
+    def __init__(self, handle, fmt, fields):
+        self.count = 0
+        self.fmt = fmt
+        self.handle = handle
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(handle, fieldnames=fields, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.handle.write(json.dumps(row, default=str))
+            self.handle.write('\n')
+        self.count += 1
+
+
+def student_from_row(data):
+    """Student object from a students table row"""
+    return Student(
+        first_name=data['first_name'],
+        last_name=data['last_name'],
+        email=data['email'],
+        student_id=data['id'],
+        secondary_school=data.get('secondary_school'),
+        aggregate_marks=float(data.get('aggregate_marks') or 0),
+        subject_combination=data.get('subject_combination'),
+        location_from=data.get('location_from'),
+        preferred_location=data.get('preferred_location'),
+        desired_program=data.get('desired_program'),
+        preferred_boarding=data.get('preferred_boarding') or 'no_preference'
+    )
+
+
+def export_students(db, handle, fmt='csv', chunk_size=1000, combination=None, province=None):
+    """Stream students; province filters on the district the student comes from"""
+    districts = districts_in_province(province) if province else None
+    if province and not districts:
+        raise ValueError(f"unknown province: {province}")
+    writer = RowWriter(handle, fmt, STUDENT_FIELDS)
+    for row in db.iter_students(chunk_size, combination=combination, districts=districts):
+        writer.write(row)
+    return writer.count
+
+
+def export_applications(db, handle, fmt='csv', chunk_size=1000, combination=None, province=None):
+    """Stream applications with school names; province filters on the school's province"""
+    writer = RowWriter(handle, fmt, APPLICATION_FIELDS)
+    for row in db.iter_applications(chunk_size, province=province, combination=combination):
+        writer.write(row)
+    return writer.count
+
+
+def export_recommendations(db, handle, fmt='csv', chunk_size=1000, combination=None,
+                           province=None, limit=5):
+    """
+    Compute and stream recommendations for every (filtered) student
+    The catalog is loaded once; students are streamed, one row per recommended school.
+    """
+    districts = districts_in_province(province) if province else None
+    if province and not districts:
+        raise ValueError(f"unknown province: {province}")
+    schools = db.get_all_schools()
+    writer = RowWriter(handle, fmt, RECOMMENDATION_FIELDS)
+    for row in db.iter_students(chunk_size, combination=combination, districts=districts):
+        student = student_from_row(row)
+        for recommendation in build_recommendations(student, schools, limit=limit):
+            recommendation['student_id'] = student.student_id
+            recommendation['email'] = student.email
+            if fmt == 'csv':
+                recommendation['matching_programs'] = '; '.join(recommendation['matching_programs'])
+            writer.write(recommendation)
+    return writer.count
+
+
+EXPORTERS = {
+    'students': export_students,
+    'applications': export_applications,
+    'recommendations': export_recommendations
+}
@@ -0,0 +1,183 @@
+"""
+Faceted catalog search for Ishuri-Connect
+Every facet value (a province, a district, a school type, a boarding type, a
+subject combination, a program field) has a bitmap of the schools that have it:
+bit i is set when school i of the catalog matches. A search ANDs the bitmaps of
+the chosen facets (ORing values inside one facet), so any filter combination is
+a handful of integer operations, and the live count of every remaining option
+is one AND plus a popcount.
+
+    index = FacetIndex(db.get_all_schools())
+    result = index.search({'province': 'Kigali', 'field': ['ICT', 'Engineering']})
+    result.schools              # matching School objects, in catalog order
+    result.counts['district']   # {'Gasabo': 4, 'Kicukiro': 2, ...} within the other filters
+"""
+
+from src.utils import COMBINATION_SUBJECTS
+
+FACETS = ('province', 'district', 'school_type', 'boarding', 'combination', 'field')
+
+FACET_LABELS = {
+    'province': 'Province',
+    'district': 'District',
+    'school_type': 'School type',
+    'boarding': 'Boarding',
+    'combination': 'Combination',
+    'field': 'Program field'
+}
+
+# Program field -> keywords in the program name (first matching field wins)
+PROGRAM_FIELDS = [
+    ('Health', ('medicine', 'nursing', 'pharmacy', 'health', 'dental', 'midwifery', 'clinical')),
+    ('ICT', ('computer', 'software', 'information', 'data', 'network')),
+    ('Engineering', ('engineering', 'architecture', 'mechatronics')),
+    ('Business', ('business', 'accounting', 'finance', 'economics', 'management', 'marketing')),
+    ('Agriculture', ('agriculture', 'veterinary', 'environment', 'forestry')),
+    ('Education', ('education', 'teaching')),
+    ('Law and Humanities', ('law', 'journalism', 'relations', 'languages', 'literature', 'social')),
+    ('Tourism', ('tourism', 'hospitality'))
+]
+OTHER_FIELD = 'Other'
+
+
+def program_field(program_name):
+    """Field of study of a program, from keywords in its name"""
+    name = (program_name or '').lower()
+    for field, keywords in PROGRAM_FIELDS:
+        if any(keyword in name for keyword in keywords):
+            return field
+    return OTHER_FIELD
+
+
+def _count_bits(bitmap):
+    return bin(bitmap).count('1')
+
+
+# int.bit_count is Python 3.10+; the string count is the fallback for older versions
+popcount = getattr(int, 'bit_count', _count_bits)
+
+
+def school_facet_values(school, all_combinations):
+    """{facet: set of values} for one school"""
+    combinations = {subject.strip().upper() for subject in school.required_subjects if subject.strip()}
+    return {
+        'province': {school.province} if school.province else set(),
+        'district': {school.district} if school.district else set(),
+        'school_type': {school.school_type} if school.school_type else set(),
+        'boarding': {school.boarding_type} if school.boarding_type else set(),
+        # No listed combinations means every combination is accepted
+        'combination': combinations or set(all_combinations),
+        'field': {program_field(program.get('program_name')) for program in school.programs or []}
+    }
+
+
+class FacetResult:
+    """Schools matching a search, plus live counts for every facet value"""
+
+    def __init__(self, bitmap, schools, counts):
+        self.bitmap = bitmap
+        self.schools = schools
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.schools)
+
+
+class FacetIndex:
+    """Per-facet-value bitmaps over a fixed list of schools"""
+
+    def __init__(self, schools):
+        self.schools = schools
+        self.all = (1 << len(schools)) - 1
+        self.bitmaps = {facet: {} for facet in FACETS}
+        self._names = {facet: {} for facet in FACETS}  # lower-case value -> stored value
+
+        all_combinations = set(COMBINATION_SUBJECTS)
+        for school in schools:
+            all_combinations.update(subject.strip().upper() for subject in school.required_subjects
+                                    if subject.strip())
+
+        for position, school in enumerate(schools):
+            bit = 1 << position
+            for facet, values in school_facet_values(school, all_combinations).items():
+                bitmaps = self.bitmaps[facet]
+                for value in values:
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+                    self._names[facet].setdefault(value.lower(), value)
+
+    def values(self, facet):
+        """All values of a facet, most common first"""
+        bitmaps = self.bitmaps[facet]
+        return sorted(bitmaps, key=lambda value: (-popcount(bitmaps[value]), value))
+
+    def facet_bitmap(self, facet, values):
+        """Schools matching any of the values of one facet (case-insensitive)"""
+        if isinstance(values, str):
+            values = [values]
+        bitmap = 0
+        for value in values:
+            name = self._names[facet].get(str(value).strip().lower())
+            if name is not None:
+                bitmap |= self.bitmaps[facet][name]
+        return bitmap
+
+    def match(self, filters, skip=None):
+        """Bitmap of the schools passing every filter except the `skip` facet"""
+        bitmap = self.all
+        for facet, values in filters.items():
+            if facet == skip or values in (None, '', []):
+                continue
+            if facet not in self.bitmaps:
+                raise ValueError(f"unknown facet: {facet}")
+            bitmap &= self.facet_bitmap(facet, values)
+        return bitmap
+
+    def counts(self, filters):
+        """
+        {facet: {value: count}} for the current filters
+        A facet's own filter is left out of its counts, so the other options of a
+        facet that is already filtered still show how many schools they would give.
+        """
+        counts = {}
+        for facet, bitmaps in self.bitmaps.items():
+            base = self.match(filters, skip=facet)
+            facet_counts = {}
+            for value, bitmap in bitmaps.items():
+                count = popcount(base & bitmap)
+                if count:
+                    facet_counts[value] = count
+            counts[facet] = dict(sorted(facet_counts.items(), key=lambda item: (-item[1], item[0])))
+        return counts
+
+    def schools_in(self, bitmap):
+        """School objects whose bit is set, in catalog order"""
+        bits = bin(bitmap)[:1:-1]  # lowest bit first, without the '0b' prefix
+        schools = []
+        position = bits.find('1')
+        while position != -1:
+            schools.append(self.schools[position])
+            position = bits.find('1', position + 1)
+        return schools
+
+    def search(self, filters=None, with_counts=True):
+        """Apply {facet: value or [values]} filters; returns a FacetResult"""
+        filters = filters or {}
+        bitmap = self.match(filters)
+        return FacetResult(bitmap, self.schools_in(bitmap), self.counts(filters) if with_counts else None)
+
+
+_last_index = None
+_last_key = None
+
+
+def facet_index_for(schools):
+    """
+    FacetIndex for a catalog list, reused while the same School objects are shown
+    (e.g. from the catalog snapshot); the cached index keeps them alive, so their
+    ids cannot be reused by other objects meanwhile.
+    """
+    global _last_index, _last_key
+    key = tuple(map(id, schools))
+    if _last_index is None or key != _last_key:
+        _last_index, _last_key = FacetIndex(schools), key
+    return _last_index
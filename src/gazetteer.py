@@ -0,0 +1,230 @@
+"""
+District gazetteer for Ishuri-Connect
+Every province and district gets an integer id ("place"). Distances between
+district headquarters and location scores between any two places are computed
+once into flat arrays. Scoring a school's location for a student is then a
+couple of dictionary lookups and an array index instead of string comparisons:
+
+    row = score_row("Huye")                  # scores for every place, once per student
+    row[school_place("Nyanza", "Southern")]  # 15: same province
+    location_score("Huye", "Musanze", "Northern")   # 5: far away
+
+Places 0 .. len(DISTRICTS)-1 are districts and the provinces come after them.
+Names that are not in the gazetteer fall back to the old text comparison.
+"""
+
+import math
+from array import array
+from functools import lru_cache
+
+from src.utils import PROVINCE_DISTRICTS
+
+# Approximate (latitude, longitude) of each district headquarters
+DISTRICT_COORDINATES = {
+    "Kigali City": (-1.944, 30.062), "Gasabo": (-1.930, 30.100), "Kicukiro": (-1.970, 30.100),
+    "Nyarugenge": (-1.950, 30.058),
+    "Musanze": (-1.500, 29.635), "Gicumbi": (-1.576, 30.068), "Burera": (-1.470, 29.830),
+    "Gakenke": (-1.695, 29.785), "Rulindo": (-1.730, 29.990),
+    "Huye": (-2.597, 29.739), "Nyanza": (-2.352, 29.751), "Muhanga": (-2.085, 29.756),
+    "Ruhango": (-2.217, 29.783), "Nyamagabe": (-2.467, 29.567), "Nyaruguru": (-2.630, 29.550),
+    "Gisagara": (-2.600, 29.830), "Kamonyi": (-2.000, 29.900),
+    "Rwamagana": (-1.949, 30.435), "Nyagatare": (-1.299, 30.327), "Gatsibo": (-1.580, 30.400),
+    "Kayonza": (-1.900, 30.500), "Kirehe": (-2.270, 30.650), "Ngoma": (-2.150, 30.540),
+    "Bugesera": (-2.150, 30.090),
+    "Rubavu": (-1.703, 29.256), "Rusizi": (-2.485, 28.908), "Nyamasheke": (-2.330, 29.100),
+    "Karongi": (-2.060, 29.350), "Rutsiro": (-1.930, 29.320), "Ngororero": (-1.870, 29.620),
+    "Nyabihu": (-1.660, 29.510)
+}
+
+# Location points (0-20), same scale as the matching score
+NO_PREFERENCE_SCORE = 10
+SAME_DISTRICT_SCORE = 20
+SAME_PROVINCE_SCORE = 15
+PARTIAL_NAME_SCORE = 10
+FAR_SCORE = 5
+# (up to km between district headquarters, score), nearest band first
+DISTANCE_BANDS = ((25, 17), (60, 12), (120, 8))
+# Another province never scores above this, however close it is
+OTHER_PROVINCE_CAP = 12
+
+PROVINCES = list(PROVINCE_DISTRICTS)
+DISTRICTS = [district for province in PROVINCES for district in PROVINCE_DISTRICTS[province]]
+PLACES = DISTRICTS + PROVINCES
+PROVINCE_OF = [PROVINCES.index(province) for province in PROVINCES
+               for _ in PROVINCE_DISTRICTS[province]]  # district id -> province index
+
+
+def _names():
+    """lower-case name -> place id (districts, provinces and common spellings)"""
+    names = {}
+    for place, name in enumerate(PLACES):
+        names[name.lower()] = place
+    for index, province in enumerate(PROVINCES):
+        place = len(DISTRICTS) + index
+        names.setdefault(f"{province.lower()} province", place)
+    names.setdefault("city of kigali", len(DISTRICTS) + PROVINCES.index("Kigali"))
+    return names
+
+
+PLACE_IDS = _names()
+
+
+def place_id(name):
+    """Place id for a district or province name (case-insensitive), or None"""
+    return PLACE_IDS.get((name or '').strip().lower())
+
+
+def is_province(place):
+    return place >= len(DISTRICTS)
+
+
+def province_index(place):
+    """Province (0 .. len(PROVINCES)-1) of any place"""
+    return place - len(DISTRICTS) if is_province(place) else PROVINCE_OF[place]
+
+
+def districts_of(place):
+    """District ids of a province place, or [place] for a district"""
+    if not is_province(place):
+        return [place]
+    province = province_index(place)
+    return [district for district in range(len(DISTRICTS)) if PROVINCE_OF[district] == province]
+
+
+def district_names(province):
+    """District names of a province, in gazetteer order (empty if unknown)"""
+    place = place_id(province)
+    if place is None or not is_province(place):
+        return []
+    return [DISTRICTS[district] for district in districts_of(place)]
+
+
+def _haversine_km(a, b):
+    (lat1, lon1), (lat2, lon2) = a, b
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+@lru_cache(maxsize=None)
+def distance_matrix():
+    """Flat array: km between district headquarters i and j is at [i * len(DISTRICTS) + j]"""
+    points = [DISTRICT_COORDINATES.get(district) for district in DISTRICTS]
+    distances = array('d')
+    for a in points:
+        distances.extend(_haversine_km(a, b) if a and b else float('inf') for b in points)
+    return distances
+
+
+def distance_km(a, b):
+    """
+    Shortest km between two places (district headquarters; for a province, its
+    nearest district)
+    """
+    distances = distance_matrix()
+    size = len(DISTRICTS)
+    return min(distances[i * size + j] for i in districts_of(a) for j in districts_of(b))
+
+
+def _band_score(km):
+    for limit, score in DISTANCE_BANDS:
+        if km <= limit:
+            return score
+    return FAR_SCORE
+
+
+def proximity_score(preferred, school):
+    """Location points when the student prefers place `preferred` and the school is in `school`"""
+    if preferred == school:
+        return SAME_PROVINCE_SCORE if is_province(preferred) else SAME_DISTRICT_SCORE
+    if is_province(preferred) or is_province(school):
+        # Province on either side: being inside it counts as a province match
+        if province_index(preferred) == province_index(school):
+            return SAME_PROVINCE_SCORE
+        return min(_band_score(distance_km(preferred, school)), OTHER_PROVINCE_CAP)
+    score = _band_score(distance_km(preferred, school))
+    if PROVINCE_OF[preferred] == PROVINCE_OF[school]:
+        return max(score, SAME_PROVINCE_SCORE)
+    # A neighbour across a province border never outranks the student's own province
+    return min(score, OTHER_PROVINCE_CAP)
+
+
+@lru_cache(maxsize=None)
+def score_matrix():
+    """Flat array('B'): proximity_score(i, j) is at [i * len(PLACES) + j]"""
+    size = len(PLACES)
+    return array('B', [proximity_score(i, j) for i in range(size) for j in range(size)])
+
+
+@lru_cache(maxsize=1024)
+def score_row(preferred_location):
+    """
+    Location points for every school place, for one preference (a list, the
+    fastest to index); None if the name is unknown
+    """
+    place = place_id(preferred_location)
+    if place is None:
+        return None
+    size = len(PLACES)
+    return score_matrix()[place * size:(place + 1) * size].tolist()
+
+
+# (district, province) as stored on schools -> place; a plain dict so the
+# per-school lookup in matching is a single get()
+SCHOOL_PLACES = {}
+SCHOOL_PLACES_LIMIT = 4096
+
+
+def school_place(district, province):
+    """Place of a school: its district when known, else its province, else None"""
+    key = (district, province)
+    if key in SCHOOL_PLACES:
+        return SCHOOL_PLACES[key]
+    place = place_id(district)
+    if place is None:
+        place = place_id(province)
+    if len(SCHOOL_PLACES) < SCHOOL_PLACES_LIMIT:
+        SCHOOL_PLACES[key] = place
+    return place
+
+
+def text_location_score(preferred_location, school_district, school_province):
+    """The original string comparison, for names outside the gazetteer"""
+    pref_lower = preferred_location.lower()
+    # Exact district match
+    if school_district and pref_lower == school_district.lower():
+        return SAME_DISTRICT_SCORE
+    # Province match
+    if school_province and pref_lower == school_province.lower():
+        return SAME_PROVINCE_SCORE
+    # Partial match (e.g., "Kigali" in "Kigali City")
+    if (school_district and pref_lower in school_district.lower()) or \
+       (school_province and pref_lower in school_province.lower()):
+        return PARTIAL_NAME_SCORE
+    return FAR_SCORE  # Different location
+
+
+def location_score(preferred_location, school_district, school_province):
+    """Location match score (0-20 points) of one school for one preference"""
+    if not preferred_location:
+        return NO_PREFERENCE_SCORE  # Neutral score if no preference
+    row = score_row(preferred_location)
+    place = school_place(school_district, school_province)
+    if row is None or place is None:
+        return text_location_score(preferred_location, school_district, school_province)
+    return row[place]
+
+
+def location_scores(preferred_location, schools):
+    """Location scores for a whole list of schools (one row lookup per school)"""
+    if not preferred_location:
+        return [NO_PREFERENCE_SCORE] * len(schools)
+    row = score_row(preferred_location)
+    scores = []
+    for school in schools:
+        place = school_place(school.district, school.province) if row is not None else None
+        if place is None:
+            scores.append(text_location_score(preferred_location, school.district, school.province))
+        else:
+            scores.append(row[place])
+    return scores
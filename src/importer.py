@@ -0,0 +1,191 @@
+"""
+Streaming CSV import of national exam results for Ishuri-Connect
+Reads the file chunk by chunk, validates rows on worker threads, drops
+duplicate emails with a preloaded set and writes each chunk as one batch.
+
+Expected columns (header row):
+    first_name, last_name, email, aggregate_marks, marks,
+    secondary_school, subject_combination, location_from,
+    preferred_location, desired_program, preferred_boarding
+`marks` is optional: individual marks separated by ';' (e.g. "72;65;80"), in the
+order of the combination's subjects (PCM: Physics;Chemistry;Mathematics).
+When aggregate_marks is empty, the average of the marks is used.
+"""
+
+import csv
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from src.models import Student
+from src.utils import validate_email
+
+BOARDING_CHOICES = ('boarding', 'day', 'no_preference')
+
+
+class ImportResult:
+    """Counters for one import run"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'rows_read': self.rows_read,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+def parse_mark(value):
+    """A mark between 0 and 100, or ValueError"""
+    mark = float(value)
+    if not 0 <= mark <= 100:
+        raise ValueError(f"mark out of range: {value}")
+    return mark
+
+
+def validate_row(row):
+    """
+    Turn one CSV row into a Student
+    Returns (student, None) or (None, reason)
+    """
+    first_name = (row.get('first_name') or '').strip()
+    last_name = (row.get('last_name') or '').strip()
+    email = (row.get('email') or '').strip()
+    if not first_name or not last_name:
+        return None, 'missing name'
+    if not validate_email(email):
+        return None, 'invalid email'
+
+    try:
+        marks = [parse_mark(mark) for mark in (row.get('marks') or '').split(';') if mark.strip()]
+        aggregate = (row.get('aggregate_marks') or '').strip()
+        if aggregate:
+            aggregate_marks = parse_mark(aggregate)
+        elif marks:
+            aggregate_marks = round(sum(marks) / len(marks), 2)
+        else:
+            return None, 'missing marks'
+    except ValueError as e:
+        return None, f'invalid marks: {e}'
+
+    boarding = (row.get('preferred_boarding') or 'no_preference').strip().lower()
+    if boarding not in BOARDING_CHOICES:
+        boarding = 'no_preference'
+
+    student = Student(
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        marks=marks,
+        secondary_school=(row.get('secondary_school') or '').strip() or None,
+        aggregate_marks=aggregate_marks,
+        subject_combination=(row.get('subject_combination') or '').strip().upper() or None,
+        location_from=(row.get('location_from') or '').strip() or None,
+        preferred_location=(row.get('preferred_location') or '').strip() or None,
+        desired_program=(row.get('desired_program') or '').strip() or None,
+        preferred_boarding=boarding
+    )
+    return student, None
+
+
+def validate_chunk(chunk):
+    """Validate a list of (line_number, row); returns [(line_number, row, student, reason)]"""
+    results = []
+    for line_number, row in chunk:
+        student, reason = validate_row(row)
+        results.append((line_number, row, student, reason))
+    return results
+
+
+def read_chunks(reader, chunk_size):
+    """Yield lists of (line_number, row) without reading the whole file"""
+    numbered = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validated_chunks(chunks, workers):
+    """
+    Validate chunks on a thread pool, in file order, with at most
+    2 * workers chunks in flight (memory stays bounded)
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(validate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_students(db, handle, rejects_handle=None, chunk_size=1000, workers=4, progress=None):
+    """
+    Stream students from an open CSV file into the database
+
+    db: Database to write to
+    handle: text file with a header row
+    rejects_handle: optional text file receiving rejected rows plus line and reason
+    progress: optional callable(ImportResult) called after each written chunk
+    Returns an ImportResult.
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+
+    # One query instead of a get_student_by_email round trip per row
+    known_emails = db.get_all_student_emails()
+
+    reader = csv.DictReader(handle)
+    rejects = None
+    if rejects_handle is not None:
+        rejects = csv.writer(rejects_handle)
+        rejects.writerow(['line', 'reason'] + list(reader.fieldnames or []))
+
+    def reject(line_number, row, reason):
+        result.rejected += 1
+        if rejects is not None:
+            rejects.writerow([line_number, reason] + [row.get(name, '') for name in reader.fieldnames])
+
+    for validated in validated_chunks(read_chunks(reader, chunk_size), workers):
+        batch = []
+        for line_number, row, student, reason in validated:
+            result.rows_read += 1
+            if student is None:
+                reject(line_number, row, reason)
+                continue
+            email_key = student.email.lower()
+            if email_key in known_emails:
+                result.duplicates += 1
+                reject(line_number, row, 'duplicate email')
+                continue
+            known_emails.add(email_key)
+            batch.append(student)
+
+        if batch:
+            with db.transaction():
+                db.insert_students_bulk(batch)
+            result.inserted += len(batch)
+
+        result.elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(result)
+
+    result.elapsed = time.perf_counter() - start
+    return result
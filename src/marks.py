@@ -0,0 +1,115 @@
+"""
+Per-subject marks for Ishuri-Connect
+Subject weights and minimum marks per program, and cohort-wide computations
+over the student_marks table.
+
+A MarksMatrix holds a whole cohort column by column (one array of marks per
+subject), so aggregates, weighted program scores and minimum-mark checks are
+computed one subject column at a time over every student, instead of one
+student at a time:
+
+    cohort = load_cohort(db)                          # every stored mark
+    for student_id, score, eligible in cohort.program_scores("Civil Engineering"):
+        ...
+"""
+
+from array import array
+
+MISSING = float('nan')  # a subject the student did not take
+
+# (keyword in the program name, subject weights, minimum mark per subject)
+# The first matching keyword wins, so more specific keywords come first.
+PROGRAM_SUBJECT_REQUIREMENTS = [
+    ('veterinary', {'Biology': 0.5, 'Chemistry': 0.5}, {'Biology': 50}),
+    ('medicine', {'Biology': 0.4, 'Chemistry': 0.4, 'Physics': 0.2}, {'Biology': 60, 'Chemistry': 60}),
+    ('dental', {'Biology': 0.4, 'Chemistry': 0.4, 'Physics': 0.2}, {'Biology': 60, 'Chemistry': 60}),
+    ('pharmacy', {'Chemistry': 0.5, 'Biology': 0.3, 'Mathematics': 0.2}, {'Chemistry': 60}),
+    ('nursing', {'Biology': 0.5, 'Chemistry': 0.5}, {'Biology': 50}),
+    ('public health', {'Biology': 0.5, 'Chemistry': 0.3, 'Mathematics': 0.2}, {'Biology': 50}),
+    ('computer', {'Mathematics': 0.5, 'Physics': 0.25, 'Computer Science': 0.25}, {'Mathematics': 50}),
+    ('software', {'Mathematics': 0.5, 'Physics': 0.25, 'Computer Science': 0.25}, {'Mathematics': 50}),
+    ('information technology', {'Mathematics': 0.5, 'Computer Science': 0.5}, {'Mathematics': 45}),
+    ('architecture', {'Mathematics': 0.4, 'Physics': 0.4, 'Geography': 0.2}, {'Mathematics': 50}),
+    ('engineering', {'Mathematics': 0.5, 'Physics': 0.35, 'Chemistry': 0.15}, {'Mathematics': 50, 'Physics': 45}),
+    ('accounting', {'Mathematics': 0.5, 'Economics': 0.5}, {'Mathematics': 45}),
+    ('finance', {'Mathematics': 0.5, 'Economics': 0.5}, {'Mathematics': 45}),
+    ('economics', {'Economics': 0.6, 'Mathematics': 0.4}, {'Economics': 50}),
+    ('business', {'Economics': 0.6, 'Mathematics': 0.4}, {}),
+    ('law', {'English': 0.4, 'History': 0.3, 'Literature': 0.3}, {}),
+    ('journalism', {'English': 0.4, 'Literature': 0.4, 'Kinyarwanda': 0.2}, {})
+]
+
+
+def requirements_for(program_name):
+    """(weights, minimums) for a program; (None, {}) when it has no subject requirements"""
+    name = (program_name or '').lower()
+    for keyword, weights, minimums in PROGRAM_SUBJECT_REQUIREMENTS:
+        if keyword in name:
+            return weights, minimums
+    return None, {}
+
+
+def meets_minimums(subject_marks, program_name):
+    """Check one student's {subject: mark} against a program's minimum marks"""
+    _, minimums = requirements_for(program_name)
+    return all(subject_marks.get(subject, -1) >= minimum for subject, minimum in minimums.items())
+
+
+class MarksMatrix:
+    """Marks of a cohort, one column per subject - demonstrates column-wise processing"""
+
+    def __init__(self, marks_by_student):
+        """marks_by_student: {student_id: {subject: mark}} as returned by the database"""
+        self.student_ids = list(marks_by_student)
+        subjects = sorted({subject for marks in marks_by_student.values() for subject in marks})
+        self.columns = {
+            subject: array('d', [marks.get(subject, MISSING) for marks in marks_by_student.values()])
+            for subject in subjects
+        }
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def column(self, subject):
+        """Marks in one subject for every student (NaN where it was not taken)"""
+        column = self.columns.get(subject)
+        return column if column is not None else array('d', [MISSING]) * len(self)
+
+    def averages(self):
+        """Average of the marks each student has"""
+        totals = [0.0] * len(self)
+        counts = [0] * len(self)
+        for column in self.columns.values():
+            totals = [total + mark if mark == mark else total for total, mark in zip(totals, column)]
+            counts = [count + (mark == mark) for count, mark in zip(counts, column)]
+        return [round(total / count, 2) if count else 0.0 for total, count in zip(totals, counts)]
+
+    def weighted_scores(self, weights):
+        """Weighted average per student; a missing subject counts as 0"""
+        total_weight = sum(weights.values())
+        totals = [0.0] * len(self)
+        for subject, weight in weights.items():
+            totals = [total + weight * mark if mark == mark else total
+                      for total, mark in zip(totals, self.column(subject))]
+        return [round(total / total_weight, 2) for total in totals]
+
+    def meets_minimums(self, minimums):
+        """True per student with at least the minimum in every listed subject"""
+        eligible = [True] * len(self)
+        for subject, minimum in minimums.items():
+            # NaN >= minimum is False, so a missing subject fails the check
+            eligible = [ok and mark >= minimum for ok, mark in zip(eligible, self.column(subject))]
+        return eligible
+
+    def program_scores(self, program_name):
+        """(student_id, score, eligible) for every student, for one program"""
+        weights, minimums = requirements_for(program_name)
+        scores = self.weighted_scores(weights) if weights else self.averages()
+        return list(zip(self.student_ids, scores, self.meets_minimums(minimums)))
+
+
+def load_cohort(db, student_ids=None):
+    """MarksMatrix for the given students, or for everyone with stored marks"""
+    if student_ids is None:
+        return MarksMatrix(db.get_all_marks())
+    return MarksMatrix(db.get_marks_by_students(student_ids))
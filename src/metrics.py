@@ -0,0 +1,279 @@
+"""
+Metrics registry for Ishuri-Connect
+Counters, gauges and histograms in the Prometheus text format, served at
+/metrics by `python main.py serve` or flushed to a file every few seconds
+(ISHURI_METRICS_FILE, e.g. for the node_exporter textfile collector).
+
+Recording is lock-free on the hot path: every thread writes to its own shard
+and the shards are only summed when the metrics are rendered.
+
+    from src.metrics import registry
+    REQUESTS = registry.counter('ishuri_requests_total', 'Requests handled', ['route'])
+    REQUESTS.inc(labels=('/stats',))
+"""
+
+import atexit
+import math
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (+Inf is added when rendering)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: name, help text, label names and per-thread shards"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        """This thread's {label values: value} dict (created once per thread)"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _shard_items(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            while True:
+                try:
+                    items = list(shard.items())
+                    break
+                except RuntimeError:  # the owning thread added a key meanwhile
+                    continue
+            yield from items
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic count"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, labels=()):
+        # This thread's own dict - no lock, summed over all threads in values()
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        totals = {}
+        for labels, value in self._shard_items():
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def value(self, labels=()):
+        return self.values().get(labels, 0)
+
+    def samples(self):
+        return [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+                for labels, value in sorted(self.values().items())]
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down
+    With `function`, the value is read when rendering (e.g. a pool's queue length)
+    and should return a number, or a {label values: number} dict for labelled gauges.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), function=None):
+        super().__init__(name, help_text, labels)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount=1, labels=()):
+        self.inc(-amount, labels)
+
+    def values(self):
+        if self.function is not None:
+            value = self.function()
+            return value if isinstance(value, dict) else {(): value}
+        return dict(self._values)
+
+    def samples(self):
+        return [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+                for labels, value in sorted(self.values().items())]
+
+
+class Histogram(Metric):
+    """Distribution of observed values (seconds by default) in fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # [count per bucket (last one is +Inf), sum, count]
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def time(self, labels=()):
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def values(self):
+        merged = {}
+        for labels, (counts, total, count) in self._shard_items():
+            current = merged.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            for index, bucket_count in enumerate(counts):
+                current[0][index] += bucket_count
+            current[1] += total
+            current[2] += count
+        return merged
+
+    def samples(self):
+        lines = []
+        for labels, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Named metrics; asking for an existing name returns the same metric"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=(), function=None):
+        gauge = self._get_or_create(Gauge, name, help_text, labels)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self, path):
+        """Write render() to path atomically"""
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            handle.write(self.render())
+        os.replace(temp_path, path)
+
+
+registry = MetricsRegistry()
+_file_writer = None
+
+
+def start_file_export(path=None, interval=None):
+    """
+    Flush the registry to a file every `interval` seconds (and at exit)
+    Defaults come from ISHURI_METRICS_FILE / ISHURI_METRICS_INTERVAL; does nothing
+    when no path is configured. Safe to call more than once.
+    """
+    global _file_writer
+    path = path or os.getenv('ISHURI_METRICS_FILE')
+    if not path or _file_writer is not None:
+        return None
+    interval = interval or float(os.getenv('ISHURI_METRICS_INTERVAL', 15))
+
+    def flush_forever():
+        while True:
+            time.sleep(interval)
+            registry.write_file(path)
+
+    _file_writer = threading.Thread(target=flush_forever, name='metrics-file', daemon=True)
+    _file_writer.start()
+    atexit.register(registry.write_file, path)
+    return _file_writer
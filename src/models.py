@@ -3,6 +3,16 @@ Data Models for Ishuri-Connect
 Demonstrates: Classes, Objects, __init__, Methods, Encapsulation
 """
 
+from src.metrics import registry
+from src.gazetteer import SCHOOL_PLACES, location_score, score_row
+from src.utils import subject_names
+
+MATCH_SCORE_CALLS = registry.counter('ishuri_match_score_calls_total', 'calculate_match_score invocations')
+RECOMMENDATION_SECONDS = registry.histogram('ishuri_recommendation_seconds',
+                                            'Time to build one set of recommendations', ['path'])
+
+_NOT_LOADED = object()
+
 
 class Student:
     """Student class - represents a student in the system"""
@@ -10,8 +20,11 @@ class Student:
     def __init__(self, first_name, last_name, email, marks=None, student_id=None,
                  secondary_school=None, aggregate_marks=None, subject_combination=None,
                  location_from=None, preferred_location=None, desired_program=None,
-                 preferred_boarding='no_preference'):
-        """Initialize a Student object with comprehensive profile"""
+                 preferred_boarding='no_preference', subjects=None):
+        """
+        Initialize a Student object with comprehensive profile
+        subjects: subject name of each mark; defaults to the combination's subjects in order
+        """
         self.student_id = student_id
         self.first_name = first_name
         self.last_name = last_name
@@ -23,10 +36,13 @@ class Student:
         self.secondary_school = secondary_school
         self.aggregate_marks = aggregate_marks if aggregate_marks else self.average_mark
         self.subject_combination = subject_combination  # PCM, PCB, MEG, etc.
+        self.subjects = list(subjects) if subjects else subject_names(subject_combination, len(self.marks))
         
         # Location preferences
         self.location_from = location_from
         self.preferred_location = preferred_location
+        self._location_row_for = _NOT_LOADED  # preference the cached score row belongs to
+        self._location_row = None
         
         # Program preferences
         self.desired_program = desired_program
@@ -38,6 +54,21 @@ class Student:
             return 0.0
         return round(sum(self.marks) / len(self.marks), 2)
     
+    def subject_marks(self):
+        """Marks by subject - demonstrates zip() into a dictionary"""
+        return dict(zip(self.subjects, self.marks))
+    
+    def set_subject_marks(self, subject_marks):
+        """
+        Replace the marks with a {subject: mark} dictionary (e.g. loaded from the database)
+        The combination's subjects are listed first, in their usual order.
+        """
+        usual_order = subject_names(self.subject_combination, 3)
+        self.subjects = sorted(subject_marks, key=lambda subject: (
+            usual_order.index(subject) if subject in usual_order else len(usual_order), subject))
+        self.marks = [float(subject_marks[subject]) for subject in self.subjects]
+        self.average_mark = self.calculate_average()
+    
     def get_full_name(self):
         """Return full name - demonstrates method"""
         return f"{self.first_name} {self.last_name}"
@@ -49,22 +80,17 @@ class Student:
         return self.desired_program.lower() in program_name.lower() or program_name.lower() in self.desired_program.lower()
     
     def matches_location(self, school_district, school_province):
-        """Calculate location match score (0-20 points)"""
-        if not self.preferred_location:
-            return 10  # Neutral score if no preference
-        
-        pref_lower = self.preferred_location.lower()
-        # Exact district match
-        if school_district and pref_lower == school_district.lower():
-            return 20
-        # Province match
-        if school_province and pref_lower == school_province.lower():
-            return 15
-        # Partial match (e.g., "Kigali" in "Kigali City")
-        if (school_district and pref_lower in school_district.lower()) or \
-           (school_province and pref_lower in school_province.lower()):
-            return 10
-        return 5  # Different location
+        """Calculate location match score (0-20 points), graded by distance (see src/gazetteer.py)"""
+        # The preference's score row is looked up once per student, not once per school
+        if self._location_row_for != self.preferred_location:
+            self._location_row = score_row(self.preferred_location) if self.preferred_location else None
+            self._location_row_for = self.preferred_location
+        row = self._location_row
+        if row is not None:
+            place = SCHOOL_PLACES.get((school_district, school_province))
+            if place is not None:
+                return row[place]
+        return location_score(self.preferred_location, school_district, school_province)
     
     def to_dict(self):
         """Convert student object to dictionary - demonstrates dict"""
@@ -186,13 +212,14 @@ class Application:
     STATUS_WITHDRAWN = "Withdrawn"
     
     def __init__(self, student_id, school_id, application_id=None, 
-                 status=None, applied_date=None):
+                 status=None, applied_date=None, school_name=None):
         """Initialize an Application object"""
         self.application_id = application_id
         self.student_id = student_id
         self.school_id = school_id
         self.status = status if status else self.STATUS_PENDING
         self.applied_date = applied_date
+        self.school_name = school_name  # filled in when loaded with a JOIN on schools
     
     def to_dict(self):
         """Convert application to dictionary"""
@@ -200,6 +227,7 @@ class Application:
             'application_id': self.application_id,
             'student_id': self.student_id,
             'school_id': self.school_id,
+            'school_name': self.school_name,
             'status': self.status,
             'applied_date': self.applied_date
         }
@@ -222,6 +250,7 @@ def calculate_match_score(student, school, program=None):
     
     Returns: score (0-100)
     """
+    MATCH_SCORE_CALLS.inc()
     score = 0
     
     # 1. Marks Match (30 points max)
@@ -295,4 +324,110 @@ def sort_schools_by_match(schools_list, student):
     # Sort by score (descending) - demonstrates sorting with lambda
     matches.sort(key=lambda x: x[1], reverse=True)
     
-    return matches
\ No newline at end of file
+    return matches
+
+
+def categorize_schools(schools_list, student, desired_program=None):
+    """
+    Split schools into the four groups shown on the recommendations screen
+    Demonstrates: dictionary of lists, keyword matching
+    
+    With a desired program (keyword match on program names):
+    - 'matching': has a matching program the student qualifies for
+    - 'program_no_marks': has a matching program but marks are too low
+    - 'no_program_with_marks': no matching program, but school cutoff is met
+    - 'no_program_no_marks': neither
+    Without one, qualifying schools go to 'matching' and the rest to 'program_no_marks'.
+    Duplicate school IDs are dropped (first one wins).
+    """
+    categories = {
+        'matching': [],
+        'program_no_marks': [],
+        'no_program_with_marks': [],
+        'no_program_no_marks': []
+    }
+    
+    seen_ids = set()
+    aggregate = student.aggregate_marks
+    desired_keywords = desired_program.lower().split() if desired_program else None
+    
+    for school in schools_list:
+        if school.school_id in seen_ids:
+            continue
+        seen_ids.add(school.school_id)
+        
+        if not desired_keywords:
+            if aggregate >= school.min_cutoff:
+                categories['matching'].append(school)
+            else:
+                categories['program_no_marks'].append(school)
+            continue
+        
+        has_matching_program = False
+        has_qualifying_program = False
+        for prog in school.programs:
+            prog_name = prog.get('program_name', '').lower()
+            # Check if program matches any keyword
+            if any(keyword in prog_name for keyword in desired_keywords):
+                has_matching_program = True
+                if aggregate >= prog.get('cutoff_marks', 0):
+                    has_qualifying_program = True
+                    break
+        
+        # Categorize the school
+        if has_matching_program and has_qualifying_program:
+            categories['matching'].append(school)
+        elif has_matching_program:
+            categories['program_no_marks'].append(school)
+        elif aggregate >= school.min_cutoff:
+            categories['no_program_with_marks'].append(school)
+        else:
+            categories['no_program_no_marks'].append(school)
+    
+    return categories
+
+
+# Order in which recommendation categories are presented
+CATEGORY_ORDER = ('matching', 'program_no_marks', 'no_program_with_marks', 'no_program_no_marks')
+
+
+def matching_program_names(school, desired_program):
+    """Names of the school's programs matching any keyword of desired_program"""
+    if not desired_program:
+        return []
+    keywords = desired_program.lower().split()
+    return [prog.get('program_name', '') for prog in school.programs
+            if any(keyword in prog.get('program_name', '').lower() for keyword in keywords)]
+
+
+def build_recommendations(student, schools, desired_program=None, limit=10):
+    """
+    Recommendations as plain data (for command mode, exports and services)
+    Same categories as the interactive screen, each sorted by match score.
+    Returns a list of dictionaries, best category first.
+    """
+    with RECOMMENDATION_SECONDS.time(('batch',)):
+        return _build_recommendations(student, schools, desired_program, limit)
+
+
+def _build_recommendations(student, schools, desired_program, limit):
+    desired_program = desired_program or student.desired_program
+    categories = categorize_schools(schools, student, desired_program)
+
+    results = []
+    for category in CATEGORY_ORDER:
+        scored = [(school, calculate_match_score(student, school)) for school in categories[category]]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        for rank, (school, score) in enumerate(scored[:limit], 1):
+            results.append({
+                'rank': rank,
+                'category': category,
+                'school_id': school.school_id,
+                'school_name': school.name,
+                'district': school.district,
+                'province': school.province,
+                'min_cutoff': school.min_cutoff,
+                'score': round(score, 2),
+                'matching_programs': matching_program_names(school, desired_program)
+            })
+    return results
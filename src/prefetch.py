@@ -0,0 +1,123 @@
+"""
+Session prefetch for Ishuri-Connect
+As soon as a student logs in, the data the student menu is likely to need next
+(catalog, the student's applications, statistics) is loaded on a small thread
+pool. Menu actions then take the ready result instead of waiting on MySQL.
+
+Each worker thread uses its own Database clone - a connection must not be
+shared between threads - while stats, cache and snapshot stay shared.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class SessionPrefetcher:
+    """
+    Warms one student's session data in the background
+
+        prefetcher = SessionPrefetcher(db, student)
+        prefetcher.start()
+        schools = prefetcher.get('schools')   # ready result (reused until stale), or loaded now
+        prefetcher.refresh('applications')    # after the student applied
+        prefetcher.close()
+    """
+
+    def __init__(self, db, student, workers=None, max_age=None):
+        self.db = db
+        self.student = student
+        if workers is None:
+            workers = int(os.getenv('SESSION_PREFETCH_WORKERS', 2))
+        self.workers = workers
+        if max_age is None:
+            max_age = float(os.getenv('SESSION_PREFETCH_MAX_AGE', 60))
+        self.max_age = max_age
+        self._executor = None
+        self._futures = {}  # name -> (future, submitted at, session's last write then)
+        self._local = threading.local()
+        self._clones = []
+        self._lock = threading.Lock()
+
+        # name -> loader(db); every loader is a plain read
+        self.loaders = {
+            'schools': lambda db: db.get_all_schools(),
+            'applications': lambda db: db.get_applications_by_student(self.student.student_id),
+            'statistics': lambda db: db.get_statistics()
+        }
+
+    def start(self):
+        """Submit every loader; a no-op when prefetching is disabled (workers=0)"""
+        if self.workers <= 0:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prefetch')
+        self.refresh(*self.loaders)
+
+    def refresh(self, *names):
+        """Reload the given entries in the background, e.g. after a write made them stale"""
+        if self._executor is None:
+            return
+        for name in names:
+            future = self._executor.submit(self._load, name, self.db._last_write_at)
+            self._futures[name] = (future, time.monotonic(), self.db._last_write_at)
+
+    def _stale(self, entry):
+        """Older than max_age, or the session wrote something since it was loaded"""
+        _, submitted_at, last_write_at = entry
+        return (time.monotonic() - submitted_at > self.max_age
+                or self.db._last_write_at != last_write_at)
+
+    def _worker_db(self):
+        """This thread's Database clone, connected on first use"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self.db.clone()
+            with self._lock:
+                self._clones.append(db)
+            db.connect()
+        return db
+
+    def _load(self, name, last_write_at):
+        db = self._worker_db()
+        # Keep read-your-writes: a recent write in the session pins reads to the primary
+        db._last_write_at = last_write_at
+        db.catalog_snapshot = self.db.catalog_snapshot
+        recorder = getattr(self.db, 'recorder', None)
+        if recorder is not None:
+            # The session is being recorded (src/replay.py): record prefetch reads too
+            db = recorder.wrap(db)
+        return self.loaders[name](db)
+
+    def get(self, name):
+        """
+        The prefetched result (waiting for it if it is still loading), reused on
+        later visits until it is stale; loaded now through the session's own
+        connection when stale, failed or never started.
+        """
+        entry = self._futures.get(name)
+        result = None
+        if entry is not None and not self._stale(entry):
+            try:
+                result = entry[0].result()
+            except Exception:
+                result = None
+        if result is None:
+            result = self.loaders[name](self.db)
+            if self._executor is not None:
+                loaded = Future()
+                loaded.set_result(result)
+                self._futures[name] = (loaded, time.monotonic(), self.db._last_write_at)
+        return result
+
+    def close(self):
+        """Stop the pool and close the worker connections"""
+        if self._executor is not None:
+            for future, _, _ in self._futures.values():
+                future.cancel()  # not started yet - nobody will read it now
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._futures.clear()
+        for db in self._clones:
+            db.disconnect()
+        self._clones.clear()
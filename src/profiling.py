@@ -0,0 +1,139 @@
+"""
+Profiling hooks for Ishuri-Connect
+Every menu action, command and service request runs inside profile_action(name).
+Profiling is off unless enabled, and then that call returns one shared no-op
+context manager, so the hooks can stay in production code.
+
+Enable with `python main.py --profile ...` or ISHURI_PROFILE=1. Per action name,
+two files are written to ISHURI_PROFILE_DIR (default: profiles/) at exit:
+
+    <action>.prof            cProfile stats    (python -m pstats, snakeviz, ...)
+    <action>.collapsed.txt   sampled stacks    (flamegraph.pl, speedscope, ...)
+
+Repeated runs of the same action accumulate into the same files.
+"""
+
+import atexit
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NO_PROFILE = nullcontext()
+_profiler = None
+
+
+class ActionProfiler:
+    """
+    cProfile plus a stack sampler, grouped by action name
+    Only one cProfile runs at a time (the interpreter allows a single profiler);
+    concurrent actions are still covered by the sampler.
+    """
+
+    def __init__(self, directory='profiles', interval=0.005):
+        self.directory = directory
+        self.interval = interval
+        self.stats = {}          # action -> pstats.Stats
+        self.stacks = {}         # action -> {collapsed stack: samples}
+        self._active = {}        # thread id -> action name
+        self._cprofile_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._sampler = threading.Thread(target=self._sample_forever, name='profile-sampler', daemon=True)
+        self._sampler.start()
+
+    @contextmanager
+    def action(self, name):
+        thread_id = threading.get_ident()
+        profile = cProfile.Profile() if self._cprofile_lock.acquire(blocking=False) else None
+        self._active[thread_id] = name
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._cprofile_lock.release()
+            self._active.pop(thread_id, None)
+            if profile is not None:
+                with self._lock:
+                    if name in self.stats:
+                        self.stats[name].add(profile)
+                    else:
+                        self.stats[name] = pstats.Stats(profile)
+
+    def _sample_forever(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, name in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = collapse(frame)
+                with self._lock:
+                    counts = self.stacks.setdefault(name, {})
+                    counts[stack] = counts.get(stack, 0) + 1
+
+    def flush(self):
+        """Write <action>.prof and <action>.collapsed.txt for every action seen"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            for name, stats in self.stats.items():
+                stats.dump_stats(os.path.join(self.directory, f"{safe_name(name)}.prof"))
+            for name, counts in self.stacks.items():
+                path = os.path.join(self.directory, f"{safe_name(name)}.collapsed.txt")
+                with open(path, 'w', encoding='utf-8') as handle:
+                    for stack, count in sorted(counts.items()):
+                        handle.write(f"{stack} {count}\n")
+        return self.directory
+
+
+def collapse(frame):
+    """Frame chain as 'outer;...;inner' with module:function entries"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'action'
+
+
+def enable_profiling(directory=None, interval=None):
+    """Turn profiling on for this process; files are written at exit"""
+    global _profiler
+    if _profiler is None:
+        directory = directory or os.getenv('ISHURI_PROFILE_DIR', 'profiles')
+        interval = interval or float(os.getenv('ISHURI_PROFILE_INTERVAL_MS', 5)) / 1000
+        _profiler = ActionProfiler(directory, interval)
+        atexit.register(flush_profiles)
+    return _profiler
+
+
+def flush_profiles():
+    if _profiler is not None:
+        directory = _profiler.flush()
+        print(f"profiles written to {directory}/", file=sys.stderr)
+
+
+def profile_action(name):
+    """Context manager profiling one action - a shared no-op while profiling is off"""
+    if _profiler is None:
+        return _NO_PROFILE
+    return _profiler.action(name)
+
+
+if os.getenv('ISHURI_PROFILE', '').lower() in ('1', 'true', 'yes'):
+    enable_profiling()
@@ -0,0 +1,378 @@
+"""
+Rank and percentile index for Ishuri-Connect
+Aggregates of every student, one sorted array per subject combination, so
+"what is my rank among PCM students" or "what percentile is 72%" is a bisect
+instead of sorting the students table on every request.
+
+    index = rank_index(db)                    # opened once, refreshed every RANK_REFRESH_SECONDS
+    note_registration(student)                # count a new registration right away
+    index.rank(72.5, 'PCM')                   # 1 + PCM students strictly above 72.5
+    index.percentile(72.5)                    # % of all students at or below 72.5
+    index.histogram('PCM')                    # [(0, 10, count), (10, 20, count), ...]
+
+The arrays live in a compact file (RANK_INDEX, default ranks.index) that is
+memory-mapped and searched in place:
+
+    header     MAGIC, format version, created_at, last student id, counts, CRC32
+    directory  (combination, first value, value count) per combination
+    values     uint16 aggregates in hundredths of a percent, sorted per combination
+
+Students registered after the file was written are read with one id range
+query (id > last student id), at most every RANK_REFRESH_SECONDS, and kept in
+small sorted lists next to the file; once there are more than REWRITE_AFTER of
+them the file is rewritten. Registrations made through this process are counted
+at once with note_registration(). Changed or deleted aggregates are only picked
+up by a rebuild.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right, insort
+
+MAGIC = b'ISHRNK\x00\x00'
+FORMAT_VERSION = 1
+
+# magic, format, created_at, last student id, combinations, values, directory offset, crc32
+HEADER = struct.Struct('<8sHdIIIII')
+# combination, first value, value count
+DIRECTORY_ENTRY = struct.Struct('<8sII')
+
+NO_COMBINATION = 'OTHER'
+REWRITE_AFTER = 1000
+
+logger = logging.getLogger('ishuri.ranks')
+
+# Maps a reader was still using when their index let go of them; closed later
+_retired_maps = []
+
+
+class RankIndexError(Exception):
+    """The rank index file is missing, corrupt or from another format version"""
+
+
+def combination_key(combination):
+    return (combination or '').strip().upper()[:8] or NO_COMBINATION
+
+
+def encode(aggregate):
+    """Aggregate (0-100%) as an integer number of hundredths"""
+    return min(max(int(round(float(aggregate or 0) * 100)), 0), 0xFFFF)
+
+
+class RankIndex:
+    """Sorted aggregates per combination: a memory-mapped base plus recent additions"""
+
+    def __init__(self, path=None, verify=True):
+        self.path = path
+        self.created_at = time.time()
+        self.last_student_id = 0
+        self.base = {}    # combination -> sorted sequence (memoryview over the file)
+        self.recent = {}  # combination -> sorted list, registered since the file was written
+        self.noted_ids = set()  # ids counted by note() that the next refresh will read again
+        self.refreshed_at = 0.0
+        self._map = None
+        self._values = None
+        self._lock = threading.Lock()
+        if path:
+            self._open(path, verify)
+
+    def _open(self, path, verify):
+        try:
+            with open(path, 'rb') as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise RankIndexError(f"cannot open rank index {path}: {e}")
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise RankIndexError("rank index too short")
+        (magic, format_version, self.created_at, self.last_student_id,
+         combinations, value_count, directory_at, crc) = HEADER.unpack_from(self._map, 0)
+        values_at = directory_at + combinations * DIRECTORY_ENTRY.size
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self.close()
+            raise RankIndexError("not a rank index (or unsupported format version)")
+        if values_at + value_count * 2 > len(self._map):
+            self.close()
+            raise RankIndexError("rank index truncated")
+        if verify and zlib.crc32(memoryview(self._map)[directory_at:]) != crc:
+            self.close()
+            raise RankIndexError("rank index checksum mismatch")
+
+        if sys.byteorder == 'little':
+            self._values = memoryview(self._map)[values_at:values_at + value_count * 2].cast('H')
+        else:
+            self._values = array('H', self._map[values_at:values_at + value_count * 2])
+            self._values.byteswap()
+        for position in range(combinations):
+            name, first, count = DIRECTORY_ENTRY.unpack_from(
+                self._map, directory_at + position * DIRECTORY_ENTRY.size)
+            self.base[name.rstrip(b'\x00').decode('ascii')] = self._values[first:first + count]
+
+    # ---------- updates ----------
+
+    def add(self, combination, aggregate, student_id=None):
+        """Count one more student (read from the students table)"""
+        with self._lock:
+            if student_id in self.noted_ids:
+                self.noted_ids.discard(student_id)  # already counted by note()
+            else:
+                insort(self.recent.setdefault(combination_key(combination), []), encode(aggregate))
+            if student_id and student_id > self.last_student_id:
+                self.last_student_id = student_id
+
+    def note(self, combination, aggregate, student_id):
+        """
+        Count a registration made by this process right away; the next refresh
+        reads it again and skips it (earlier ids may not be committed yet)
+        """
+        with self._lock:
+            if student_id <= self.last_student_id or student_id in self.noted_ids:
+                return
+            self.noted_ids.add(student_id)
+            insort(self.recent.setdefault(combination_key(combination), []), encode(aggregate))
+
+    def refresh(self, db, chunk_size=5000):
+        """Add students registered since the last refresh; returns how many"""
+        added = 0
+        for row in db.iter_student_aggregates(self.last_student_id, chunk_size):
+            self.add(row['subject_combination'], row['aggregate_marks'], row['id'])
+            added += 1
+        self.refreshed_at = time.monotonic()
+        return added
+
+    def recent_count(self):
+        return sum(len(values) for values in self.recent.values())
+
+    def save(self, path):
+        """Write base and recent values as one file, atomically"""
+        with self._lock:
+            merged = {}
+            for combination in sorted(set(self.base) | set(self.recent)):
+                values = array('H', self.base.get(combination, ()))
+                values.extend(self.recent.get(combination, ()))
+                merged[combination] = array('H', sorted(values))
+            last_student_id = self.last_student_id
+
+        directory = bytearray()
+        values = array('H')
+        for combination, combination_values in merged.items():
+            directory += DIRECTORY_ENTRY.pack(combination.encode('ascii', 'replace'), len(values),
+                                              len(combination_values))
+            values.extend(combination_values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        body = bytes(directory) + values.tobytes()
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, time.time(), last_student_id,
+                             len(merged), len(values), HEADER.size, zlib.crc32(body))
+
+        # Windows refuses to replace a mapped file, so let go of our own mapping first
+        if self._map is not None and os.path.abspath(self.path) == os.path.abspath(path):
+            self.detach()
+        close_retired_maps()
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, 'wb') as handle:
+            handle.write(header)
+            handle.write(body)
+        try:
+            os.replace(temp_path, path)  # readers never see a half-written file
+        except OSError as e:
+            os.remove(temp_path)
+            raise RankIndexError(f"cannot replace rank index {path}: {e}")
+
+    def detach(self):
+        """Copy the base values into memory and unmap the file; the index stays usable"""
+        with self._lock:
+            if self._map is None:
+                return
+            self.base = {combination: array('H', values) for combination, values in self.base.items()}
+        self._unmap()
+
+    # ---------- queries ----------
+
+    def _parts(self, combination):
+        """Sorted sequences holding the values of one combination (or of everyone)"""
+        if combination is None:
+            return list(self.base.values()) + list(self.recent.values())
+        key = combination_key(combination)
+        return [part for part in (self.base.get(key), self.recent.get(key)) if part is not None]
+
+    def combinations(self):
+        """{combination: student count}, largest first"""
+        counts = {key: self.count(key) for key in set(self.base) | set(self.recent)}
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def count(self, combination=None):
+        return sum(len(part) for part in self._parts(combination))
+
+    def at_or_below(self, aggregate, combination=None):
+        value = encode(aggregate)
+        return sum(bisect_right(part, value) for part in self._parts(combination))
+
+    def rank(self, aggregate, combination=None):
+        """1 + students strictly above this aggregate (ties share a rank)"""
+        return self.count(combination) - self.at_or_below(aggregate, combination) + 1
+
+    def percentile(self, aggregate, combination=None):
+        """Share of students (%) at or below this aggregate, or None without students"""
+        total = self.count(combination)
+        if not total:
+            return None
+        return round(100.0 * self.at_or_below(aggregate, combination) / total, 1)
+
+    def histogram(self, combination=None, width=10):
+        """[(low, high, count)] in bands of `width` percent; the last band includes 100"""
+        parts = self._parts(combination)
+        bands = []
+        low = 0
+        while low < 100:
+            high = min(low + width, 100)
+            start = sum(bisect_right(part, encode(low) - 1) for part in parts)
+            end = sum(bisect_right(part, encode(high) - (0 if high == 100 else 1)) for part in parts)
+            bands.append((low, high, end - start))
+            low = high
+        return bands
+
+    def summary(self, aggregate, combination=None):
+        """Rank and percentile of one aggregate, nationally and (when given) within a combination"""
+        summary = {'aggregate': aggregate}
+        if combination is not None:
+            key = combination_key(combination)
+            summary.update(combination=key, rank=self.rank(aggregate, key), of=self.count(key),
+                           percentile=self.percentile(aggregate, key))
+        summary.update(national_rank=self.rank(aggregate), national_of=self.count(),
+                       national_percentile=self.percentile(aggregate))
+        return summary
+
+    def close(self):
+        self.base = {}
+        self._unmap()
+
+    def _unmap(self):
+        # Views over the map must be released before it can be closed; while a
+        # reader still holds a slice of it, the map waits in _retired_maps
+        if isinstance(self._values, memoryview):
+            self._values.release()
+        self._values = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                _retired_maps.append(self._map)
+            self._map = None
+
+
+def close_retired_maps():
+    """Close the retired maps that no reader uses any more"""
+    for mapped in list(_retired_maps):
+        try:
+            mapped.close()
+        except BufferError:
+            continue
+        _retired_maps.remove(mapped)
+
+
+def rank_index_path():
+    """Rank index location ('' keeps the index in memory only)"""
+    return os.getenv('RANK_INDEX', 'ranks.index')
+
+
+def build_rank_index(db, path=None):
+    """Read every student's aggregate and (with a path) write the index file"""
+    index = RankIndex()
+    index.refresh(db)
+    if path:
+        try:
+            index.save(path)
+        except RankIndexError as e:
+            logger.warning("Keeping the rank index in memory: %s", e)
+            return index
+        index.close()
+        index = RankIndex(path)
+        index.refreshed_at = time.monotonic()
+    return index
+
+
+def open_rank_index(db, path=None):
+    """
+    The index file brought up to date with new registrations, rebuilt when it
+    is missing or invalid (or an in-memory index when path is '')
+    """
+    if not path:
+        return build_rank_index(db)
+    try:
+        index = RankIndex(path)
+    except RankIndexError as e:
+        if os.path.exists(path):
+            logger.warning("Rebuilding rank index: %s", e)
+        return build_rank_index(db, path)
+    index.refresh(db)
+    return rewrite_if_large(index, path)
+
+
+def rewrite_if_large(index, path):
+    """
+    The index, or a reopened copy with its recent additions written into the
+    file once there are more than REWRITE_AFTER of them. The old index is not
+    closed - other threads may still be reading it - only detached from the file.
+    """
+    if not path or index.recent_count() <= REWRITE_AFTER:
+        return index
+    try:
+        index.save(path)
+    except RankIndexError as e:
+        logger.warning("Rank index not rewritten, trying again on the next refresh: %s", e)
+        return index
+    rewritten = RankIndex(path)
+    rewritten.noted_ids = set(index.noted_ids)  # written into the file, still to be skipped
+    rewritten.refreshed_at = index.refreshed_at
+    return rewritten
+
+
+def rank_refresh_seconds():
+    """How often rank_index() reads new registrations (0 = on every call)"""
+    return float(os.getenv('RANK_REFRESH_SECONDS', 30))
+
+
+_shared_index = None
+_shared_lock = threading.Lock()      # opening the index
+_refresh_lock = threading.Lock()     # one refresh at a time; others keep using the index
+
+
+def rank_index(db):
+    """
+    Process-wide index: opened on first use, then refreshed at most every
+    RANK_REFRESH_SECONDS (by one caller, while the others read the current one)
+    """
+    global _shared_index
+    index = _shared_index
+    if index is None:
+        with _shared_lock:
+            if _shared_index is None:
+                _shared_index = open_rank_index(db, rank_index_path())
+            return _shared_index
+
+    if time.monotonic() - index.refreshed_at < rank_refresh_seconds():
+        return index
+    if not _refresh_lock.acquire(blocking=False):
+        return index
+    try:
+        index.refresh(db)
+        _shared_index = rewrite_if_large(index, rank_index_path())
+    finally:
+        _refresh_lock.release()
+    return _shared_index
+
+
+def note_registration(student):
+    """Count a student registered by this process in the shared index (if it is open)"""
+    index = _shared_index
+    if index is not None and student.student_id:
+        index.note(student.subject_combination, student.aggregate_marks, student.student_id)
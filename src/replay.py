@@ -0,0 +1,334 @@
+"""
+Record and replay of anonymized sessions for Ishuri-Connect
+The recorder wraps a Database and writes every data call (method, arguments,
+latency, result size) plus the matching inputs of each recommendation screen
+to a JSON Lines file. The replayer runs the same steps against a local
+database - with the code version that is checked out - and reports per-step
+latency deltas against the recording (or an earlier replay).
+
+    ISHURI_RECORD=sessions.jsonl python main.py           # record menu sessions
+    python main.py replay sessions.jsonl --output replay.json
+    python main.py replay sessions.jsonl --compare replay.json
+
+Anonymization: names and the secondary school are dropped, the session
+student's email and id become placeholders and any other email is replaced by
+a salted hash. What is kept is the shape that drives performance: aggregate,
+combination, locations, the desired program text, boarding preference and the
+school ids involved.
+
+A replay creates one student per session (and their applications, unless
+--skip-writes); they are deleted again when the replay ends.
+"""
+
+import hashlib
+import json
+import secrets
+import statistics
+import threading
+import time
+
+from src.models import Application, Student, build_recommendations
+
+RECORDED_METHODS = {
+    'get_student_by_email', 'get_student_by_id', 'insert_student', 'update_student',
+    'get_all_schools', 'get_school_by_id', 'get_schools_by_min_mark', 'get_programs_by_school',
+    'search_programs_by_name', 'insert_application', 'get_applications_by_student',
+    'check_existing_application', 'get_statistics', 'advanced_match_search'
+}
+WRITE_METHODS = {'insert_student', 'update_student', 'insert_application'}
+
+PROFILE_FIELDS = ('aggregate_marks', 'subject_combination', 'location_from', 'preferred_location',
+                  'desired_program', 'preferred_boarding')
+
+STUDENT_ID = '$student_id'
+STUDENT_EMAIL = '$email'
+
+# method -> (position, name) of its student id argument; only these become
+# $student_id (a school id can have the same value)
+STUDENT_ID_ARGUMENTS = {
+    'get_student_by_id': (0, 'student_id'),
+    'get_applications_by_student': (0, 'student_id'),
+    'check_existing_application': (0, 'student_id')
+}
+
+
+def student_profile(student):
+    """The performance-relevant, non-identifying part of a student"""
+    return {field: getattr(student, field, None) for field in PROFILE_FIELDS}
+
+
+def result_size(result):
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, set, dict)):
+        return len(result)
+    return 1
+
+
+class SessionRecorder:
+    """Writes anonymized steps to a JSON Lines file (thread-safe)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.salt = secrets.token_hex(8)
+        self._handle = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.session = 0
+        self.step = 0
+        self.student_id = None
+        self.student_email = None
+
+    def wrap(self, db):
+        return RecordingDatabase(db, self)
+
+    def anonymous_email(self, email):
+        digest = hashlib.sha256(f"{self.salt}:{email.lower()}".encode('utf-8')).hexdigest()[:12]
+        return f"anon-{digest}@anon.invalid"
+
+    def start_session(self, student):
+        """A (new) student was identified: later steps belong to their session"""
+        if student.student_id == self.student_id and self.student_id is not None:
+            return
+        self.session += 1
+        self.step = 0
+        self.student_id = student.student_id
+        self.student_email = (student.email or '').lower()
+        self.write({'kind': 'session', 'profile': student_profile(student)})
+
+    def encode(self, value):
+        """JSON-friendly, anonymized form of one call argument"""
+        if isinstance(value, Student):
+            return {'__student__': student_profile(value)}
+        if isinstance(value, Application):
+            return {'__application__': {'student_id': self.encode_student_id(value.student_id),
+                                        'school_id': value.school_id, 'status': value.status}}
+        if isinstance(value, str) and '@' in value:
+            return STUDENT_EMAIL if value.lower() == self.student_email else self.anonymous_email(value)
+        if isinstance(value, (list, tuple)):
+            return [self.encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.encode(item) for key, item in value.items()}
+        if value is None or isinstance(value, (int, float, str, bool)):
+            return value
+        return str(value)
+
+    def encode_student_id(self, value):
+        """$student_id for the session student's id, other ids as they are"""
+        if self.student_id is not None and value == self.student_id:
+            return STUDENT_ID
+        return value
+
+    def encode_arguments(self, method, args, kwargs):
+        """Encoded (args, kwargs); the student id argument of the method becomes a placeholder"""
+        args = self.encode(list(args))
+        kwargs = self.encode(kwargs)
+        position, name = STUDENT_ID_ARGUMENTS.get(method, (None, None))
+        if position is not None and position < len(args):
+            args[position] = self.encode_student_id(args[position])
+        if name in kwargs:
+            kwargs[name] = self.encode_student_id(kwargs[name])
+        return args, kwargs
+
+    def call(self, method, args, kwargs, elapsed, result):
+        # Identify the session first so the student's own email/id become placeholders
+        if isinstance(result, Student):
+            self.start_session(result)
+        elif method == 'insert_student' and result and args and isinstance(args[0], Student):
+            self.start_session(args[0])
+        args, kwargs = self.encode_arguments(method, args, kwargs)
+        self.write({'kind': 'db', 'method': method, 'args': args,
+                    'kwargs': kwargs, 'elapsed_ms': round(elapsed * 1000, 3),
+                    'rows': result_size(result)})
+
+    def matching(self, student, desired_program, schools, elapsed):
+        """Inputs of one recommendations screen"""
+        self.write({'kind': 'recommend', 'profile': student_profile(student),
+                    'desired_program': desired_program, 'schools': len(schools or ()),
+                    'elapsed_ms': round(elapsed * 1000, 3)})
+
+    def write(self, record):
+        with self._lock:
+            self.step += 1
+            record = dict(record, session=self.session, step=self.step, at=round(time.time(), 3))
+            self._handle.write(json.dumps(record, default=str) + '\n')
+            self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+
+class RecordingDatabase:
+    """
+    Stands in for a Database: data methods are timed and recorded, everything
+    else (transaction(), stats, cache, ...) goes straight to the real object
+    """
+
+    def __init__(self, db, recorder):
+        self._db = db
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        attribute = getattr(self._db, name)
+        if name not in RECORDED_METHODS:
+            return attribute
+
+        def recorded(*args, **kwargs):
+            start = time.perf_counter()
+            result = attribute(*args, **kwargs)
+            self.recorder.call(name, args, kwargs, time.perf_counter() - start, result)
+            return result
+        return recorded
+
+
+def record_matching(db, student, desired_program, schools, elapsed):
+    """Called by the recommendations screen; a no-op unless db is recording"""
+    if isinstance(db, RecordingDatabase):
+        db.recorder.matching(student, desired_program, schools, elapsed)
+
+
+# ==================== REPLAY ====================
+
+def read_sessions(path):
+    """{session number: [records in step order]}"""
+    sessions = {}
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                sessions.setdefault(record['session'], []).append(record)
+    for records in sessions.values():
+        records.sort(key=lambda record: record['step'])
+    return sessions
+
+
+def profile_student(profile, email, student_id=None):
+    return Student(first_name='Replay', last_name='Student', email=email, student_id=student_id,
+                   aggregate_marks=profile.get('aggregate_marks'),
+                   subject_combination=profile.get('subject_combination'),
+                   location_from=profile.get('location_from'),
+                   preferred_location=profile.get('preferred_location'),
+                   desired_program=profile.get('desired_program'),
+                   preferred_boarding=profile.get('preferred_boarding') or 'no_preference')
+
+
+class Replayer:
+    """Re-runs recorded sessions against `db` and times every step"""
+
+    def __init__(self, db, skip_writes=False):
+        self.db = db
+        self.skip_writes = skip_writes
+        self.run_id = secrets.token_hex(4)
+        self.steps = []
+        self.created_students = []  # ids of the replay students, deleted by cleanup()
+
+    def replay(self, sessions):
+        try:
+            for number, records in sorted(sessions.items()):
+                self.replay_session(number, records)
+        finally:
+            self.cleanup()
+        return self.steps
+
+    def cleanup(self):
+        """Delete the students this replay created, with their applications (untimed)"""
+        for student_id in self.created_students:
+            for application in self.db.get_applications_by_student(student_id):
+                self.db.delete_application(application.application_id)
+            self.db.delete_student(student_id)
+        self.created_students = []
+
+    def replay_session(self, number, records):
+        email = f"replay-{self.run_id}-{number}@anon.invalid"
+        student = None
+        registers = any(record.get('method') == 'insert_student' for record in records)
+
+        for record in records:
+            kind = record['kind']
+            if kind == 'session':
+                student = profile_student(record['profile'], email)
+                if not registers or self.skip_writes:
+                    # Untimed setup: the session's student must exist locally (a recorded
+                    # registration is only replayed without --skip-writes)
+                    if self.db.insert_student(student):
+                        self.created_students.append(student.student_id)
+                continue
+
+            if kind == 'recommend':
+                profile_user = profile_student(record['profile'], email)
+                start = time.perf_counter()
+                schools = self.db.get_all_schools()
+                build_recommendations(profile_user, schools, record.get('desired_program'))
+                self.timed(record, 'recommend', time.perf_counter() - start)
+                continue
+
+            method = record['method']
+            if self.skip_writes and method in WRITE_METHODS:
+                continue
+            context = {STUDENT_EMAIL: email, STUDENT_ID: student.student_id if student else None}
+            args = [self.decode(arg, context, email) for arg in record['args']]
+            kwargs = {key: self.decode(value, context, email) for key, value in record['kwargs'].items()}
+            start = time.perf_counter()
+            try:
+                result = getattr(self.db, method)(*args, **kwargs)
+            except Exception as e:
+                self.timed(record, method, time.perf_counter() - start, error=repr(e))
+                continue
+            self.timed(record, method, time.perf_counter() - start)
+            if method == 'insert_student' and student is not None and args:
+                student.student_id = args[0].student_id
+                if result:
+                    self.created_students.append(result)
+
+    def decode(self, value, context, email):
+        if isinstance(value, str) and value in context:
+            return context[value]
+        if isinstance(value, dict) and '__student__' in value:
+            return profile_student(value['__student__'], email, context[STUDENT_ID])
+        if isinstance(value, dict) and '__application__' in value:
+            data = value['__application__']
+            return Application(self.decode(data['student_id'], context, email),
+                               data['school_id'], status=data.get('status'))
+        if isinstance(value, list):
+            return [self.decode(item, context, email) for item in value]
+        if isinstance(value, dict):
+            return {key: self.decode(item, context, email) for key, item in value.items()}
+        return value
+
+    def timed(self, record, name, elapsed, error=None):
+        step = {'session': record['session'], 'step': record['step'], 'name': name,
+                'recorded_ms': record.get('elapsed_ms'), 'replay_ms': round(elapsed * 1000, 3)}
+        if error:
+            step['error'] = error
+        self.steps.append(step)
+
+
+def summarize(steps, baseline=None):
+    """
+    Per step name: count and median latency now, in the recording and (with a
+    baseline replay report) in that earlier replay, with relative deltas
+    """
+    def median(values):
+        values = [value for value in values if value is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    def delta(value, base):
+        return round((value - base) / base, 4) if value is not None and base else None
+
+    previous = (baseline or {}).get('summary', {})
+    summary = {}
+    for name in sorted({step['name'] for step in steps}):
+        named = [step for step in steps if step['name'] == name]
+        replay_ms = median(step['replay_ms'] for step in named)
+        recorded_ms = median(step['recorded_ms'] for step in named)
+        entry = {
+            'count': len(named),
+            'errors': sum(1 for step in named if 'error' in step),
+            'replay_p50_ms': replay_ms,
+            'recorded_p50_ms': recorded_ms,
+            'delta_vs_recorded': delta(replay_ms, recorded_ms)
+        }
+        if name in previous:
+            entry['baseline_p50_ms'] = previous[name]['replay_p50_ms']
+            entry['delta_vs_baseline'] = delta(replay_ms, previous[name]['replay_p50_ms'])
+        summary[name] = entry
+    return summary
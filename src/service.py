@@ -0,0 +1,534 @@
+"""
+HTTP JSON service for Ishuri-Connect
+Lets the web and USSD front ends use registration, recommendations, applications
+and statistics without the terminal menus.
+
+    python main.py serve --port 8080 --workers 16
+
+    POST /students          {"first_name", "last_name", "email", "aggregate_marks", ...}
+    GET  /recommendations   ?email=...|student_id=...  [&program=...&limit=10]
+    GET  /applications      ?email=...|student_id=...
+    POST /applications      {"email" or "student_id", "school_id"}
+    GET  /schools           [?province=...&district=...&school_type=...&boarding=...
+                             &combination=...&field=...&limit=50]  with facet counts
+    GET  /programs          ?max_fees=...  [&min_years=...&max_years=...&program=...&limit=50]
+    GET  /admissions        [?school_id=...]  per-intake applicants, acceptance rate, quantiles
+    GET  /rank              ?email=...|student_id=...  or  ?aggregate=...[&combination=...]
+                             [&histogram=1]
+    GET  /stats
+    GET  /health
+    GET  /metrics           Prometheus text format
+
+Connections are handled by asyncio; every database call (and the matching)
+runs on a bounded thread pool, each thread with its own Database clone.
+Requests over --max-pending get 503 straight away instead of queueing without
+limit, and a request slower than --timeout gets 504. For a few seconds after a
+student registers or applies, requests about that student read from the primary
+whichever thread serves them, so they see the write even with lagging replicas.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from database.db import DUPLICATE_KEY_ERRNO, FOREIGN_KEY_ERRNO, DatabaseError
+from src.catalog import ProgramFeeIndex
+from src.facets import FACETS, FacetIndex
+from src.ranks import note_registration, rank_index
+from src.admissions import load_admission_tables
+from src.importer import validate_row
+from src.metrics import registry
+from src.models import Application, build_recommendations
+from src.profiling import profile_action
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+IDLE_TIMEOUT_SECONDS = 15
+
+HTTP_REQUESTS = registry.counter('ishuri_http_requests_total', 'HTTP requests answered', ['route', 'status'])
+HTTP_SECONDS = registry.histogram('ishuri_http_request_seconds', 'HTTP request latency', ['route'])
+
+STATUS_TEXT = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout'
+}
+
+
+class HttpError(Exception):
+    """Ends a request with the given status and an {"error": message} body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """One parsed HTTP request"""
+
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip('/') or '/'
+        self.query_lists = parse_qs(parts.query)
+        self.query = {key: values[0] for key, values in self.query_lists.items()}
+        self.headers = headers
+        self.body = body
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            self.keep_alive = connection == 'keep-alive'
+        else:
+            self.keep_alive = connection != 'close'
+
+    def json(self):
+        """The body as a JSON object, or HttpError 400"""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HttpError(400, 'body is not valid JSON')
+        if not isinstance(data, dict):
+            raise HttpError(400, 'body must be a JSON object')
+        return data
+
+
+async def read_request(reader):
+    """Read one request from the stream; None when the client closed the connection"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, 'incomplete request')
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, 'request headers too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HttpError(400, 'malformed request line')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    body = b''
+    length = headers.get('content-length')
+    if length:
+        if not length.isdigit():
+            raise HttpError(400, 'invalid Content-Length')
+        if int(length) > MAX_BODY_BYTES:
+            raise HttpError(413, f'body larger than {MAX_BODY_BYTES} bytes')
+        body = await reader.readexactly(int(length))
+    return Request(method.upper(), target, version, headers, body)
+
+
+def encode_response(status, payload, keep_alive=True, extra_headers=None):
+    """JSON response; a str payload is sent as plain text"""
+    if isinstance(payload, str):
+        body = payload.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body = json.dumps(payload, default=str).encode('utf-8')
+        content_type = 'application/json'
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}",
+        f'Content-Type: {content_type}',
+        f'Content-Length: {len(body)}',
+        'Connection: ' + ('keep-alive' if keep_alive else 'close')
+    ]
+    for name, value in (extra_headers or {}).items():
+        headers.append(f'{name}: {value}')
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+
+class MatchingService:
+    """
+    Routes requests to handlers that run on the database thread pool
+
+    db: connected Database used as the template for per-thread clones
+    workers: pool size, i.e. the maximum number of concurrent database calls
+    max_pending: requests allowed in the pool (running or queued) before 503
+    request_timeout: seconds before a request is answered with 504
+    catalog_ttl: seconds the in-memory catalog is reused before reloading
+    """
+
+    def __init__(self, db, workers=16, max_pending=1000, request_timeout=5.0, catalog_ttl=60.0):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='service-db')
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.catalog_ttl = catalog_ttl
+        self.pending = 0
+        self.counters = {'requests': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+
+        self._local = threading.local()
+        self._clones = []
+        self._clones_lock = threading.Lock()
+        self._catalog = None
+        self._catalog_loaded_at = 0.0
+        self._catalog_lock = threading.Lock()
+        self._fee_index = None
+        self._facet_index = None
+        self._recent_writes = {}  # ('email', email) / ('id', student_id) -> monotonic time of the write
+        self._recent_writes_lock = threading.Lock()
+
+        registry.gauge('ishuri_service_pending_requests', 'Requests running or queued on the pool',
+                       function=lambda: self.pending)
+        registry.gauge('ishuri_service_pool_workers', 'Database threads in the pool',
+                       function=lambda: workers)
+        registry.gauge('ishuri_service_max_pending', 'Pending requests allowed before 503',
+                       function=lambda: self.max_pending)
+
+        self.routes = {
+            ('POST', '/students'): self.register_student,
+            ('GET', '/recommendations'): self.recommendations,
+            ('GET', '/schools'): self.search_schools,
+            ('GET', '/programs'): self.programs_by_budget,
+            ('GET', '/rank'): self.rank,
+            ('GET', '/admissions'): self.admissions,
+            ('GET', '/applications'): self.list_applications,
+            ('POST', '/applications'): self.apply,
+            ('GET', '/stats'): self.statistics
+        }
+
+    # ==================== DATABASE ACCESS (pool threads) ====================
+
+    def worker_db(self):
+        """This pool thread's Database clone, connected on first use"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self.db.clone()
+            with self._clones_lock:
+                self._clones.append(db)
+            db.connect()
+        return db
+
+    def schools(self, db):
+        """
+        The catalog, shared by all requests and reloaded every catalog_ttl seconds
+        While one thread reloads, the others keep using the previous list.
+        """
+        fresh = time.monotonic() - self._catalog_loaded_at < self.catalog_ttl
+        if self._catalog is not None and fresh:
+            return self._catalog
+        if self._catalog_lock.acquire(blocking=self._catalog is None):
+            try:
+                if self._catalog is None or time.monotonic() - self._catalog_loaded_at >= self.catalog_ttl:
+                    schools = db.get_all_schools()
+                    if schools:
+                        self._catalog = schools
+                        self._catalog_loaded_at = time.monotonic()
+            finally:
+                self._catalog_lock.release()
+        return self._catalog or []
+
+    def fee_index(self, db):
+        """Budget index over the current in-memory catalog (rebuilt when it is reloaded)"""
+        schools = self.schools(db)
+        index = self._fee_index
+        if index is None or index.schools is not schools:
+            index = self._fee_index = ProgramFeeIndex(schools)
+        return index
+
+    def facet_index(self, db):
+        """Facet bitmaps over the current in-memory catalog (rebuilt when it is reloaded)"""
+        schools = self.schools(db)
+        index = self._facet_index
+        if index is None or index.schools is not schools:
+            index = self._facet_index = FacetIndex(schools)
+        return index
+
+    def note_write(self, student):
+        """Remember that this student was just written (see wrote_recently)"""
+        now = time.monotonic()
+        with self._recent_writes_lock:
+            if len(self._recent_writes) > 10000:
+                horizon = now - self.db.sticky_seconds
+                self._recent_writes = {key: at for key, at in self._recent_writes.items() if at >= horizon}
+            if student.email:
+                self._recent_writes[('email', student.email.strip().lower())] = now
+            if student.student_id:
+                self._recent_writes[('id', str(student.student_id))] = now
+
+    def wrote_recently(self, request):
+        """
+        True when the request names a student written in the last sticky_seconds
+        (by any pool thread) - its reads then go to the primary
+        """
+        if not self._recent_writes:
+            return False
+        values = dict(request.query)
+        if request.method == 'POST':
+            try:
+                values.update(request.json())
+            except HttpError:
+                pass
+        keys = [('email', str(values.get('email') or '').strip().lower()),
+                ('id', str(values.get('student_id') or '').strip())]
+        horizon = time.monotonic() - self.db.sticky_seconds
+        with self._recent_writes_lock:
+            return any(self._recent_writes.get(key, 0) >= horizon for key in keys if key[1])
+
+    def find_student(self, db, values):
+        """Student from an email or student_id parameter, or HttpError"""
+        if values.get('email'):
+            student = db.get_student_by_email(str(values['email']))
+        elif values.get('student_id'):
+            try:
+                student = db.get_student_by_id(int(values['student_id']))
+            except (TypeError, ValueError):
+                raise HttpError(400, 'student_id must be an integer')
+        else:
+            raise HttpError(400, 'give email or student_id')
+        if not student:
+            raise HttpError(404, 'student not found')
+        return student
+
+    # ==================== HANDLERS (pool threads) ====================
+
+    def register_student(self, db, request):
+        data = request.json()
+        row = {key: '' if value is None else str(value) for key, value in data.items()}
+        student, reason = validate_row(row)
+        if student is None:
+            raise HttpError(400, reason)
+
+        try:
+            with db.transaction():
+                if db.get_student_by_email(student.email):
+                    raise HttpError(409, 'email already registered')
+                student_id = db.insert_student(student)
+        except DatabaseError as e:
+            # Two registrations of one email at once: the unique key stops the second
+            if e.errno == DUPLICATE_KEY_ERRNO:
+                raise HttpError(409, 'email already registered')
+            raise
+        if not student_id:
+            raise HttpError(500, 'could not save the student')
+        self.note_write(student)
+        note_registration(student)
+        return 201, {'student': student.to_dict()}
+
+    def recommendations(self, db, request):
+        student = self.find_student(db, request.query)
+        try:
+            limit = int(request.query.get('limit', 10))
+        except ValueError:
+            raise HttpError(400, 'limit must be an integer')
+        results = build_recommendations(student, self.schools(db), request.query.get('program'), limit)
+        admissions = load_admission_tables(db, {result['school_id'] for result in results})
+        for result in results:
+            result['admission'] = admissions.likelihood(result['school_id'], student.aggregate_marks)
+        return 200, {'student_id': student.student_id, 'email': student.email,
+                     'aggregate_marks': student.aggregate_marks, 'recommendations': results}
+
+    def search_schools(self, db, request):
+        # Repeated values in one facet (?field=ICT&field=Health) are ORed
+        filters = {facet: request.query_lists[facet] for facet in FACETS if facet in request.query_lists}
+        try:
+            limit = int(request.query.get('limit', 50))
+        except ValueError:
+            raise HttpError(400, 'limit must be an integer')
+        result = self.facet_index(db).search(filters)
+        schools = [{'school_id': school.school_id, 'name': school.name, 'district': school.district,
+                    'province': school.province, 'school_type': school.school_type,
+                    'boarding': school.boarding_type, 'min_cutoff': school.min_cutoff,
+                    'programs': len(school.programs or [])} for school in result.schools[:limit]]
+        return 200, {'count': len(result), 'filters': filters, 'schools': schools, 'facets': result.counts}
+
+    def programs_by_budget(self, db, request):
+        values = {}
+        for name in ('max_fees', 'min_years', 'max_years', 'limit'):
+            if request.query.get(name):
+                try:
+                    values[name] = int(request.query[name])
+                except ValueError:
+                    raise HttpError(400, f'{name} must be an integer')
+        if 'max_fees' not in values:
+            raise HttpError(400, 'give max_fees (RWF per year)')
+        programs = self.fee_index(db).search(values['max_fees'], values.get('min_years'),
+                                             values.get('max_years'), request.query.get('program'),
+                                             values.get('limit', 50))
+        return 200, {'max_fees': values['max_fees'], 'programs': programs}
+
+    def rank(self, db, request):
+        query = request.query
+        if query.get('aggregate'):
+            try:
+                aggregate = float(query['aggregate'])
+            except ValueError:
+                raise HttpError(400, 'aggregate must be a number')
+            combination = query.get('combination')
+        else:
+            student = self.find_student(db, query)
+            aggregate = student.aggregate_marks
+            combination = query.get('combination') or student.subject_combination
+        index = rank_index(db)
+        payload = index.summary(aggregate, combination)
+        if query.get('histogram'):
+            payload['histogram'] = index.histogram(combination)
+        return 200, payload
+
+    def admissions(self, db, request):
+        school_id = None
+        if request.query.get('school_id'):
+            try:
+                school_id = int(request.query['school_id'])
+            except ValueError:
+                raise HttpError(400, 'school_id must be an integer')
+        tables = load_admission_tables(db, [school_id] if school_id is not None else None)
+        return 200, {'intakes': tables.summary(school_id)}
+
+    def list_applications(self, db, request):
+        student = self.find_student(db, request.query)
+        applications = db.get_applications_by_student(student.student_id)
+        return 200, {'student_id': student.student_id,
+                     'applications': [application.to_dict() for application in applications]}
+
+    def apply(self, db, request):
+        data = request.json()
+        student = self.find_student(db, data)
+        try:
+            school_id = int(data.get('school_id'))
+        except (TypeError, ValueError):
+            raise HttpError(400, 'school_id must be an integer')
+        if not db.get_school_by_id(school_id):
+            raise HttpError(404, 'school not found')
+
+        try:
+            with db.transaction():
+                if db.check_existing_application(student.student_id, school_id):
+                    raise HttpError(409, 'already applied to this school')
+                application = Application(student.student_id, school_id)
+                app_id = db.insert_application(application)
+        except DatabaseError as e:
+            if e.errno == DUPLICATE_KEY_ERRNO:
+                raise HttpError(409, 'already applied to this school')
+            if e.errno == FOREIGN_KEY_ERRNO:
+                raise HttpError(404, 'school not found')  # deleted meanwhile
+            raise
+        if not app_id:
+            raise HttpError(500, 'could not save the application')
+        self.note_write(student)
+        return 201, {'application': application.to_dict()}
+
+    def statistics(self, db, request):
+        return 200, db.get_statistics()
+
+    def run_handler(self, handler, request):
+        """Runs on a pool thread; errors become (status, payload)"""
+        try:
+            db = self.worker_db()
+            with profile_action(f"service.{request.method}.{request.path}"), \
+                    db.reads_from_primary(self.wrote_recently(request)):
+                return handler(db, request)
+        except HttpError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            self.counters['errors'] += 1
+            print(f"service error on {request.method} {request.path}: {e!r}", file=sys.stderr)
+            return 500, {'error': 'internal error'}
+
+    # ==================== ASYNCIO SIDE ====================
+
+    def health(self):
+        return 200, {'status': 'ok', 'pending': self.pending, 'max_pending': self.max_pending,
+                     'counters': dict(self.counters)}
+
+    def _release(self, _future=None):
+        self.pending -= 1
+
+    async def dispatch(self, request):
+        """Status and payload for one request, with request metrics"""
+        start = time.perf_counter()
+        status, payload = await self._dispatch(request)
+        route = request.path if (request.method, request.path) in self.routes else 'other'
+        HTTP_REQUESTS.inc(labels=(route, str(status)))
+        HTTP_SECONDS.observe(time.perf_counter() - start, (route,))
+        return status, payload
+
+    async def _dispatch(self, request):
+        """Status and payload for one request, with backpressure and a timeout"""
+        self.counters['requests'] += 1
+        if request.path == '/health':
+            return self.health()
+        if request.path == '/metrics':
+            return 200, registry.render()
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                return 405, {'error': f'{request.method} not allowed on {request.path}'}
+            return 404, {'error': f'no route for {request.path}'}
+
+        if self.pending >= self.max_pending:
+            self.counters['rejected'] += 1
+            return 503, {'error': 'server busy, retry shortly'}
+
+        # The slot is freed when the work really ends, even after a timeout
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self.executor.submit(self.run_handler, handler, request)
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            return 504, {'error': f'request took longer than {self.request_timeout}s'}
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until it closes (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT_SECONDS)
+                except HttpError as e:
+                    writer.write(encode_response(e.status, {'error': e.message}, keep_alive=False))
+                    await writer.drain()
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                status, payload = await self.dispatch(request)
+                extra = {'Retry-After': '1'} if status == 503 else None
+                writer.write(encode_response(status, payload, request.keep_alive, extra))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        """Stop the pool and close every clone connection"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for db in self._clones:
+            db.disconnect()
+        self._clones.clear()
+
+
+async def serve(service, host='127.0.0.1', port=8080, backlog=1024):
+    """Accept connections until cancelled"""
+    server = await asyncio.start_server(service.handle_connection, host, port,
+                                        limit=MAX_HEADER_BYTES, backlog=backlog)
+    addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Ishuri Connect service listening on {addresses}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
@@ -11,3 +11,80 @@ def validate_email(email):
     """Validate email format using regex pattern"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
+
+
+_FEE_AMOUNT = re.compile(r'(\d[\d,.]*)\s*([kKmM](?![a-zA-Z]))?')
+_DOTTED_THOUSANDS = re.compile(r'^\d{1,3}(\.\d{3})+$')
+_OTHER_CURRENCY = re.compile(r'usd|\$|eur|€|gbp|£|kes|ugx', re.IGNORECASE)
+
+
+def parse_fees_range(fees_range):
+    """
+    Numeric (min, max) from a free-text fee range, in RWF
+    "950,000 - 1,300,000 RWF" -> (950000, 1300000), "1.2M RWF" -> (1200000, 1200000),
+    "Free" -> (0, 0); (None, None) when no amount can be read or it is
+    in another currency ("USD 3,000"), so it never looks cheap in RWF
+    """
+    if not fees_range or _OTHER_CURRENCY.search(fees_range):
+        return None, None
+    if fees_range.strip().lower() in ('free', 'none', '0'):
+        return 0, 0
+    amounts = []
+    for number, suffix in _FEE_AMOUNT.findall(fees_range):
+        number = number.rstrip('.,')
+        if suffix:
+            value = float(number.replace(',', '.')) * (1000 if suffix in 'kK' else 1000000)
+        elif _DOTTED_THOUSANDS.match(number):
+            value = float(number.replace('.', ''))
+        else:
+            value = float(number.replace(',', ''))
+        amounts.append(int(round(value)))
+    if not amounts:
+        return None, None
+    return min(amounts), max(amounts)
+
+
+# Rwandan provinces and their districts (used by menus, filters and exports)
+PROVINCE_DISTRICTS = {
+    "Kigali": ["Kigali City", "Gasabo", "Kicukiro", "Nyarugenge"],
+    "Northern": ["Musanze", "Gicumbi", "Burera", "Gakenke", "Rulindo"],
+    "Southern": ["Huye", "Nyanza", "Muhanga", "Ruhango", "Nyamagabe", "Nyaruguru", "Gisagara", "Kamonyi"],
+    "Eastern": ["Rwamagana", "Nyagatare", "Gatsibo", "Kayonza", "Kirehe", "Ngoma", "Bugesera"],
+    "Western": ["Rubavu", "Rusizi", "Nyamasheke", "Karongi", "Rutsiro", "Ngororero", "Nyabihu"]
+}
+
+
+# A-level subject combinations and their three principal subjects, in the order
+# marks are entered / listed in CSV files
+COMBINATION_SUBJECTS = {
+    "PCM": ("Physics", "Chemistry", "Mathematics"),
+    "PCB": ("Physics", "Chemistry", "Biology"),
+    "MCB": ("Mathematics", "Chemistry", "Biology"),
+    "MPG": ("Mathematics", "Physics", "Geography"),
+    "MCE": ("Mathematics", "Computer Science", "Economics"),
+    "MEG": ("Mathematics", "Economics", "Geography"),
+    "PEM": ("Physics", "Economics", "Mathematics"),
+    "HEG": ("History", "Economics", "Geography"),
+    "HGL": ("History", "Geography", "Literature"),
+    "LKE": ("Literature", "Kinyarwanda", "English"),
+    "LFK": ("Literature", "French", "Kinyarwanda"),
+    "BCG": ("Biology", "Chemistry", "Geography")
+}
+
+
+def subject_names(combination, count):
+    """
+    Subject names for `count` marks of a student with this combination
+    The combination's subjects come first; extra marks are "Subject 4", "Subject 5", ...
+    """
+    subjects = list(COMBINATION_SUBJECTS.get((combination or '').upper(), ()))[:count]
+    subjects.extend(f"Subject {number}" for number in range(len(subjects) + 1, count + 1))
+    return subjects
+
+
+def districts_in_province(province):
+    """Districts of a province (case-insensitive), or an empty list if unknown"""
+    for name, districts in PROVINCE_DISTRICTS.items():
+        if name.lower() == (province or '').strip().lower():
+            return list(districts)
+    return []